@@ -0,0 +1,126 @@
+#stand-in for an external actuator: listens to the output bus and prints / records what arrives
+#   python -m actuator.bus_subscriber --osc 9000
+#   python -m actuator.bus_subscriber --udp 9001
+#   python -m actuator.bus_subscriber --websocket 127.0.0.1:8765
+import argparse
+import base64
+import json
+import os
+import socket
+import struct
+import time
+
+from actuator.output_bus import DECISION_FIELDS
+from streams.osc import decode_osc, parse_target
+
+
+#one subscriber over one transport; receive() returns the next decision dict or None on timeout
+# every message is stamped with its arrival time (perf_counter) so benchmarks can measure publish -> receive latency
+# receive_buffer: SO_RCVBUF in bytes, set before connecting (tcp fixes its window scale there), e.g. a tiny one to
+# play a client that stalls
+class BusSubscriber:
+    def __init__(self, kind, port=0, host="127.0.0.1", timeout=1.0, receive_buffer=None):
+        self.kind = kind
+        self.received = 0
+        if kind == "websocket":
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if receive_buffer is not None:
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+            self.socket.settimeout(timeout)
+            self.socket.connect((host, port))
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.buffer = b""
+            self.handshake(host, port)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind((host, port))
+            self.socket.settimeout(timeout)
+        self.port = self.socket.getsockname()[1] if kind != "websocket" else port
+
+    def handshake(self, host, port):
+        key = base64.b64encode(os.urandom(16))
+        self.socket.sendall(b"GET / HTTP/1.1\r\nHost: " + f"{host}:{port}".encode() + b"\r\nUpgrade: websocket\r\n"
+                            b"Connection: Upgrade\r\nSec-WebSocket-Key: " + key + b"\r\nSec-WebSocket-Version: 13\r\n\r\n")
+        while b"\r\n\r\n" not in self.buffer:
+            chunk = self.socket.recv(4096)
+            if not chunk:
+                raise ConnectionError("output bus closed the websocket handshake")
+            self.buffer += chunk
+        response, self.buffer = self.buffer.split(b"\r\n\r\n", 1)
+        if b" 101 " not in response.split(b"\r\n", 1)[0]:
+            raise ConnectionError(response.split(b"\r\n", 1)[0].decode())
+
+    def read_exact(self, n):
+        while len(self.buffer) < n:
+            chunk = self.socket.recv(65536)
+            if not chunk:
+                raise ConnectionError("output bus closed the websocket")
+            self.buffer += chunk
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+    def read_frame(self):
+        first, second = self.read_exact(2)
+        n = second & 0x7F
+        if n == 126:
+            n = struct.unpack(">H", self.read_exact(2))[0]
+        elif n == 127:
+            n = struct.unpack(">Q", self.read_exact(8))[0]
+        return first & 0x0F, self.read_exact(n)
+
+    def receive(self):
+        try:
+            if self.kind == "websocket":
+                opcode, payload = self.read_frame()
+                if opcode == 0x8:
+                    return None
+            else:
+                payload = self.socket.recv(65536)
+        except socket.timeout:
+            return None
+        arrived = time.perf_counter()
+        if self.kind == "osc":
+            _, values = decode_osc(payload)
+            message = dict(zip(DECISION_FIELDS + ("source",), values))
+        else:
+            message = json.loads(payload)
+        message["received"] = arrived
+        self.received += 1
+        return message
+
+    def close(self):
+        self.socket.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print decisions published by the output bus.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--osc", type=int, metavar="PORT", help="listen for OSC/UDP on this port")
+    group.add_argument("--udp", type=int, metavar="PORT", help="listen for json/UDP on this port")
+    group.add_argument("--websocket", metavar="HOST:PORT", help="connect to the bus websocket server")
+    args = parser.parse_args()
+
+    if args.websocket:
+        host, port = parse_target(args.websocket)
+        subscriber = BusSubscriber("websocket", port, host)
+    else:
+        subscriber = BusSubscriber("osc" if args.osc is not None else "udp", args.osc if args.osc is not None else args.udp)
+    print(f"listening ({subscriber.kind}, port {subscriber.port}), ctrl-c to stop")
+    try:
+        while True:
+            message = subscriber.receive()
+            if message is None:
+                continue
+            state = "in range" if message.get("in_range") else "OUT"
+            arousal, lower, upper = (message.get(k) for k in ("arousal", "lower_band", "upper_band"))
+            print(f"t={message.get('time') or 0:8.2f}  arousal={'-' if arousal is None else f'{arousal:.4f}'}  "
+                  f"band=[{lower or 0:.4f}, {upper or 0:.4f}]  {state}{'  artifact' if message.get('artifact') else ''}")
+    except (KeyboardInterrupt, ConnectionError):
+        pass
+    finally:
+        subscriber.close()
+        print(f"{subscriber.received} decisions received")
+
+
+if __name__ == "__main__":
+    main()
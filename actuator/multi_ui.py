@@ -0,0 +1,81 @@
+import streamlit as st
+import pandas as pd
+
+
+#"name, mac-or-serial" per line -> device dicts for StreamManager
+def parse_devices(text):
+    devices = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        name, _, address = (part.strip() for part in line.partition(','))
+        device = {"name": name}
+        if ':' in address:
+            device["mac_address"] = address
+        elif address:
+            device["serial_number"] = address
+        devices.append(device)
+    return devices
+
+
+def render_multi_sidebar():
+    st.sidebar.title("Devices")
+    devices_text = st.sidebar.text_area(
+        "One headset per line: name, MAC or serial",
+        value="Muse A, \nMuse B, ",
+        key="multi_devices_text",
+    )
+    synthetic = st.sidebar.checkbox("Synthetic devices (no hardware)", key="multi_synthetic")
+    col1, col2 = st.sidebar.columns(2)
+    with col1: start_button = st.button("Start All", key="multi_start", use_container_width=True)
+    with col2: stop_button = st.button("Stop All", key="multi_stop", use_container_width=True)
+    return {
+        "devices": parse_devices(devices_text),
+        "synthetic": synthetic,
+        "start_button": start_button,
+        "stop_button": stop_button,
+    }
+
+
+def render_overview(device_names):
+    st.subheader("Group Overview")
+    columns = st.columns(max(1, len(device_names)))
+    device_cards = {}
+    for column, name in zip(columns, device_names):
+        with column:
+            st.write(f"**{name}**")
+            device_cards[name] = {"arousal": st.empty(), "status": st.empty()}
+    st.divider()
+    st.write("**Arousal by Device**")
+    history_chart = st.empty()
+    st.write("**Device Health**")
+    health_table = st.empty()
+    return {"device_cards": device_cards, "history_chart": history_chart, "health_table": health_table}
+
+
+def update_overview(placeholders, health, histories):
+    for row in health:
+        card = placeholders["device_cards"].get(row["device"])
+        if card is None:
+            continue
+        arousal = row["arousal"]
+        card["arousal"].metric("Arousal Index", f"{arousal:+.2f}" if arousal is not None else "--")
+        with card["status"]:
+            if row["status"] == "error":
+                st.error(f"ERROR: {row['error']}")
+            elif row["status"] != "running":
+                st.info(row["status"].upper())
+            elif row["phase"] == "calibration":
+                st.info("CALIBRATING")
+            elif row["artifact"]:
+                st.error("ARTIFACT")
+            elif row["in_range"]:
+                st.success("IN RANGE")
+            else:
+                st.warning("OUT OF RANGE")
+
+    series = {name: pd.Series([d["arousal"] for d in decisions], dtype=float) for name, decisions in histories.items()}
+    if any(len(s) for s in series.values()):
+        placeholders["history_chart"].line_chart(pd.DataFrame(series))
+
+    placeholders["health_table"].dataframe(pd.DataFrame(health).set_index("device").round(2), use_container_width=True)
@@ -0,0 +1,267 @@
+import base64
+import hashlib
+import json
+import math
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque
+import numpy as np
+from streams.osc import encode_osc, parse_target
+
+# what every subscriber gets per decision (a subset of SessionPipeline decision keys)
+DECISION_FIELDS = ("time", "arousal", "lower_band", "upper_band", "in_range", "artifact")
+OSC_ADDRESS = "/muse_cyb/decision"
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+# kernel send buffer per websocket client (~400 decision frames). the os default grows to megabytes, i.e. tens of
+# thousands of stale decisions queued for a stalled client before its bounded outbox starts dropping the oldest
+WS_SEND_BUFFER = 65536
+
+
+#----------------------------------------- websocket (RFC 6455, server side, text frames out only)
+def ws_frame(payload, opcode=0x1):
+    n = len(payload)
+    if n < 126:
+        header = struct.pack(">BB", 0x80 | opcode, n)
+    elif n < 65536:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+# numpy scalars -> python types; NaN -> None so the json stays strict
+def _plain(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+class _WebSocketClient:
+    def __init__(self, conn, queue_size):
+        self.conn = conn
+        self.handshake = b""
+        self.open = False
+        self.outbox = deque(maxlen=queue_size)  # a slow client loses its oldest frames, never blocks the others
+        self.pending = b""
+        self.dropped = 0
+
+
+#fans every controller decision out to external actuators (lights, audio, haptics)
+# osc_targets: OSC over UDP, one message per decision: time, arousal, lower, upper, in_range, artifact
+# udp_targets: the same fields as a compact json datagram
+# websocket_port: local websocket server, json text frame per decision (port 0 -> pick a free one)
+# publish() only serializes once and queues the result; one background thread does every send, so the
+# control loop never waits on a socket however many subscribers there are
+class OutputBus:
+    def __init__(self, osc_targets=(), udp_targets=(), websocket_port=None, host="127.0.0.1",
+                 address=OSC_ADDRESS, source=None, queue_size=64):
+        self.osc_targets = [parse_target(t) if isinstance(t, str) else t for t in osc_targets]
+        self.udp_targets = [parse_target(t) if isinstance(t, str) else t for t in udp_targets]
+        self.address = address
+        self.source = source  # device name added to every message (multi-device setups)
+        self.queue_size = queue_size
+        self.outbox = deque(maxlen=queue_size)
+        self.published = 0
+        self.dropped = 0
+        self.send_errors = 0
+        self.serialize_seconds = 0.0
+        self.serialize_max = 0.0
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.wake_recv, self.wake_send = socket.socketpair()
+        self.wake_recv.setblocking(False)
+        self.wake_send.setblocking(False)
+        self.selector.register(self.wake_recv, selectors.EVENT_READ, "wake")
+        self.listener, self.websocket_port = None, None
+        if websocket_port is not None:
+            self.listener = socket.create_server((host, websocket_port))
+            self.listener.setblocking(False)
+            self.websocket_port = self.listener.getsockname()[1]
+            self.selector.register(self.listener, selectors.EVENT_READ, "accept")
+        self.clients = {}
+        self.lock = threading.Lock()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="output-bus", daemon=True)
+        self.thread.start()
+
+    def message(self, decision):
+        message = {field: decision.get(field) for field in DECISION_FIELDS}
+        if self.source is not None:
+            message["source"] = self.source
+        return message
+
+    def publish(self, decision):
+        start = time.perf_counter()
+        message = self.message(decision)
+        values = [_plain(value) for value in message.values()]
+        osc = encode_osc(self.address, values) if self.osc_targets else None
+        text = None
+        if self.udp_targets or self.listener is not None:
+            text = json.dumps(dict(zip(message, values)), separators=(",", ":"), allow_nan=False).encode()
+        elapsed = time.perf_counter() - start
+        self.serialize_seconds += elapsed
+        self.serialize_max = max(self.serialize_max, elapsed)
+
+        with self.lock:
+            if len(self.outbox) == self.queue_size:
+                self.dropped += 1
+            self.outbox.append((osc, text))
+        self.published += 1
+        try:
+            self.wake_send.send(b"\0")
+        except OSError:
+            pass  # wake pipe full: the thread is awake anyway
+
+    #---------------------------------------------------------- background thread
+    def run(self):
+        while self.running:
+            for key, events in self.selector.select(timeout=0.5):
+                if key.data == "accept":
+                    self.accept()
+                elif key.data == "wake":
+                    try:
+                        while self.wake_recv.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                elif events & selectors.EVENT_READ:
+                    self.read(key.data)  # writable clients are served by deliver() below
+            self.deliver()
+        for client in list(self.clients.values()):
+            self.drop(client)
+        self.selector.close()
+        if self.listener is not None:
+            self.listener.close()
+
+    def deliver(self):
+        with self.lock:
+            messages = list(self.outbox)
+            self.outbox.clear()
+            clients = [client for client in self.clients.values() if client.open]
+        for osc, text in messages:
+            for target in self.osc_targets:
+                self.send(osc, target)
+            for target in self.udp_targets:
+                self.send(text, target)
+            if clients:
+                frame = ws_frame(text)
+                for client in clients:
+                    if len(client.outbox) == self.queue_size:
+                        client.dropped += 1
+                    client.outbox.append(frame)
+        for client in list(self.clients.values()):
+            self.write(client)
+
+    def send(self, data, target):
+        try:
+            self.socket.sendto(data, target)
+        except OSError:  # full buffer / nobody listening -> this decision is lost for that target only
+            self.send_errors += 1
+
+    def accept(self):
+        try:
+            conn, _ = self.listener.accept()
+        except OSError:
+            return
+        conn.setblocking(False)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, WS_SEND_BUFFER)
+        client = _WebSocketClient(conn, self.queue_size)
+        with self.lock:
+            self.clients[conn] = client
+        self.selector.register(conn, selectors.EVENT_READ, client)
+
+    def read(self, client):
+        try:
+            data = client.conn.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(client)
+            return
+        if client.open:
+            if data[0] & 0x0F == 0x8:  # close frame; pings and text from clients are ignored
+                self.drop(client)
+            return
+        client.handshake += data
+        if b"\r\n\r\n" not in client.handshake:
+            return
+        key = next((line.split(b":", 1)[1].strip() for line in client.handshake.split(b"\r\n")
+                    if line.lower().startswith(b"sec-websocket-key:")), None)
+        if key is None:
+            self.drop(client)
+            return
+        accept = base64.b64encode(hashlib.sha1(key + WS_GUID).digest())
+        client.pending = (b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        with self.lock:
+            client.open = True
+
+    # frames wait in the bounded outbox while the previous batch drains, so a stalled client only loses
+    # its oldest decisions and a partially sent frame is never cut
+    def write(self, client):
+        if not client.pending and client.outbox:
+            client.pending = b"".join(client.outbox)
+            client.outbox.clear()
+        if client.pending:
+            try:
+                sent = client.conn.send(client.pending)
+                client.pending = client.pending[sent:]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self.drop(client)
+                return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.pending else 0)
+        try:
+            self.selector.modify(client.conn, events, client)
+        except (KeyError, ValueError):
+            pass
+
+    def drop(self, client):
+        with self.lock:
+            self.clients.pop(client.conn, None)
+        try:
+            self.selector.unregister(client.conn)
+        except (KeyError, ValueError):
+            pass
+        client.conn.close()
+
+    @property
+    def websocket_clients(self):
+        with self.lock:
+            return sum(client.open for client in self.clients.values())
+
+    def stats(self):
+        with self.lock:
+            websocket_dropped = sum(client.dropped for client in self.clients.values())
+        return {
+            'published': self.published,
+            'serialize_us_mean': self.serialize_seconds / self.published * 1e6 if self.published else 0.0,
+            'serialize_us_max': self.serialize_max * 1e6,
+            'queue_dropped': self.dropped,
+            'send_errors': self.send_errors,
+            'websocket_clients': self.websocket_clients,
+            'websocket_dropped': websocket_dropped,
+        }
+
+    def close(self):
+        self.running = False
+        try:
+            self.wake_send.send(b"\0")
+        except OSError:
+            pass
+        self.thread.join(2.0)
+        self.wake_send.close()
+        self.wake_recv.close()
+        self.socket.close()
@@ -1,13 +1,19 @@
 import streamlit as st
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 import numpy as np
-import altair as alt
 import pandas as pd
+from streams.simulated_stream import SIM_DEFAULTS
+from processing.downsample import downsample_frame
+
+#matplotlib is only imported once a plot is actually drawn
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
 
 def create_viability_plot(arousal_value, viability_band, noise_level):
+    plt = _pyplot()
+    import matplotlib.patches as patches
     fig, ax = plt.subplots(figsize=(8, 2))
     bar_min, bar_max = 0.0, 1.0
     bar_range = bar_max - bar_min
@@ -22,69 +28,58 @@ def create_viability_plot(arousal_value, viability_band, noise_level):
     ax.axis('off')
     return fig
 
+#simulation controls; draws into the current container (call it inside `with st.sidebar:`, also from a fragment)
 def render_sim(on_caffeine_click, on_drowsy_click, on_exam_click):
-    st.sidebar.title("Simulation Controls")
+    st.title("Simulation Controls")
 
-    st.session_state.setdefault("state_name", "Calm")
-    st.session_state.setdefault("target_arousal", 0.75)
-    st.session_state.setdefault("natural_flux", 0.10)
-    st.session_state.setdefault("latency", 5)
-    st.session_state.setdefault("sensor_sampling_rate", 20)
-    st.session_state.setdefault("noise_level", 0.005)
-    st.session_state.setdefault("feedback_on", False)
-    st.session_state.setdefault("environmental_threat", 0.0)
-    st.session_state.setdefault("effort_amplification", 4.0)
-    st.session_state.setdefault("kp", 0.30)  
-    st.session_state.setdefault("ki", 0.05)  
-    st.session_state.setdefault("kd", 0.15)  
-    st.session_state.setdefault("controller_type", "P Controller")
+    for key, value in SIM_DEFAULTS.items():
+        st.session_state.setdefault(key, value)
 
-    state_name = st.sidebar.selectbox("Base State", ('Calm', 'Focused', 'Stressed'), key="state_name")
-    target_arousal = st.sidebar.slider("Target Arousal", 0.0, 1.0, key="target_arousal")
-    natural_flux = st.sidebar.slider("Viability Band Width", 0.01, 0.5, key="natural_flux")
-    st.sidebar.divider()
+    state_name = st.selectbox("Base State", ('Calm', 'Focused', 'Stressed'), key="state_name")
+    target_arousal = st.slider("Target Arousal", 0.0, 1.0, key="target_arousal")
+    natural_flux = st.slider("Viability Band Width", 0.01, 0.5, key="natural_flux")
+    st.divider()
     
-    st.sidebar.subheader("Controller Settings")
-    controller_type = st.sidebar.radio(
+    st.subheader("Controller Settings")
+    controller_type = st.radio(
         "Select Controller Type",
         ("P Controller", "PID Controller"),
         key="controller_type"
     )
 
     if controller_type == "P Controller":
-        kp = st.sidebar.slider("Proportional Gain (Kp)", 0.0, 1.0, key="kp")
+        kp = st.slider("Proportional Gain (Kp)", 0.0, 1.0, key="kp")
         ki = st.session_state.get("ki", 0.0)
         kd = st.session_state.get("kd", 0.0)
-        st.sidebar.button("Auto-Tune PID Gains", use_container_width=True, disabled=True)
+        st.button("Auto-Tune PID Gains", use_container_width=True, disabled=True)
         auto_tune_button = False
+        optimize_button = st.button("Optimize Gains (offline)", use_container_width=True, key="optimize_button")
     else: # PID controller
-        kp = st.sidebar.slider("Proportional Gain (Kp)", 0.0, 1.0, key="kp")
-        ki = st.sidebar.slider("Integral Gain (Ki)", 0.0, 0.1, format="%.4f", key="ki")
-        kd = st.sidebar.slider("Derivative Gain (Kd)", 0.0, 1.0, key="kd")
-        auto_tune_button = st.sidebar.button("Auto-Tune PID Gains", use_container_width=True)
+        kp = st.slider("Proportional Gain (Kp)", 0.0, 1.0, key="kp")
+        ki = st.slider("Integral Gain (Ki)", 0.0, 0.1, format="%.4f", key="ki")
+        kd = st.slider("Derivative Gain (Kd)", 0.0, 1.0, key="kd")
+        auto_tune_button = st.button("Auto-Tune PID Gains", use_container_width=True)
+        optimize_button = st.button("Optimize Gains (offline)", use_container_width=True, key="optimize_button")
 
-    st.sidebar.divider()
-    st.sidebar.subheader("System Parameters")
-    latency = st.sidebar.slider("Latency ", 0, 40, key="latency")
-    sensor_sampling_rate = st.sidebar.slider("Sensor_sampling_Rate (Hz)", 5, 50, key="sensor_sampling_rate")
-    effort_amplification = st.sidebar.slider("Effort Amplification", 1.0, 10.0, key="effort_amplification")
-    noise_level = st.sidebar.slider("noise_level", 0.0, 0.1, format="%.3f", key="noise_level")
-    feedback_on = st.sidebar.checkbox("FeedBack", key="feedback_on")
-    st.sidebar.divider()
-    st.sidebar.subheader("Environmental Factors")
-    environmental_threat = st.sidebar.slider("Environmental Distraction / Threat", 0.0, 1.0, key="environmental_threat")
-    st.sidebar.divider()
-    st.sidebar.subheader("Manual Configs")
-    spike_up = st.sidebar.button("Spike Up (Arousal ++)", key="spike_up")
-    spike_down = st.sidebar.button("Spike Down (Arousal --)", key="spike_down")
-    st.sidebar.divider()
-    col1, col2 = st.columns([1, 1])
-    with col1: start_button = st.button("Start Simulation", key="start_button", use_container_width=True)
-    with col2: stop_button = st.button("Stop Simulation", key="stop_button", use_container_width=True)
-    st.sidebar.subheader("Run Extreme Trials")
-    scenario_caffeine = st.sidebar.button("Caffeine shot", on_click=on_caffeine_click)
-    scenario_drowsy = st.sidebar.button("Alcohol", on_click=on_drowsy_click)
-    scenario_exam = st.sidebar.button("Stressful Exam", on_click=on_exam_click)
+    st.divider()
+    st.subheader("System Parameters")
+    latency = st.slider("Latency ", 0, 40, key="latency")
+    sensor_sampling_rate = st.slider("Sensor_sampling_Rate (Hz)", 5, 50, key="sensor_sampling_rate")
+    effort_amplification = st.slider("Effort Amplification", 1.0, 10.0, key="effort_amplification")
+    noise_level = st.slider("noise_level", 0.0, 0.1, format="%.3f", key="noise_level")
+    feedback_on = st.checkbox("FeedBack", key="feedback_on")
+    st.divider()
+    st.subheader("Environmental Factors")
+    environmental_threat = st.slider("Environmental Distraction / Threat", 0.0, 1.0, key="environmental_threat")
+    st.divider()
+    st.subheader("Manual Configs")
+    spike_up = st.button("Spike Up (Arousal ++)", key="spike_up")
+    spike_down = st.button("Spike Down (Arousal --)", key="spike_down")
+    st.divider()
+    st.subheader("Run Extreme Trials")
+    scenario_caffeine = st.button("Caffeine shot", on_click=on_caffeine_click)
+    scenario_drowsy = st.button("Alcohol", on_click=on_drowsy_click)
+    scenario_exam = st.button("Stressful Exam", on_click=on_exam_click)
 
     return {
         "state_name": state_name, "target_arousal": target_arousal,
@@ -92,14 +87,20 @@ def render_sim(on_caffeine_click, on_drowsy_click, on_exam_click):
         "sensor_sampling_rate": sensor_sampling_rate,
         "noise_level": noise_level, "feedback_on": feedback_on,
         "spike_up": spike_up, "spike_down": spike_down,
-        "start_button": start_button, "stop_button": stop_button,
         "environmental_threat": environmental_threat,
         "effort_amplification": effort_amplification,
         "kp": kp, "ki": ki, "kd": kd,
         "auto_tune_button": auto_tune_button,
+        "optimize_button": optimize_button,
         "controller_type": controller_type,
     }
 
+def render_sim_buttons():
+    col1, col2 = st.columns([1, 1])
+    with col1: start_button = st.button("Start Simulation", key="start_button", use_container_width=True)
+    with col2: stop_button = st.button("Stop Simulation", key="stop_button", use_container_width=True)
+    return start_button, stop_button
+
 def render_sim_dashboard():
     live_area = st.container()
     with live_area:
@@ -150,7 +151,7 @@ def update_dashboard(placeholders, arousal, viability_band, history, noise_level
 
     fig = create_viability_plot(arousal, viability_band, noise_level)
     placeholders['plot_placeholder'].pyplot(fig)
-    plt.close(fig)
+    _pyplot().close(fig)
 
     placeholders["fatigue_bar_label"].text(f"Fatigue Level: {fatigue:.0%}")
     placeholders["fatigue_bar"].progress(fatigue)
@@ -168,54 +169,20 @@ def update_dashboard(placeholders, arousal, viability_band, history, noise_level
         placeholders["stressed_interval_metric"].metric("Stressed", f"[{state_intervals['Stressed'][0]:.2f}, {state_intervals['Stressed'][1]:.2f}]")
     
     chart_data = history.rename(columns={"arousal": "Arousal", "lower_band": "Lower Band", "upper_band": "Upper Band"})
-    placeholders["history_chart"].line_chart(chart_data[['Arousal', 'Lower Band', 'Upper Band']])
+    placeholders["history_chart"].line_chart(downsample_frame(chart_data[['Arousal', 'Lower Band', 'Upper Band']]))
+
+def render_sim_analysis(data, target_arousal, sampling_rate=20, session_id=None):
+    from actuator.ui import analyze_history, error_histogram, phase_portrait, render_export
 
-def render_sim_analysis(data, target_arousal, sampling_rate=20):
     st.subheader("Post-Simulation Analysis")
     
-    # calc errors
-    data['Position_Error'] = data['arousal'] - target_arousal
-    data['Velocity'] = data['arousal'].diff().fillna(0)
-    data['Velocity_Error'] = data['Velocity']
-    cost = np.sum(data['Position_Error']**2)
-    
-    # calc time to goal (3s in band)
-    samples_needed = int(3 * sampling_rate)  #3 seconds worth
-    time_to_goal = None
-    energy_at_goal = None
+    # errors, cost and time to goal (3s in band), cached per simulation run
+    analysis = analyze_history(data, target_arousal, sampling_rate, 'in_band', session_id)
+    time_to_goal = analysis['time_to_goal']
+    energy_at_goal = analysis['energy_at_goal']
+    energy_spent_at_goal = analysis['energy_spent_at_goal']
     
-    if 'in_band' in data.columns:
-        in_band_series = data['in_band'].values
-        consecutive_count = 0
-        for i, in_band in enumerate(in_band_series):
-            if in_band:
-                consecutive_count += 1
-                if consecutive_count >= samples_needed:
-                    # time is total time from start to NOW (i)
-                    time_to_goal = (i + 1) / sampling_rate  
-                    if 'energy' in data.columns:
-                        energy_at_goal = data['energy'].iloc[i]
-                    break
-            else:
-                #if out_of_range, reset counter
-                consecutive_count = 0
-    
-    # calc tot energy spent (cumulative)
-    energy_spent_at_goal = None
-    if 'energy_spent' in data.columns:
-        if time_to_goal is not None:
-            goal_sample_index = int(time_to_goal * sampling_rate) - 1
-            energy_spent_at_goal = data['energy_spent'].iloc[:goal_sample_index + 1].sum()
-    
-    # dl CSV btn
-    csv_data = data.to_csv(index=False)
-    st.download_button(
-        label="Download CSV :)",
-        data=csv_data,
-        file_name=f"simulation_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        mime="text/csv",
-        use_container_width=True
-    )
+    render_export(data, session_id or f"simulation_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}", "step")
     
     st.divider()
     
@@ -224,7 +191,7 @@ def render_sim_analysis(data, target_arousal, sampling_rate=20):
     col1, col2 = st.columns(2)
     
     with col1:
-        st.metric("Total Cost (SSE)", f"{cost:.2f}")
+        st.metric("Total Cost (SSE)", f"{analysis['cost']:.2f}")
     
     with col2:
         if time_to_goal is not None:
@@ -250,23 +217,12 @@ def render_sim_analysis(data, target_arousal, sampling_rate=20):
     st.divider()
     
     st.write("**Position Error (Arousal - Target)**")
-    st.line_chart(data['Position_Error'])
+    st.line_chart(analysis['position_chart'])
     st.write("**Velocity Error (Rate of Change of Arousal)**")
-    st.line_chart(data['Velocity_Error'])
+    st.line_chart(analysis['velocity_chart'])
     st.write("**Position Error Distribution**")
-    fig, ax = plt.subplots()
-    ax.hist(data['Position_Error'], bins=30, alpha=0.7, label='Error Distribution')
-    ax.axvline(0, color='red', linestyle='--', label='Target')
-    ax.set_xlabel("Error"); ax.set_ylabel("Frequency"); ax.legend()
-    st.pyplot(fig)
+    st.pyplot(error_histogram(analysis['histogram']))
     st.divider()
     st.write("### Phase Portrait (System Stability)")
     st.write("This plot shows the system's trajectory.")
-    phase_data = data[['Position_Error', 'Velocity_Error']].copy()
-    phase_data['Index'] = range(len(phase_data))
-    chart = alt.Chart(phase_data).mark_point(opacity=0.5, size=10).encode(
-        x=alt.X('Position_Error:Q', title='Position Error'),
-        y=alt.Y('Velocity_Error:Q', title='Velocity Error'),
-        tooltip=['Index:Q', 'Position_Error:Q', 'Velocity_Error:Q']
-    ).interactive()
-    st.altair_chart(chart, use_container_width=True)
\ No newline at end of file
+    st.altair_chart(phase_portrait(analysis, 'Index'), use_container_width=True)
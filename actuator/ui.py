@@ -1,15 +1,21 @@
 import streamlit as st
-from brainflow.board_shim import BoardShim, BoardIds
 import numpy as np
 import pandas as pd
-import altair as alt
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+from processing.downsample import downsample_frame
 
 
+#matplotlib is only imported once a plot is actually drawn
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
 
 #main plot
 def create_viability_plot(arousal_value, viability_band):
+    plt = _pyplot()
+    import matplotlib.patches as patches
     fig, ax = plt.subplots(figsize=(8, 2))
     bar_min, bar_max = viability_band[0] - 1.0, viability_band[1] + 1.0
     bar_range = bar_max - bar_min
@@ -54,6 +60,10 @@ def render_dashboard():
             samples_metric = st.empty()
             st.write("Artifact Rate")
             artifact_rate_metric = st.empty()
+            st.write("Decision Rate")
+            decision_rate_metric = st.empty()
+            st.write("Packet Loss / Jitter")
+            link_metric = st.empty()
         
         st.divider()
         history_chart = st.empty()
@@ -69,6 +79,8 @@ def render_dashboard():
         "session_time_metric": session_time_metric,
         "samples_metric": samples_metric,
         "artifact_rate_metric": artifact_rate_metric,
+        "decision_rate_metric": decision_rate_metric,
+        "link_metric": link_metric,
     }
 
 def update_main_dashboard(placeholders, arousal, viability_band, in_range, artifact_detected, history_df=None, session_stats=None):
@@ -77,7 +89,7 @@ def update_main_dashboard(placeholders, arousal, viability_band, in_range, artif
     # visual sys plot
     fig = create_viability_plot(arousal_value, viability_band)
     placeholders['plot_placeholder'].pyplot(fig)
-    plt.close(fig)
+    _pyplot().close(fig)
     
     # update metrics
     placeholders["arousal_metric"].metric(label="Arousal Index (Log Ratio)", value=f"{arousal_value:+.2f}")
@@ -97,6 +109,11 @@ def update_main_dashboard(placeholders, arousal, viability_band, in_range, artif
         placeholders["session_time_metric"].metric("", f"{session_stats.get('duration', 0):.1f}s")
         placeholders["samples_metric"].metric("", f"{session_stats.get('total_samples', 0)}")
         placeholders["artifact_rate_metric"].metric("", f"{session_stats.get('artifact_rate', 0):.1f}%")
+        if 'decision_rate' in session_stats:
+            placeholders["decision_rate_metric"].metric("", f"{session_stats['decision_rate']:.1f}/s (hop {session_stats['hop']:.2f}s)")
+        if 'stream' in session_stats:
+            link = session_stats['stream']
+            placeholders["link_metric"].metric("", f"{link['drop_rate']:.1%} / {link['jitter_ms']:.1f} ms")
     
     #update history
     if history_df is not None and not history_df.empty:
@@ -105,102 +122,222 @@ def update_main_dashboard(placeholders, arousal, viability_band, in_range, artif
             "lower_band": "Lower Band",
             "upper_band": "Upper Band"
         })
-        placeholders["history_chart"].line_chart(chart_data[['Arousal', 'Lower Band', 'Upper Band']])
+        # bounded point count (min-max per bucket keeps the spikes) however long the history is
+        placeholders["history_chart"].line_chart(downsample_frame(chart_data[['Arousal', 'Lower Band', 'Upper Band']]))
 
 
 
 # GRAPHS
-def render_post_session_analysis(history_df, viability_band, sampling_rate=10):
+#post-session metrics are computed once per session id and shared across reruns (nothing downstream mutates them)
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _cached_analysis(session_id, target, sampling_rate, in_column, _history_df):
+    return analyze_history(_history_df, target, sampling_rate, in_column)
+
+
+def analyze_history(history_df, target, sampling_rate, in_column, session_id=None):
+    from processing.analysis import session_analysis
+    from processing.downsample import CHART_POINTS, lttb_indices, density_grid
+
+    if session_id is not None:
+        return _cached_analysis(session_id, target, sampling_rate, in_column, history_df)
+    column = lambda name: history_df[name].to_numpy() if name in history_df else None
+    analysis = session_analysis(
+        history_df['arousal'].to_numpy(dtype=float), target,
+        in_band=column(in_column), artifact=column('artifact'), sampling_rate=sampling_rate,
+        energy=column('energy'), energy_spent=column('energy_spent'))
+
+    # chart level of detail, cached along with the metrics: lttb keeps the shape of the error lines,
+    # long sessions get the phase portrait as a 2D density instead of one mark per point
+    position_error, velocity_error = analysis['position_error'], analysis['velocity_error']
+    position_rows, velocity_rows = lttb_indices(position_error, CHART_POINTS), lttb_indices(velocity_error, CHART_POINTS)
+    analysis['position_chart'] = pd.Series(position_error[position_rows], index=history_df.index[position_rows], name='Position_Error')
+    analysis['velocity_chart'] = pd.Series(velocity_error[velocity_rows], index=history_df.index[velocity_rows], name='Velocity_Error')
+    analysis['phase_density'] = density_grid(position_error, velocity_error) if len(history_df) > CHART_POINTS else None
+    return analysis
+
+
+#scatter of (position error, velocity error) per sample, or its binned density once the session is long
+def phase_portrait(analysis, index_label):
+    import altair as alt
+
+    if analysis['phase_density'] is not None:
+        density = pd.DataFrame(analysis['phase_density'])
+        return alt.Chart(density).mark_rect().encode(
+            x=alt.X('x:Q', title='Position Error'), x2='x2:Q',
+            y=alt.Y('y:Q', title='Velocity Error'), y2='y2:Q',
+            color=alt.Color('count:Q', title='Samples', scale=alt.Scale(type='log')),
+            tooltip=['count:Q']
+        ).interactive()
+
+    phase_data = pd.DataFrame({
+        'Position_Error': analysis['position_error'],
+        'Velocity_Error': analysis['velocity_error'],
+        index_label: np.arange(len(analysis['position_error'])),
+    })
+    return alt.Chart(phase_data).mark_point(opacity=0.5, size=10).encode(
+        x=alt.X('Position_Error:Q', title='Position Error'),
+        y=alt.Y('Velocity_Error:Q', title='Velocity Error'),
+        tooltip=[f'{index_label}:Q', 'Position_Error:Q', 'Velocity_Error:Q']
+    ).interactive()
+
+
+#error histogram from the precomputed bin counts
+def error_histogram(histogram):
+    plt = _pyplot()
+    fig, ax = plt.subplots()
+    if histogram is not None:
+        counts, edges = histogram
+        ax.hist(edges[:-1], edges, weights=counts, alpha=0.7, label='Error Distribution')
+    ax.axvline(0, color='red', linestyle='--', label='Target')
+    ax.set_xlabel("Error")
+    ax.set_ylabel("Frequency")
+    ax.legend()
+    return fig
+
+
+#download / save of the session tables: built chunk by chunk only when asked for (csv or compressed parquet),
+# "Save to disk" streams straight into files without holding the export in memory
+def render_export(history_df, session_id, index_name, raw=None):
+    from streams.export import available_formats, export_bytes, export_path, frame_chunks, write_chunks
+
+    col1, col2 = st.columns(2)
+    with col1:
+        format = st.radio("Export format", available_formats(), horizontal=True, key="export_format",
+                          format_func=lambda f: {"csv": "CSV", "parquet": "Parquet (zstd)"}[f])
+    with col2:
+        include_raw = raw is not None and raw.samples > 0 and st.checkbox(
+            f"Include raw EEG ({raw.samples} samples)", key="export_raw")
+    mime = "text/csv" if format == "csv" else "application/vnd.apache.parquet"
+    tables = {"data": lambda: frame_chunks(history_df, index_name=index_name)}
+    if include_raw:
+        tables["raw_eeg"] = raw.chunks
+    columns = st.columns(len(tables) + 1)
+    for column, (table, chunks) in zip(columns, tables.items()):
+        with column:
+            st.download_button(
+                label=f"Download {table.replace('_', ' ')} :)",
+                data=lambda chunks=chunks: export_bytes(chunks(), format),
+                file_name=f"{session_id}_{table}.{format}",
+                mime=mime,
+                use_container_width=True,
+                key=f"download_{table}",
+            )
+    with columns[-1]:
+        if st.button("Save to disk", use_container_width=True, key="export_save"):
+            import os
+            paths = [export_path(session_id, table, format) for table in tables]
+            os.makedirs(os.path.dirname(paths[0]), exist_ok=True)
+            for path, chunks in zip(paths, tables.values()):
+                write_chunks(chunks(), path, format)
+            st.success("Saved " + ", ".join(paths))
+
+
+#decisions per second of a history: from its time column (the hop may have changed on the way), else its hop column
+def decision_rate(history_df):
+    if 'time' in history_df and len(history_df) > 1:
+        span = float(history_df['time'].iloc[-1] - history_df['time'].iloc[0])
+        if span > 0:
+            return (len(history_df) - 1) / span
+    if 'hop' in history_df:
+        return 1 / float(history_df['hop'].median())
+    return 10.0
+
+
+def render_post_session_analysis(history_df, viability_band, sampling_rate=None, session_id=None, raw=None):
     if history_df.empty:
         st.info("no data :(")
         return
-    
+    if sampling_rate is None:
+        sampling_rate = decision_rate(history_df)
+
     st.subheader("Post-Session Analysis")
     
-    band_center = np.mean(viability_band)
-    
-    history_df['Position_Error'] = history_df['arousal'] - band_center
-    history_df['Velocity'] = history_df['arousal'].diff().fillna(0)
-    history_df['Velocity_Error'] = history_df['Velocity']
-    
-    # energy cost
-    cost = np.sum(history_df['Position_Error']**2)
-    
-    # calc time to goal (3s in band)
-    samples_needed = int(3 * sampling_rate)
-    time_to_goal = None
-    
-    if 'in_range' in history_df.columns:
-        in_range_series = history_df['in_range'].values
-        consecutive_count = 0
-        for i, in_range in enumerate(in_range_series):
-            if in_range:
-                consecutive_count += 1
-                if consecutive_count >= samples_needed:
-                    time_to_goal = (i + 1) / sampling_rate
-                    break
-            else:
-                consecutive_count = 0
-    
-    # dl CSV btn
-    csv_data = history_df.to_csv(index=True)
-    st.download_button(
-        label="Download CSV :)",
-        data=csv_data,
-        file_name=f"session_data_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        mime="text/csv",
-        use_container_width=True
-    )
+    band_center = float(np.mean(viability_band))
+    analysis = analyze_history(history_df, band_center, sampling_rate, 'in_range', session_id)
+    time_to_goal = analysis['time_to_goal']
+    
+    render_export(history_df, session_id or f"session_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}", "decision", raw)
     
     st.divider()
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Cost", f"{cost:.2f}")
+        st.metric("Total Cost", f"{analysis['cost']:.2f}")
     with col2:
         if time_to_goal is not None:
             st.metric("Time to Reach Goal", f"{time_to_goal:.2f} s")
         else:
             st.metric("Time to Reach Goal", "Not reached")
     with col3:
-        in_range_pct = (history_df['in_range'].sum() / len(history_df) * 100) if 'in_range' in history_df else 0
-        st.metric("Time In Range", f"{in_range_pct:.1f}%")
+        st.metric("Time In Range", f"{analysis['in_band_pct']:.1f}%")
     with col4:
-        artifact_pct = (history_df['artifact'].sum() / len(history_df) * 100) if 'artifact' in history_df else 0
-        st.metric("Artifact Rate", f"{artifact_pct:.1f}%")
+        st.metric("Artifact Rate", f"{analysis['artifact_pct']:.1f}%")
     
     st.divider()
     
     # Position Error graph
     st.write("**Position Error**")
-    st.line_chart(history_df['Position_Error'])
+    st.line_chart(analysis['position_chart'])
     
     # Velocity Error graph
     st.write("**Velocity Error**")
-    st.line_chart(history_df['Velocity_Error'])
+    st.line_chart(analysis['velocity_chart'])
     
     # Position Error distr
     st.write("**Position Error Distribution**")
-    fig, ax = plt.subplots()
-    ax.hist(history_df['Position_Error'], bins=30, alpha=0.7, label='Error Distribution')
-    ax.axvline(0, color='red', linestyle='--', label='Target')
-    ax.set_xlabel("Error")
-    ax.set_ylabel("Frequency")
-    ax.legend()
-    st.pyplot(fig)
+    st.pyplot(error_histogram(analysis['histogram']))
     
     st.divider()
     
-    # phase portrait
     st.write("### Phase Portrait")
     
-    phase_data = history_df[['Position_Error', 'Velocity_Error']].copy()
-    phase_data['Time_Step'] = range(len(phase_data))
-    
-    chart = alt.Chart(phase_data).mark_point(opacity=0.5, size=10).encode(
-        x=alt.X('Position_Error:Q', title='Position Error'),
-        y=alt.Y('Velocity_Error:Q', title='Velocity Error'),
-        tooltip=['Time_Step:Q', 'Position_Error:Q', 'Velocity_Error:Q']
-    ).interactive()
-    
-    st.altair_chart(chart, use_container_width=True)
\ No newline at end of file
+    st.altair_chart(phase_portrait(analysis, 'Time_Step'), use_container_width=True)
+
+#icicle flame graph of a capture: width = share of samples, root (thread) on top, one color per source file
+def flame_graph(nodes):
+    import altair as alt
+
+    flame = pd.DataFrame(nodes)
+    flame['file'] = flame['name'].str.extract(r'\(([^:)]*)', expand=False).fillna(flame['name'])
+    flame['y'] = -flame['depth']
+    flame['y2'] = flame['y'] - 1
+    flame['label'] = [name if width > 0.06 else "" for name, width in zip(flame['name'], flame['x1'] - flame['x0'])]
+    flame['center'] = (flame['x0'] + flame['x1']) / 2
+    base = alt.Chart(flame)
+    rects = base.mark_rect(stroke='white', strokeWidth=0.5).encode(
+        x=alt.X('x0:Q', axis=None, scale=alt.Scale(domain=[0, 1])), x2='x1:Q',
+        y=alt.Y('y:Q', axis=None), y2='y2:Q',
+        color=alt.Color('file:N', legend=None),
+        tooltip=['name:N', 'samples:Q', alt.Tooltip('pct:Q', format='.1f', title='% of samples')]
+    )
+    text = base.mark_text(fontSize=10, limit=140, dy=9).encode(x='center:Q', y='y:Q', text='label:N')
+    return (rects + text).properties(height=18 * (int(flame['depth'].max()) + 1)).interactive(bind_y=False)
+
+
+#result of a SessionProfiler capture: hottest functions (sampled, plus cProfile's exact table) and the flame graph
+def render_profile(result):
+    if result.get('error'):
+        st.error(f"Profile failed: {result['error']}")
+        return
+    st.caption(f"{result['mode']} profile of session {result['session_id']}: {result['seconds']:.1f} s, "
+               f"{result['ticks']} samples of {', '.join(result['threads']) or 'no thread'}. "
+               f"Saved to {', '.join(result['paths'])}")
+    if not result['functions']:
+        st.info("No samples were collected (the session stopped?)")
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("**Hot functions (sampled)**")
+        st.dataframe(pd.DataFrame(result['functions']).rename(columns={'self_pct': 'self %', 'total_pct': 'total %'}),
+                     hide_index=True, use_container_width=True,
+                     column_config={'self %': st.column_config.NumberColumn(format="%.1f"),
+                                    'total %': st.column_config.NumberColumn(format="%.1f")})
+    with col2:
+        if result['cprofile']:
+            st.write("**Session thread (cProfile, by own time)**")
+            st.dataframe(pd.DataFrame(result['cprofile']), hide_index=True, use_container_width=True,
+                         column_config={'own_s': st.column_config.NumberColumn(format="%.4f"),
+                                        'cumulative_s': st.column_config.NumberColumn(format="%.4f"),
+                                        'per_call_ms': st.column_config.NumberColumn(format="%.3f")})
+    st.write("**Flame graph** (width = share of samples, hover for details)")
+    st.altair_chart(flame_graph(result['flame']), use_container_width=True)
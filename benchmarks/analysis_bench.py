@@ -0,0 +1,69 @@
+# post-session analysis on long sessions: the vectorized run-length time-to-goal must match the old per-sample
+# loop on random in-band masks, and the whole analysis of a million-sample session should take well under a second.
+#   python -m benchmarks.analysis_bench
+#   python -m benchmarks.analysis_bench --samples 5000000 --repeats 5
+import argparse
+import time
+import numpy as np
+
+
+# the loop the dashboards used before, kept as the reference
+def loop_time_to_goal(in_band, samples_needed):
+    consecutive_count = 0
+    for i, in_range in enumerate(in_band):
+        if in_range:
+            consecutive_count += 1
+            if consecutive_count >= samples_needed:
+                return i
+        else:
+            consecutive_count = 0
+    return None
+
+
+def main():
+    from processing.analysis import first_run_end, session_analysis
+
+    parser = argparse.ArgumentParser(description="Vectorized post-session analysis vs the per-sample loop.")
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--sampling-rate", type=float, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    # correctness: short random masks with runs around the goal length, including none / all in band
+    mismatches = 0
+    for trial in range(2000):
+        length = int(rng.integers(0, 200))
+        needed = int(rng.integers(1, 40))
+        mask = rng.random(length) < rng.uniform(0, 1) ** 0.3
+        mismatches += first_run_end(mask, needed) != loop_time_to_goal(mask, needed)
+    print(f"time to goal vs reference loop: {mismatches} mismatches in 2000 random masks")
+
+    # a long session: arousal wandering around the target, in band ~80% of the time but never for 3 s straight
+    # (worst case, the loop has to walk every sample)
+    arousal = 0.5 + np.cumsum(rng.normal(0, 0.002, args.samples)) * 0.01 + rng.normal(0, 0.05, args.samples)
+    in_band = np.abs(arousal - 0.5) < 0.065
+    energy = np.linspace(1, 0, args.samples)
+    energy_spent = np.full(args.samples, 1 / args.samples)
+    needed = int(3 * args.sampling_rate)
+
+    start = time.perf_counter()
+    reference = loop_time_to_goal(in_band, needed)
+    loop_seconds = time.perf_counter() - start
+
+    seconds = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        result = session_analysis(arousal, 0.5, in_band=in_band, artifact=in_band, sampling_rate=args.sampling_rate,
+                                  energy=energy, energy_spent=energy_spent)
+        seconds.append(time.perf_counter() - start)
+    ok = mismatches == 0 and result['goal_index'] == reference and np.median(seconds) < 1.0
+    print(f"{args.samples} samples: goal at sample {result['goal_index']} (loop: {reference}), "
+          f"cost {result['cost']:.2f}, in band {result['in_band_pct']:.1f}%")
+    print(f"  full analysis median {np.median(seconds) * 1000:.1f} ms; time-to-goal loop alone {loop_seconds * 1000:.1f} ms")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# cost of the artifact stage: rejected vs clean windows, incremental vs one-shot channel stats; and how often windows
+# are rejected by the per-channel raw-variance check against the former rule (variance of TP9 alone after detrend and
+# 50 Hz notch, no salvage), on synthetic sessions with motion bursts and with mains hum
+#   python -m benchmarks.artifact_bench
+import time
+import numpy as np
+from brainflow.data_filter import DataFilter, DetrendOperations, NoiseTypes
+from processing.processor import Processor
+from processing.artifacts import ArtifactDetector, window_stats
+from streams.synthetic_stream import SyntheticEEGStream
+
+
+def per_call(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+# the check before per-channel stats: channel 0 only, after the same filtering as the band powers
+def former_rejects(window, processor):
+    channel = window[0].copy()
+    DataFilter.detrend(channel, DetrendOperations.CONSTANT.value)
+    DataFilter.remove_environmental_noise(channel, processor.sampling_rate, NoiseTypes.FIFTY.value)
+    return np.var(channel) > processor.motion_threshold
+
+
+# share of 2 s windows (0.1 s hop) rejected by each rule, and of channels flagged by the current one
+def rejection_rates(artifact_rate, mains_uv=0.0, seconds=120, seed=0):
+    processor = Processor()
+    stream = SyntheticEEGStream(seed=seed, artifact_rate=artifact_rate)
+    data = np.concatenate([stream.generate(stream.chunk_size)
+                           for _ in range(int(seconds * stream.sampling_rate / stream.chunk_size))], axis=1)
+    data += mains_uv * np.sin(2 * np.pi * 50.0 * np.arange(data.shape[1]) / stream.sampling_rate)
+    window, hop = processor.window_samples, int(processor.sampling_rate * 0.1)
+    former = current = flagged = 0
+    starts = range(0, data.shape[1] - window + 1, hop)
+    for start in starts:
+        chunk = data[:, start:start + window]
+        former += former_rejects(chunk, processor)
+        bad = processor.detect_bad_channels(window_stats(chunk))
+        flagged += bad.mean()
+        current += (bad[processor.posterior_channel_indices].all() or bad[processor.frontal_channel_indices].all())
+    return former / len(starts), current / len(starts), flagged / len(starts)
+
+
+def main(repeats=300):
+    processor = Processor()
+    stream = SyntheticEEGStream(seed=0)
+    window_samples = processor.sampling_rate * processor.eeg_window_size
+    clean = stream.generate(window_samples)
+    noisy = clean.copy()
+    noisy[:] += np.random.default_rng(0).normal(0, 500, noisy.shape)  # every channel bad
+
+    print("process_eeg per window")
+    print(f"  clean window        {per_call(lambda: processor.process_eeg(clean.copy()), repeats):9.1f} us")
+    print(f"  rejected window     {per_call(lambda: processor.process_eeg(noisy.copy()), repeats):9.1f} us")
+
+    hop = int(processor.sampling_rate * 0.1)
+    detector = ArtifactDetector(clean.shape[0], window_samples)
+    detector.push(clean)
+    chunk = stream.generate(hop)
+    print("channel stats per hop")
+    print(f"  window_stats        {per_call(lambda: window_stats(clean), repeats):9.1f} us")
+    print(f"  ArtifactDetector    {per_call(lambda: (detector.push(chunk), detector.stats()), repeats):9.1f} us")
+
+    print(f"windows rejected at motion_threshold {processor.motion_threshold:g} (former rule / per-channel; channels flagged)")
+    for label, options in (("clean", {"artifact_rate": 0.0}), ("bursts 0.5%", {"artifact_rate": 0.005}),
+                           ("bursts 2%", {"artifact_rate": 0.02}), ("50 Hz hum 100 uV", {"artifact_rate": 0.0, "mains_uv": 100.0}),
+                           ("50 Hz hum 150 uV", {"artifact_rate": 0.0, "mains_uv": 150.0})):
+        former, current, flagged = rejection_rates(**options)
+        print(f"  {label:<18} {former:6.1%} / {current:6.1%}; {flagged:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
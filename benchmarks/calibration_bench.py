@@ -0,0 +1,65 @@
+# calibration early stop: how often the Q1/Q3 standard-error rule finishes before the sample budget, and how far the
+# early band edges are from the band of the full budget (in IQRs of the full band), on synthetic baselines over
+# several seeds, arousal levels and hop lengths. consecutive hops of a 2 s window overlap and are EMA-smoothed, so
+# short hops add little new information and the rule (rightly) waits longer there.
+#   python -m benchmarks.calibration_bench
+#   python -m benchmarks.calibration_bench --budget 300 --hops 0.1 0.5 1.0 --tolerance 0.2
+import argparse
+import numpy as np
+
+
+# clean calibration values (smoothed index) of `count` hops on a steady synthetic baseline
+def baseline(seed, arousal, hop_seconds, count):
+    from processing.processor import Processor
+    from streams.synthetic_stream import SyntheticEEGStream
+
+    processor = Processor(hop_seconds=hop_seconds)
+    stream = SyntheticEEGStream(seed=seed, arousal=arousal)
+    hop, window = int(round(processor.sampling_rate * hop_seconds)), processor.window_samples
+    data = stream.generate(window + hop * count)
+    values = []
+    for i in range(count):
+        value, artifact, _ = processor.process_eeg(data[:, i * hop:i * hop + window].copy())
+        if value is not None and not artifact:
+            values.append(value)
+    return np.array(values)
+
+
+def main():
+    from processing.quantile import CalibrationBuffer
+
+    parser = argparse.ArgumentParser(description="Early finish of the calibration against its full sample budget.")
+    parser.add_argument("--budget", type=int, default=80, help="clean hops at most (SessionPipeline calibration_samples)")
+    parser.add_argument("--min-samples", type=int, default=30)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed Q1/Q3 standard error, fraction of the IQR")
+    parser.add_argument("--hops", type=float, nargs="+", default=[0.1, 0.25, 0.5, 1.0])
+    parser.add_argument("--seeds", type=int, default=6)
+    args = parser.parse_args()
+
+    print(f"budget {args.budget} clean hops, tolerance {args.tolerance} IQR, {args.seeds} seeds x arousal 0.1 / 0.5 / 0.8")
+    print(f"{'hop s':>6} {'early':>7} {'median stop':>12} {'edge shift median':>18} {'max':>6}")
+    ok = True
+    for hop_seconds in args.hops:
+        stops, shifts = [], []
+        for seed in range(args.seeds):
+            for arousal in (0.1, 0.5, 0.8):
+                values = baseline(seed, arousal, hop_seconds, args.budget)
+                buffer = CalibrationBuffer(min_samples=args.min_samples, tolerance=args.tolerance, max_samples=args.budget)
+                for value in values:
+                    if buffer.update(value):
+                        break
+                full = np.percentile(values, [25, 75])
+                stops.append(buffer.count)
+                if buffer.count < len(values):
+                    shifts.append(float(np.max(np.abs(np.array(buffer.band) - full)) / (full[1] - full[0])))
+        early = len(shifts)
+        # an early band should sit well inside the spread the rule allowed for
+        ok &= all(shift <= 3 * args.tolerance for shift in shifts)
+        stopped = [stop for stop in stops if stop < args.budget]
+        print(f"{hop_seconds:6.2f} {early:3d}/{len(stops):<3d} {np.median(stopped) if stopped else float('nan'):12.0f} "
+              f"{np.median(shifts) if shifts else 0.0:17.2f}  {max(shifts, default=0.0):6.2f}")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# streaming Controller.update_state vs the vectorized evaluate_batch on a long session:
+# checks both give exactly the same states, then times one pass and a hysteresis-threshold sweep.
+#   python -m benchmarks.controller_bench
+#   python -m benchmarks.controller_bench --csv decisions.csv --thresholds 5 10 20 30 60
+import argparse
+import time
+import numpy as np
+
+
+def synthetic_session(hops, seed):
+    # slow wander + noise around the band, ~5% artifact hops, a few missing values
+    rng = np.random.default_rng(seed)
+    arousal = 0.5 + 0.1 * np.sin(np.arange(hops) / 300) + rng.normal(0, 0.05, hops)
+    arousal[rng.random(hops) < 0.01] = np.nan
+    artifact = rng.random(hops) < 0.05
+    return arousal, artifact, (0.45, 0.55)
+
+
+def load_csv(path):
+    import pandas as pd
+
+    # headless.py decisions: replay the logged arousal against the logged bands (artifact hops are ignored anyway)
+    df = pd.read_csv(path)
+    df = df[df["phase"] == "control"]
+    return df["arousal"].to_numpy(float), df["artifact"].to_numpy(bool), (df["lower_band"].to_numpy(float), df["upper_band"].to_numpy(float))
+
+
+def run_streaming(arousal, artifact, band, threshold):
+    from controller.logic import Controller
+
+    controller = Controller()
+    controller.hysteresis_threshold = threshold
+    lower, upper = (np.broadcast_to(b, arousal.shape) for b in band)
+    in_range, last_good = np.empty(len(arousal), bool), np.empty(len(arousal))
+    for i, value in enumerate(arousal):
+        in_range[i], last_good[i] = controller.update_state(None if np.isnan(value) else value, (lower[i], upper[i]), artifact[i])
+    return in_range, last_good
+
+
+def main():
+    from controller.logic import evaluate_batch
+
+    parser = argparse.ArgumentParser(description="Compare streaming and batch controller evaluation.")
+    parser.add_argument("--csv", help="headless.py eeg decisions csv to replay (default: synthetic session)")
+    parser.add_argument("--hops", type=int, default=360000, help="synthetic session length (10 hops/s -> 10 h)")
+    parser.add_argument("--thresholds", type=int, nargs="+", default=list(range(0, 101)))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    arousal, artifact, band = load_csv(args.csv) if args.csv else synthetic_session(args.hops, args.seed)
+    print(f"{len(arousal)} hops, {int(artifact.sum())} artifacts")
+
+    start = time.perf_counter()
+    stream_in_range, stream_last_good = run_streaming(arousal, artifact, band, 30)
+    stream_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_in_range, batch_last_good, _ = evaluate_batch(arousal, band, artifact, 30)
+    batch_seconds = time.perf_counter() - start
+
+    identical = np.array_equal(stream_in_range, batch_in_range) and np.array_equal(stream_last_good, batch_last_good)
+    print(f"one pass: streaming {stream_seconds * 1000:.1f} ms, batch {batch_seconds * 1000:.1f} ms "
+          f"({stream_seconds / batch_seconds:.0f}x), identical: {identical}")
+
+    thresholds = np.array(args.thresholds)
+    start = time.perf_counter()
+    sweep, _, _ = evaluate_batch(arousal, band, artifact, thresholds)
+    sweep_seconds = time.perf_counter() - start
+    # spot-check a few rows of the sweep against the streaming controller
+    for row in np.linspace(0, len(thresholds) - 1, min(3, len(thresholds))).astype(int):
+        identical &= np.array_equal(sweep[row], run_streaming(arousal, artifact, band, int(thresholds[row]))[0])
+    print(f"{len(thresholds)} thresholds in one call: {sweep_seconds * 1000:.1f} ms "
+          f"(streaming would take ~{stream_seconds * len(thresholds):.1f} s), identical: {identical}")
+    for threshold, row in list(zip(thresholds, sweep))[::max(1, len(thresholds) // 10)]:
+        switches = int(np.count_nonzero(np.diff(row.astype(np.int8))))
+        print(f"  threshold {threshold:4d}: in range {row.mean():6.1%}, {switches} state changes")
+    raise SystemExit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# checks that the decimated path (256 -> 128 / 64 Hz) gives the same arousal index as the full-rate path,
+# and what it saves per hop.
+# the decimated data lags by the anti-alias filter's group delay, so each full-rate window is taken
+# that many samples earlier -> both paths see the same stretch of eeg.
+#   python -m benchmarks.decimation_bench
+#   python -m benchmarks.decimation_bench --factors 2 4 --seconds 120 --tolerance 0.1
+import argparse
+import time
+import numpy as np
+
+
+def make_recording(seconds, seed, sampling_rate):
+    from streams.synthetic_stream import SyntheticEEGStream
+
+    # slow arousal sweep, so the index moves across the whole band
+    stream = SyntheticEEGStream(sampling_rate=sampling_rate, seed=seed)
+    chunks = []
+    for second in range(int(seconds)):
+        stream.set_arousal(0.5 + 0.45 * np.sin(2 * np.pi * second / 40))
+        chunks.append(stream.generate(sampling_rate))
+    return np.concatenate(chunks, axis=1)
+
+
+def run_path(data, window_ends, window_samples, sampling_rate):
+    from processing.processor import Processor
+
+    processor = Processor(sampling_rate=sampling_rate)
+    raw, smoothed, seconds = [], [], 0.0
+    for end in window_ends:
+        start = time.perf_counter()
+        arousal, _, _ = processor.process_eeg(data[:, end - window_samples:end].copy())
+        seconds += time.perf_counter() - start
+        raw.append(processor.last_features.get(processor.selected_feature))
+        smoothed.append(arousal)
+    return np.array(raw, dtype=float), np.array(smoothed, dtype=float), seconds / len(window_ends)
+
+
+def compare(data, sampling_rate, factor, hop_seconds, window_seconds, chunk_size):
+    from processing.decimation import PolyphaseDecimator
+
+    decimator = PolyphaseDecimator(factor, sampling_rate)
+    delay = (len(decimator.taps) - 1) // 2  # in input samples
+
+    # stream the recording through the decimator in chunks, like a live board would deliver it
+    start = time.perf_counter()
+    decimated = np.concatenate([decimator.process(data[:, i:i + chunk_size]) for i in range(0, data.shape[1], chunk_size)], axis=1)
+    decimation_seconds = time.perf_counter() - start
+
+    hop = int(round(hop_seconds * sampling_rate / factor)) * factor
+    window = int(round(window_seconds * sampling_rate / factor)) * factor
+    ends = np.arange(window + delay + hop, data.shape[1] - factor, hop)
+    hops = len(ends)
+
+    full_raw, full, full_ms = run_path(data, ends - delay, window, sampling_rate)
+    low_raw, low, low_ms = run_path(decimated, ends // factor, window // factor, sampling_rate // factor)
+
+    lower, upper = np.percentile(full, [25, 75])
+    band = upper - lower
+    in_full = (full >= lower) & (full <= upper)
+    in_low = (low >= lower) & (low <= upper)
+    return {
+        'factor': factor,
+        'rate': sampling_rate / factor,
+        'taps': len(decimator.taps),
+        'delay_ms': decimator.delay_seconds * 1000,
+        'hops': hops,
+        'max_error_raw': float(np.max(np.abs(full_raw - low_raw))),
+        'max_error': float(np.max(np.abs(full - low))),
+        'band_width': float(band),
+        'max_error_band': float(np.max(np.abs(full - low)) / band),
+        'correlation': float(np.corrcoef(full, low)[0, 1]),
+        'decision_agreement': float(np.mean(in_full == in_low)),
+        'full_ms': full_ms * 1000,
+        'decimated_ms': low_ms * 1000 + decimation_seconds / hops * 1000,
+    }
+
+
+def main():
+    from streams.board_info import get_board_info
+
+    parser = argparse.ArgumentParser(description="Compare the decimated arousal path with the full-rate one.")
+    parser.add_argument("--factors", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--seconds", type=float, default=120)
+    parser.add_argument("--hop", type=float, default=0.1)
+    parser.add_argument("--window", type=float, default=2.0)
+    parser.add_argument("--chunk-size", type=int, default=12, help="samples per streamed chunk (muse packets are 12)")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed smoothed-index error, as a fraction of the Q1-Q3 band")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sampling_rate = get_board_info()["sampling_rate"]
+    data = make_recording(args.seconds, args.seed, sampling_rate)
+    failed = False
+    for factor in args.factors:
+        r = compare(data, sampling_rate, factor, args.hop, args.window, args.chunk_size)
+        ok = r['max_error_band'] <= args.tolerance
+        failed |= not ok
+        print(f"{sampling_rate} -> {r['rate']:.0f} Hz ({r['taps']} taps, +{r['delay_ms']:.0f} ms delay), {r['hops']} hops")
+        print(f"  max |error|  raw {r['max_error_raw']:.4f}  smoothed {r['max_error']:.4f} "
+              f"= {r['max_error_band']:.1%} of the band  corr {r['correlation']:.5f}  "
+              f"same in/out decision {r['decision_agreement']:.1%}  -> {'OK' if ok else 'FAIL'}")
+        print(f"  per hop: full rate {r['full_ms']:.2f} ms, decimated {r['decimated_ms']:.2f} ms "
+              f"({r['full_ms'] / r['decimated_ms']:.1f}x)")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
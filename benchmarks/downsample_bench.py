@@ -0,0 +1,72 @@
+# chart level of detail on long sessions: min-max and lttb must return a bounded number of points that still
+# contain every injected spike, the phase density a bounded number of cells; also times a dashboard tick
+# (downsampled snapshot of the whole columnar history) and the cost of appending a decision.
+#   python -m benchmarks.downsample_bench
+#   python -m benchmarks.downsample_bench --samples 5000000 --points 2000
+import argparse
+import time
+import numpy as np
+
+
+def timed(function, repeats=5):
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - start)
+    return result, np.median(seconds) * 1000
+
+
+def main():
+    from processing.downsample import minmax_indices, lttb_indices, density_grid, DENSITY_BINS
+    from streams.history import ColumnarHistory
+
+    parser = argparse.ArgumentParser(description="Downsampling of history charts and phase portraits.")
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--points", type=int, default=1500)
+    parser.add_argument("--spikes", type=int, default=40, help="single-sample excursions hidden in the series")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    arousal = 0.5 + 0.1 * np.sin(np.arange(args.samples) / 5000) + rng.normal(0, 0.02, args.samples)
+    # one spike per stretch of samples // spikes, so no two share a downsampling bucket
+    stretch = args.samples // args.spikes
+    spikes = np.arange(args.spikes) * stretch + rng.integers(0, stretch, args.spikes)
+    arousal[spikes] += rng.choice([-1, 1], args.spikes) * rng.uniform(0.5, 1.0, args.spikes)
+    gaps = rng.choice(np.setdiff1d(np.arange(args.samples), spikes), 100, replace=False)
+    arousal[gaps] = np.nan  # artifact gaps
+    ok = True
+
+    indices, minmax_ms = timed(lambda: minmax_indices(arousal, args.points))
+    kept = np.isin(spikes, indices).sum()
+    ok &= len(indices) <= args.points and kept == args.spikes
+    print(f"min-max: {args.samples} -> {len(indices)} points in {minmax_ms:.1f} ms, {kept}/{args.spikes} spikes kept")
+
+    indices, lttb_ms = timed(lambda: lttb_indices(arousal, args.points), repeats=3)
+    kept = np.isin(spikes, indices).sum()
+    ok &= len(indices) <= args.points and kept >= 0.9 * args.spikes
+    print(f"lttb:    {args.samples} -> {len(indices)} points in {lttb_ms:.1f} ms, {kept}/{args.spikes} spikes kept")
+
+    velocity = np.diff(arousal, prepend=arousal[0])
+    density, density_ms = timed(lambda: density_grid(arousal - 0.5, velocity))
+    ok &= len(density['count']) <= DENSITY_BINS ** 2 and density['count'].sum() == np.isfinite(velocity).sum()
+    print(f"phase density: {len(density['count'])} cells (<= {DENSITY_BINS ** 2}) for {int(density['count'].sum())} points "
+          f"in {density_ms:.1f} ms")
+
+    history = ColumnarHistory()
+    rows = [{'arousal': value, 'lower_band': 0.45, 'upper_band': 0.55, 'in_range': bool(0.45 <= value <= 0.55),
+             'artifact': bool(np.isnan(value))} for value in arousal]
+    start = time.perf_counter()
+    for row in rows:
+        history.append(row)
+    append_us = (time.perf_counter() - start) / len(rows) * 1e6
+    frame, tick_ms = timed(lambda: history.downsampled(("arousal", "lower_band", "upper_band"), args.points))
+    ok &= len(frame) <= args.points and np.isin(spikes, frame.index).all()
+    print(f"columnar history: {append_us:.2f} us per appended decision; dashboard tick over {len(history)} decisions: "
+          f"{len(frame)} rows in {tick_ms:.1f} ms")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
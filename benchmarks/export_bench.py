@@ -0,0 +1,97 @@
+# session export on a long session: the chunked csv / parquet writers against building the whole to_csv string,
+# peak extra memory (python heap via tracemalloc plus arrow's own allocator) and time for each, the written files must read back to the same table.
+#   python -m benchmarks.export_bench
+#   python -m benchmarks.export_bench --decisions 1000000 --chunk-rows 100000
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+
+# timed untraced, then run again under tracemalloc for the peak (tracing slows python-level code a lot). tracemalloc
+# does not see arrow's allocator, so the rerun also goes through a fresh proxy of arrow's default pool and returns
+# the python and arrow peaks separately
+def measure(function):
+    import pyarrow as pa
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    default = pa.default_memory_pool()
+    pool = pa.proxy_memory_pool(default)
+    pa.set_memory_pool(pool)
+    tracemalloc.start()
+    try:
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        pa.set_memory_pool(default)
+    return result, seconds, peak / 1e6, pool.max_memory() / 1e6
+
+
+def main():
+    import pandas as pd
+    from streams.export import TableWriter, export_bytes, frame_chunks, write_chunks
+    from streams.history import ColumnarHistory, EEGRecording
+
+    parser = argparse.ArgumentParser(description="Chunked csv / parquet export vs a full to_csv string.")
+    parser.add_argument("--decisions", type=int, default=200_000)
+    parser.add_argument("--chunk-rows", type=int, default=65536)
+    parser.add_argument("--raw-seconds", type=float, default=600, help="raw eeg to export (256 Hz, 4 channels)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    history = ColumnarHistory()
+    arousal = 0.5 + rng.normal(0, 0.05, args.decisions)
+    for i, value in enumerate(arousal):
+        history.append({'time': i / 10, 'arousal': value, 'lower_band': 0.45, 'upper_band': 0.55,
+                        'in_range': bool(0.45 <= value <= 0.55), 'artifact': False, 'feature_alpha_beta': value})
+    frame = history.frame()
+    ok = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        _, seconds, peak, arrow = measure(lambda: frame.to_csv(index=True).encode())
+        print(f"{args.decisions} decisions, full to_csv string: {seconds:.2f} s, peak {peak:.0f} MB python + {arrow:.1f} MB arrow")
+        for format in ("csv", "parquet"):
+            path = os.path.join(directory, f"data.{format}")
+            _, seconds, peak, arrow = measure(lambda: write_chunks(frame_chunks(frame, args.chunk_rows), path, format, args.chunk_rows))
+            back = pd.read_csv(path) if format == "csv" else pd.read_parquet(path)
+            same = np.allclose(back['arousal'].to_numpy(), frame['arousal'].to_numpy()) and len(back) == len(frame)
+            ok &= same
+            print(f"  chunked {format:<7} to disk: {seconds:.2f} s, peak {peak:.0f} MB python + {arrow:.1f} MB arrow, "
+                  f"{os.path.getsize(path) / 1e6:.1f} MB file, reads back: {same}")
+        _, seconds, peak, arrow = measure(lambda: export_bytes(frame_chunks(frame, args.chunk_rows), "parquet"))
+        print(f"  parquet download bytes: {seconds:.2f} s, peak {peak:.0f} MB python + {arrow:.1f} MB arrow")
+
+        # calibration first: in_range and the features are all None in the first row group, typed by COLUMN_TYPES
+        path = os.path.join(directory, "calibrating.parquet")
+        writer = TableWriter(path, "parquet", chunk_rows=4)
+        for i in range(12):
+            calibrating = i < 4
+            writer.write_row({'time': i / 10, 'phase': "calibrating" if calibrating else "running",
+                              'in_range': None if calibrating else i % 2 == 0,
+                              'feature_alpha_beta': None if calibrating else 0.5})
+        writer.close()
+        back = pd.read_parquet(path)
+        same = len(back) == 12 and back['in_range'].iloc[4:].tolist() == [i % 2 == 0 for i in range(4, 12)]
+        ok &= same
+        print(f"all-None columns in the first parquet chunk, then values: reads back: {same}")
+
+        raw = EEGRecording(["TP9", "AF7", "AF8", "TP10"], 256)
+        for _ in range(int(args.raw_seconds * 256 / 12)):
+            raw.append(rng.normal(0, 20, (4, 12)))
+        path = os.path.join(directory, "raw.parquet")
+        _, seconds, peak, arrow = measure(lambda: write_chunks(raw.chunks(args.chunk_rows), path, "parquet"))
+        back = pd.read_parquet(path)
+        same = len(back) == raw.samples and np.array_equal(back['TP9'].to_numpy(), np.concatenate(raw.blocks, axis=1)[0])
+        ok &= same
+        print(f"raw eeg {raw.samples} samples to parquet: {seconds:.2f} s, peak {peak:.0f} MB python + {arrow:.1f} MB arrow, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB file, reads back: {same}")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# golden-output regression check: replays the stored eeg recordings (benchmarks/golden/recordings/*.npy, channel-major)
+# and seeded simulator runs as fast as the code allows, and compares every decision against the stored golden outputs
+# -> arousal within tolerance, in-range states and artifact flags identical (or within --max-flips).
+# the same run reports the throughput change against the throughput stored with the goldens (same machine assumed).
+#   python -m benchmarks.golden
+#   python -m benchmarks.golden --cases sim: --repeats 5
+#   python -m benchmarks.golden --update                  # after an intended change in decisions
+#   python -m benchmarks.golden --max-slowdown 0.2        # also fail when a case got >20% slower
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import os
+import platform
+import time
+import numpy as np
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+RECORDING_DIR = os.path.join(GOLDEN_DIR, "recordings")
+SIM_STEPS = 4000
+
+# pipeline settings replayed on every recording; adaptive hop is left out on purpose (it follows cpu time)
+EEG_CONFIGS = {
+    "calibrated": {},
+    "predictive": {"predictive": True},
+}
+SIM_FEEDBACK = {
+    "p": {"feedback_on": True, "controller_type": "P Controller"},
+    "pid": {"feedback_on": True, "controller_type": "PID Controller"},
+}
+
+
+#the default recording: seeded synthetic eeg with a slow arousal sweep and motion bursts, written once and then
+# only ever read, so a change to SyntheticEEGStream does not move the goldens
+def write_default_recording(path, seconds=60, seed=7):
+    from streams.synthetic_stream import SyntheticEEGStream
+
+    stream = SyntheticEEGStream(chunk_size=32, artifact_rate=0.02, seed=seed)
+    chunks = []
+    for i in range(int(seconds * stream.sampling_rate / stream.chunk_size)):
+        stream.set_arousal(0.5 + 0.35 * np.sin(i / 120))
+        chunks.append(stream.get_data())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.save(path, np.concatenate(chunks, axis=1).astype(np.float32))
+    print(f"wrote recording {path}")
+
+
+def replay_eeg(data, config):
+    from processing.processor import Processor
+    from processing.pipeline import SessionPipeline
+    from controller.logic import Controller
+
+    controller = Controller()
+    if config.get("predictive"):
+        from controller.estimator import PredictiveEstimator
+        controller.estimator = PredictiveEstimator()
+    pipeline = SessionPipeline(processor=Processor(), controller=controller)
+    chunk = config.get("chunk_size", 32)
+    decisions = []
+    for start in range(0, data.shape[1], chunk):
+        decisions.extend(pipeline.push(data[:, start:start + chunk]))
+    return {
+        'arousal': np.array([np.nan if d['arousal'] is None else d['arousal'] for d in decisions]),
+        'in_range': np.array([bool(d['in_range']) for d in decisions]),
+        'artifact': np.array([bool(d['artifact']) for d in decisions]),
+    }, data.shape[1] / pipeline.sampling_rate
+
+
+def replay_sim(controls, seed, auto_tune=False):
+    from streams.simulated_stream import SIM_DEFAULTS, run_simulation
+
+    rows = run_simulation(controls, SIM_STEPS, seed=seed, auto_tune=auto_tune)
+    columns = {
+        'arousal': np.array([row['arousal'] for row in rows], dtype=float),
+        'in_range': np.array([row['in_band'] for row in rows], dtype=bool),
+        'energy': np.array([row['energy'] for row in rows], dtype=float),
+        'fatigue': np.array([row['fatigue'] for row in rows], dtype=float),
+    }
+    return columns, SIM_STEPS / {**SIM_DEFAULTS, **controls}["sensor_sampling_rate"]
+
+
+#name -> function returning (columns, data seconds); each must give the same columns on every call
+def build_cases():
+    from streams.simulated_stream import SIM_SCENARIOS
+
+    cases = {}
+    for file in sorted(os.listdir(RECORDING_DIR)) if os.path.isdir(RECORDING_DIR) else []:
+        if file.endswith(".npy"):
+            name = file[:-4]
+            for config_name, config in EEG_CONFIGS.items():
+                cases[f"eeg:{name}:{config_name}"] = (lambda path=os.path.join(RECORDING_DIR, file), config=config:
+                                                      replay_eeg(np.load(path), config))
+    for scenario, overrides in {"baseline": {}, **SIM_SCENARIOS}.items():
+        for feedback, controls in SIM_FEEDBACK.items():
+            cases[f"sim:{scenario}:{feedback}"] = (lambda controls={**overrides, **controls}: replay_sim(controls, seed=11))
+    cases["sim:baseline:autotune"] = lambda: replay_sim(SIM_FEEDBACK["pid"], seed=11, auto_tune=True)
+    return cases
+
+
+# best of `repeats` runs (outputs of the first one), so a busy machine does not read as a slowdown
+def run_case(function, repeats):
+    best, result = None, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        # calibration / auto-tuner progress prints would flood the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            output = function()
+        seconds = time.perf_counter() - start
+        if result is None:
+            result = output
+        best = seconds if best is None else min(best, seconds)
+    columns, data_seconds = result
+    return columns, {'rows': len(columns['arousal']), 'seconds': best, 'rows_per_second': len(columns['arousal']) / best,
+                     'realtime_factor': data_seconds / best}
+
+
+#drift of one case: float columns against atol + rtol * |golden| (NaN == NaN), bool columns as flip counts
+def compare(columns, golden, atol, rtol):
+    drift = {}
+    for name, expected in golden.items():
+        actual = columns.get(name)
+        if actual is None or len(actual) != len(expected):
+            drift[name] = {'length': None if actual is None else len(actual), 'expected_length': len(expected)}
+            continue
+        if expected.dtype == bool:
+            wrong = actual != expected
+            drift[name] = {'flips': int(wrong.sum())}
+        else:
+            both_nan = np.isnan(actual) & np.isnan(expected)
+            error = np.where(both_nan, 0.0, np.abs(actual - expected))
+            wrong = ~(error <= atol + rtol * np.abs(np.nan_to_num(expected)))
+            drift[name] = {'max_error': float(np.nanmax(error)) if len(error) else 0.0, 'outside': int(wrong.sum())}
+        drift[name]['first'] = int(np.argmax(wrong)) if wrong.any() else None
+    return drift
+
+
+def passed(drift, max_flips):
+    for name, result in drift.items():
+        if 'length' in result or result.get('outside'):
+            return False
+        if 'flips' in result and result['flips'] > max_flips:
+            return False
+    return True
+
+
+def describe(drift):
+    parts = []
+    for name, result in drift.items():
+        if 'length' in result:
+            parts.append(f"{name} {result['length']} rows (golden {result['expected_length']})")
+        elif 'flips' in result:
+            parts.append(f"{name} {result['flips']} flips")
+        else:
+            parts.append(f"{name} max|d| {result['max_error']:.1e}" + (f" ({result['outside']} out)" if result['outside'] else ""))
+        if result.get('first') is not None:
+            parts[-1] += f" from #{result['first']}"
+    return ", ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay stored recordings and seeded simulations against golden outputs.")
+    parser.add_argument("--cases", nargs="+", default=["*"], help="case name patterns (fnmatch, prefix also works), e.g. eeg:* sim:exam:*")
+    parser.add_argument("--update", action="store_true", help="store the current outputs and throughput as the new goldens")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per case, the fastest one counts")
+    parser.add_argument("--atol", type=float, default=1e-9)
+    parser.add_argument("--rtol", type=float, default=1e-6)
+    parser.add_argument("--max-flips", type=int, default=0, help="in-range / artifact decisions allowed to differ per case")
+    parser.add_argument("--max-slowdown", type=float, help="fail when a case's throughput dropped by more than this fraction")
+    args = parser.parse_args()
+
+    default_recording = os.path.join(RECORDING_DIR, "synthetic_sweep.npy")
+    if args.update and not os.path.exists(default_recording):
+        write_default_recording(default_recording)
+
+    index_path = os.path.join(GOLDEN_DIR, "golden.json")
+    index = {'cases': {}}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+
+    cases = {name: function for name, function in build_cases().items()
+             if any(fnmatch.fnmatch(name, pattern) or name.startswith(pattern) for pattern in args.cases)}
+    if not cases:
+        raise SystemExit(f"no case matches {args.cases}")
+
+    ok, changes = True, []
+    for name, function in cases.items():
+        columns, throughput = run_case(function, args.repeats)
+        path = os.path.join(GOLDEN_DIR, name.replace(":", "__") + ".npz")
+        speed = f"{throughput['rows_per_second']:9.0f} rows/s, {throughput['realtime_factor']:7.0f}x realtime"
+
+        if args.update:
+            np.savez_compressed(path, **columns)
+            index['cases'][name] = throughput
+            print(f"{name:<28} {throughput['rows']:6d} rows  stored       {speed}")
+            continue
+
+        stored = index['cases'].get(name)
+        if stored is None or not os.path.exists(path):
+            ok = False
+            print(f"{name:<28} no golden output, run with --update")
+            continue
+        with np.load(path) as golden:
+            drift = compare(columns, {key: golden[key] for key in golden.files}, args.atol, args.rtol)
+        match = passed(drift, args.max_flips)
+        change = throughput['rows_per_second'] / stored['rows_per_second'] - 1
+        changes.append(change)
+        slow = args.max_slowdown is not None and change < -args.max_slowdown
+        ok &= match and not slow
+        print(f"{name:<28} {throughput['rows']:6d} rows  {'ok   ' if match else 'DRIFT'}  {speed} ({change:+6.1%})"
+              f"{'  SLOWER' if slow else ''}")
+        if not match:
+            print(f"    {describe(drift)}")
+
+    if args.update:
+        index['environment'] = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+                                'updated': time.strftime('%Y-%m-%d %H:%M:%S')}
+        with open(index_path, 'w') as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"goldens written to {GOLDEN_DIR}")
+    else:
+        print(f"{len(changes)} cases compared, throughput change median {np.median(changes) if changes else 0:+.1%}: "
+              f"{'no drift' if ok else 'FAILED'}")
+        environment = index.get('environment', {})
+        if environment.get('numpy') not in (None, np.__version__):
+            print(f"  goldens were stored with numpy {environment['numpy']} (now {np.__version__}), expect rounding-level drift")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
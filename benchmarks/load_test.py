@@ -0,0 +1,165 @@
+# capacity test: how many subjects can one box serve in real time?
+# every subject is a synthetic eeg source -> SessionPipeline (Processor + Controller), paced at the real hop rate.
+# N is ramped until the p95 hop latency (data ready -> decision ready) exceeds the budget.
+#   python -m benchmarks.load_test --mode threads
+#   python -m benchmarks.load_test --mode processes --budget-ms 50 --seconds 5
+import argparse
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+import numpy as np
+
+
+def make_subject(seed, hop_seconds):
+    from processing.processor import Processor
+    from processing.pipeline import SessionPipeline
+    from streams.synthetic_stream import SyntheticEEGStream
+
+    processor = Processor()
+    processor.set_base_band([0.3, 0.5])
+    processor.is_calibrated = True  # capacity is about steady-state control, skip calibration
+    pipeline = SessionPipeline(processor=processor, hop_seconds=hop_seconds)
+    stream = SyntheticEEGStream(chunk_size=pipeline.hop_samples, seed=seed)
+    # prefill so every tick produces exactly one hop
+    pipeline.push(stream.generate(pipeline.window_samples - pipeline.hop_samples))
+    return stream, pipeline
+
+
+#runs `subjects` on one paced loop: every hop each subject gets one chunk, latency is measured from the tick
+def run_worker(seeds, hop_seconds, seconds, start_at):
+    subjects = [make_subject(seed, hop_seconds) for seed in seeds]
+    hop = subjects[0][1].hop_samples / subjects[0][1].sampling_rate
+    latencies, stage_totals = [], {}
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+    cpu_start = time.process_time()
+    t0 = time.perf_counter()
+    ticks = int(seconds / hop)
+    for tick in range(ticks):
+        deadline = t0 + tick * hop
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        for stream, pipeline in subjects:
+            pipeline.push(stream.get_data())
+            latencies.append(time.perf_counter() - deadline)
+            for stage, value in pipeline.last_stage_times.items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + value
+    return {
+        'latencies': latencies,
+        'stage_totals': stage_totals,
+        'cpu_seconds': time.process_time() - cpu_start,
+        'wall_seconds': time.perf_counter() - t0,
+    }
+
+
+def _process_entry(args, results):
+    results.put(run_worker(*args))
+
+
+def run_level(n, mode, hop_seconds, seconds):
+    start_at = time.time() + 0.5 + 0.05 * n  # let every worker build its subjects first
+    results = []
+
+    if mode == "threads":
+        lock = threading.Lock()
+
+        def target(seed):
+            result = run_worker([seed], hop_seconds, seconds, start_at)
+            with lock:
+                results.append(result)
+
+        threads = [threading.Thread(target=target, args=(seed,)) for seed in range(n)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        cpu_seconds = results[0]['cpu_seconds'] if results else 0.0  # process_time covers all threads
+    else:
+        workers = min(n, os.cpu_count() or 1)
+        groups = [list(range(n))[i::workers] for i in range(workers)]
+        queue = mp.Queue()
+        processes = [mp.Process(target=_process_entry, args=((group, hop_seconds, seconds, start_at), queue)) for group in groups]
+        for process in processes: process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes: process.join()
+        cpu_seconds = sum(r['cpu_seconds'] for r in results)
+
+    latencies = np.concatenate([r['latencies'] for r in results]) * 1000
+    wall = max(r['wall_seconds'] for r in results)
+    stage_totals = {}
+    for r in results:
+        for stage, value in r['stage_totals'].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + value
+    hops = len(latencies)
+    stage_ms = {stage: value / hops * 1000 for stage, value in stage_totals.items()}
+    # whatever latency is not spent in a stage was spent waiting (sleep overshoot, GIL, cpu contention)
+    stage_ms['waiting'] = max(0.0, float(np.mean(latencies)) - sum(stage_ms.values()))
+
+    return {
+        'subjects': n,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'max_ms': float(latencies.max()),
+        'cores_used': cpu_seconds / wall if wall > 0 else 0.0,
+        'stage_ms': stage_ms,
+        'bottleneck': max(stage_ms, key=stage_ms.get),
+    }
+
+
+def ramp(mode, budget_ms, hop_seconds, seconds, max_subjects):
+    levels = []
+    n = 1
+    while n <= max_subjects:
+        level = run_level(n, mode, hop_seconds, seconds)
+        levels.append(level)
+        print(f"  N={n:<4} p50 {level['p50_ms']:7.2f} ms  p95 {level['p95_ms']:7.2f} ms  "
+              f"cores {level['cores_used']:5.2f}  bottleneck: {level['bottleneck']}")
+        if level['p95_ms'] > budget_ms:
+            break
+        n *= 2
+
+    sustainable = [level for level in levels if level['p95_ms'] <= budget_ms]
+    best = sustainable[-1] if sustainable else None
+    limit = levels[-1]
+    return {
+        'mode': mode,
+        'budget_ms': budget_ms,
+        'hop_seconds': hop_seconds,
+        'cpu_count': os.cpu_count(),
+        'sustainable_subjects': best['subjects'] if best else 0,
+        'subjects_per_core': best['subjects'] / max(best['cores_used'], 1e-9) if best else 0.0,
+        'subjects_per_machine_core': best['subjects'] / (1 if mode == "threads" else (os.cpu_count() or 1)) if best else 0.0,
+        'bottleneck_at_limit': limit['bottleneck'],
+        'levels': levels,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp synthetic subjects until hop latency exceeds a budget.")
+    parser.add_argument("--mode", choices=("threads", "processes", "both"), default="both")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="p95 latency allowed per hop")
+    parser.add_argument("--hop", type=float, default=0.1, help="seconds between decisions per subject")
+    parser.add_argument("--seconds", type=float, default=3.0, help="paced run length per level")
+    parser.add_argument("--max-subjects", type=int, default=512)
+    parser.add_argument("--out", help="write the full report as json")
+    args = parser.parse_args()
+
+    reports = []
+    for mode in (("threads", "processes") if args.mode == "both" else (args.mode,)):
+        print(f"{mode}:")
+        report = ramp(mode, args.budget_ms, args.hop, args.seconds, args.max_subjects)
+        reports.append(report)
+        print(f"  -> {report['sustainable_subjects']} subjects within {args.budget_ms:.0f} ms p95, "
+              f"{report['subjects_per_core']:.1f} subjects per busy core, "
+              f"{report['subjects_per_machine_core']:.1f} per machine core ({report['cpu_count']} cores), "
+              f"bottleneck at limit: {report['bottleneck_at_limit']}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
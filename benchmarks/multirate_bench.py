@@ -0,0 +1,82 @@
+# long-horizon studies: run_multirate (fine bursts + projected fatigue / energy) against the full fine-step simulation
+# on every preset scenario with P and PID feedback plus a settled focus study, several seeds each. reports the fine steps actually run and the
+# drift of the study metrics (time-weighted means: time in band, arousal, fatigue, energy, burnt-out share, energy
+# spent per hour); fails when a seed-averaged metric is outside its tolerance.
+#   python -m benchmarks.multirate_bench
+#   python -m benchmarks.multirate_bench --hours 8 --slow-dt 300 --seeds 3
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+
+# settled long study: PID holding a mid-range target. (the P controller there sits at the edge of stability with its
+# delay, energy and fatigue move in intermittent bursts and seeds alone differ by more than any tolerance)
+STUDIES = {"focus:pid": {"target_arousal": 0.5, "controller_type": "PID Controller"}}
+# absolute tolerance per metric (energy_per_hour: relative)
+TOLERANCE = {"in_band": 0.05, "arousal": 0.03, "fatigue": 0.1, "energy": 0.1, "is_burnt_out": 0.05, "energy_per_hour": 0.15}
+
+
+# time-weighted means of fine rows (dt each) or multirate rows (their `seconds`)
+def study_metrics(rows, dt):
+    weights = np.array([row.get("seconds", dt) for row in rows])
+    metrics = {name: float(np.average([float(row[name]) for row in rows], weights=weights))
+               for name in ("in_band", "arousal", "fatigue", "energy", "is_burnt_out")}
+    metrics["energy_per_hour"] = float(sum(row["energy_spent"] for row in rows) / weights.sum() * 3600)
+    return metrics
+
+
+def main():
+    from streams.simulated_stream import SIM_DEFAULTS, SIM_SCENARIOS, run_multirate, run_simulation
+
+    parser = argparse.ArgumentParser(description="Multi-rate long-horizon simulation against fine steps.")
+    parser.add_argument("--hours", type=float, default=4.0)
+    parser.add_argument("--seeds", type=int, default=2)
+    parser.add_argument("--slow-dt", type=float, default=300.0)
+    parser.add_argument("--burst", type=float, default=2.0)
+    parser.add_argument("--max-change", type=float, default=0.05)
+    args = parser.parse_args()
+
+    seconds = args.hours * 3600
+    dt = 1 / SIM_DEFAULTS["sensor_sampling_rate"]
+    print(f"{args.hours:g} h x {args.seeds} seeds, slow dt {args.slow_dt:g} s, burst {args.burst:g} s")
+    print(f"{'case':<14} {'steps':>9} {'fewer':>6} {'speedup':>8}  drift (multirate - fine)")
+    cases = {f"{scenario}:{suffix}": {**overrides, "controller_type": controller}
+             for scenario, overrides in {"baseline": {}, **SIM_SCENARIOS}.items()
+             for suffix, controller in (("p", "P Controller"), ("pid", "PID Controller"))}
+    ok, reductions = True, []
+    for case, overrides in {**cases, **STUDIES}.items():
+        controls = {**overrides, "feedback_on": True}
+        fine, multi, fine_seconds, multi_seconds, steps = [], [], 0.0, 0.0, 0
+        for seed in range(args.seeds):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                fine.append(study_metrics(run_simulation(controls, int(round(seconds / dt)), seed=seed), dt))
+                fine_seconds += time.perf_counter() - start
+                start = time.perf_counter()
+                rows = run_multirate(controls, seconds, slow_dt=args.slow_dt, burst=args.burst,
+                                     max_change=args.max_change, seed=seed)
+                multi_seconds += time.perf_counter() - start
+            multi.append(study_metrics(rows, dt))
+            steps += sum(row["steps"] for row in rows)
+
+        drift = {}
+        for name, tolerance in TOLERANCE.items():
+            expected = np.mean([m[name] for m in fine])
+            error = np.mean([m[name] for m in multi]) - expected
+            drift[name] = error / expected if name == "energy_per_hour" and expected else error
+        within = all(abs(drift[name]) <= tolerance for name, tolerance in TOLERANCE.items())
+        ok &= within
+        fewer = seconds / dt * args.seeds / steps
+        reductions.append(fewer)
+        print(f"{case:<14} {steps // args.seeds:9d} {fewer:5.0f}x {fine_seconds / multi_seconds:7.1f}x  "
+              + ", ".join(f"{name} {value:+.3f}" for name, value in drift.items())
+              + ("" if within else "  OUT OF TOLERANCE"))
+
+    print(f"fine steps reduced {min(reductions):.0f}x - {max(reductions):.0f}x (median {np.median(reductions):.0f}x): "
+          f"{'within tolerance' if ok else 'FAILED'}")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
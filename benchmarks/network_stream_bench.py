@@ -0,0 +1,85 @@
+# NetworkStream against the local UDP replay stand-in: a clean link must reproduce the recording bit-exactly
+# (as float32), a lossy/reordering/duplicating link must deliver every surviving packet once and in order with
+# the losses counted exactly; also reports the parse + reassembly cost per packet, and the arrival jitter of a short
+# clean replay paced at the sampling rate (a faster replay has no meaningful arrival vs timestamp jitter).
+#   python -m benchmarks.network_stream_bench
+#   python -m benchmarks.network_stream_bench --seconds 120 --speed 8 --loss 0.05 --reorder 0.1
+import argparse
+import threading
+import time
+import numpy as np
+
+
+def replay(data, speed, seed, poll, **link):
+    from streams.network_stream import NetworkStream
+    from streams.udp_replay import UDPReplay
+
+    stream = NetworkStream(port=0)
+    sender = UDPReplay(data, target=("127.0.0.1", stream.port), speed=speed, seed=seed, **link)
+    thread = threading.Thread(target=sender.run)
+    thread.start()
+    chunks, busy = [], 0.0
+    while thread.is_alive() or stream.inbox:
+        start = time.perf_counter()
+        chunks.append(stream.get_data())
+        busy += time.perf_counter() - start
+        time.sleep(poll)
+    time.sleep(stream.reorder_timeout)
+    chunks.append(stream.get_data())
+    thread.join()
+    stream.release()
+    sender.close()
+    return np.concatenate(chunks, axis=1), stream, sender, busy
+
+
+def main():
+    from streams.synthetic_stream import SyntheticEEGStream
+
+    parser = argparse.ArgumentParser(description="Reassembly, reordering and loss handling of NetworkStream.")
+    parser.add_argument("--seconds", type=float, default=60, help="length of the replayed recording")
+    parser.add_argument("--speed", type=float, default=4, help="replay speed (1 = real time)")
+    parser.add_argument("--loss", type=float, default=0.03)
+    parser.add_argument("--reorder", type=float, default=0.05)
+    parser.add_argument("--duplicate", type=float, default=0.01)
+    parser.add_argument("--poll", type=float, default=0.02, help="seconds between get_data calls")
+    parser.add_argument("--jitter-seconds", type=float, default=5, help="length of the real-time replay for the jitter")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    source = SyntheticEEGStream(seed=args.seed)
+    data = source.generate(int(args.seconds * source.sampling_rate)).astype(np.float32)
+    packet = 12
+    data = data[:, :data.shape[1] // packet * packet]
+    ok = True
+
+    out, stream, sender, busy = replay(data, args.speed, args.seed, args.poll)
+    exact = np.array_equal(out, data)
+    ok &= exact
+    print(f"clean link: {sender.sent} packets, {out.shape[1]} samples, bit-exact: {exact}, "
+          f"{busy / sender.sent * 1e6:.1f} us per packet in get_data")
+    if args.jitter_seconds > 0:
+        _, stream, _, _ = replay(data[:, :int(args.jitter_seconds * source.sampling_rate) // packet * packet], 1.0,
+                                 args.seed, args.poll)
+        print(f"  real-time replay, {args.jitter_seconds:g} s: jitter {stream.metrics()['jitter_ms']:.2f} ms")
+
+    out, stream, sender, busy = replay(data, args.speed, args.seed, args.poll, packet_loss=args.loss,
+                                       reorder=args.reorder, duplicate=args.duplicate)
+    metrics = stream.metrics()
+    sent = sorted({index for _, index in sender.schedule})
+    expected = np.concatenate([data[:, i * packet:(i + 1) * packet] for i in sent], axis=1)
+    # a loss after the last received packet is invisible
+    detectable = (sent[-1] + 1 - len(sent)) * packet
+    duplicates = len(sender.schedule) - len(sent)
+    in_order = np.array_equal(out, expected)
+    counted = metrics['dropped_samples'] == detectable
+    ok &= in_order and counted
+    print(f"lossy link: {sender.packet_count} packets, {sender.lost} lost, {duplicates} duplicated, "
+          f"{metrics['reordered_packets']} restored to order, {metrics['late_packets']} discarded as late/duplicate")
+    print(f"  surviving packets delivered once, in order: {in_order}; "
+          f"dropped samples {metrics['dropped_samples']} (expected {detectable}): {counted}")
+    print(f"  {busy / len(sender.schedule) * 1e6:.1f} us per packet in get_data")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# output bus fan-out: publishes decisions at the hop rate to many local stand-in subscribers (OSC, json/UDP,
+# websocket) plus one websocket client that never reads, and reports what the control loop pays per publish,
+# the serialization overhead, delivery and publish -> receive latency per transport. the stalled client's tiny
+# receive buffer fills within the first decisions, so its queue must drop frames while every other subscriber
+# still gets all of them.
+#   python -m benchmarks.output_bus_bench
+#   python -m benchmarks.output_bus_bench --subscribers 20 --decisions 2000 --hop 0.005
+import argparse
+import threading
+import time
+import numpy as np
+
+
+def listen(subscriber, received, stop):
+    while not stop.is_set():
+        try:
+            message = subscriber.receive()
+        except (ConnectionError, OSError):
+            break
+        if message is not None and message.get("time") is not None:
+            received.append((int(round(message["time"] * 1000)), message["received"]))  # time = decision index / 1000
+
+
+# subscribers live in their own process so their receive loops do not compete with the control loop for the GIL
+def subscribers_process(count, ws_port, conn):
+    from actuator.bus_subscriber import BusSubscriber
+
+    subscribers = [BusSubscriber(kind, timeout=0.2) for kind in ("osc", "udp") for _ in range(count)]
+    subscribers += [BusSubscriber("websocket", ws_port, timeout=0.2) for _ in range(count)]
+    conn.send([(s.kind, s.port) for s in subscribers])
+    stop = threading.Event()
+    received = [[] for _ in subscribers]
+    threads = [threading.Thread(target=listen, args=(s, r, stop), daemon=True) for s, r in zip(subscribers, received)]
+    for thread in threads:
+        thread.start()
+    conn.recv()  # publishing finished
+    time.sleep(0.5)
+    stop.set()
+    for thread in threads:
+        thread.join(1.0)
+    conn.send([(s.kind, r) for s, r in zip(subscribers, received)])
+    for subscriber in subscribers:
+        subscriber.close()
+
+
+def main():
+    import multiprocessing
+    from actuator.bus_subscriber import BusSubscriber
+    from actuator.output_bus import OutputBus
+
+    parser = argparse.ArgumentParser(description="Output bus serialization cost, fan-out and latency.")
+    parser.add_argument("--subscribers", type=int, default=10, help="subscribers per transport")
+    parser.add_argument("--decisions", type=int, default=1000)
+    parser.add_argument("--hop", type=float, default=0.01, help="seconds between publishes (the control loop hop)")
+    args = parser.parse_args()
+
+    bus = OutputBus(websocket_port=0)
+    conn, child_conn = multiprocessing.Pipe()
+    child = multiprocessing.Process(target=subscribers_process, args=(args.subscribers, bus.websocket_port, child_conn))
+    child.start()
+    ports = conn.recv()
+    bus.osc_targets = [("127.0.0.1", port) for kind, port in ports if kind == "osc"]
+    bus.udp_targets = [("127.0.0.1", port) for kind, port in ports if kind == "udp"]
+    # a client that connects and never reads: its queue overflows, everybody else must be unaffected
+    stalled = BusSubscriber("websocket", bus.websocket_port, receive_buffer=4096)
+    while bus.websocket_clients < args.subscribers + 1:
+        time.sleep(0.01)
+
+    rng = np.random.default_rng(0)
+    sent, publish_seconds = np.zeros(args.decisions), np.zeros(args.decisions)
+    next_time = time.perf_counter()
+    for i in range(args.decisions):
+        decision = {'time': i / 1000, 'phase': "control", 'arousal': np.float64(rng.normal(0.5, 0.05)),
+                    'lower_band': 0.45, 'upper_band': 0.55, 'in_range': np.bool_(i % 50 < 40), 'artifact': False}
+        next_time += args.hop
+        sent[i] = time.perf_counter()
+        bus.publish(decision)
+        publish_seconds[i] = time.perf_counter() - sent[i]
+        time.sleep(max(0.0, next_time - time.perf_counter()))
+    conn.send("done")
+    results = conn.recv()
+    child.join()
+
+    stats = bus.stats()
+    print(f"{args.decisions} decisions every {args.hop * 1000:.0f} ms to {args.subscribers} OSC + {args.subscribers} UDP + "
+          f"{args.subscribers} websocket subscribers (+1 stalled websocket client)")
+    print(f"serialization: mean {stats['serialize_us_mean']:.1f} us, max {stats['serialize_us_max']:.1f} us")
+    print(f"publish() in the control loop: median {np.median(publish_seconds) * 1e6:.1f} us, mean {publish_seconds.mean() * 1e6:.1f} us, "
+          f"p99 {np.percentile(publish_seconds, 99) * 1e6:.1f} us, max {publish_seconds.max() * 1e6:.1f} us")
+    complete = all(len(pairs) == args.decisions for _, pairs in results)
+    for kind in ("osc", "udp", "websocket"):
+        arrivals = [pair for k, pairs in results if k == kind for pair in pairs]
+        index, received = np.array(arrivals).T if arrivals else (np.zeros(0), np.zeros(0))
+        latency = (received - sent[index.astype(int)]) * 1000 if arrivals else np.full(1, np.nan)
+        print(f"  {kind:<9} delivered {len(arrivals) / (args.decisions * args.subscribers):7.2%}  "
+              f"latency median {np.median(latency):.3f} ms, p99 {np.percentile(latency, 99):.3f} ms")
+    print(f"stalled client: {stats['websocket_dropped']} frames dropped from its queue; bus queue drops {stats['queue_dropped']}, "
+          f"send errors {stats['send_errors']}")
+
+    stalled.close()
+    bus.close()
+    print(f"every other subscriber got every frame: {complete}")
+    raise SystemExit(0 if stats['serialize_us_mean'] < 1000 and stats['websocket_dropped'] > 0 and complete else 1)
+
+
+if __name__ == "__main__":
+    main()
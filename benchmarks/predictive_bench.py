@@ -0,0 +1,137 @@
+# replay benchmark for the predictive estimator: how much sooner does the controller react when it decides on
+# the kalman-predicted index instead of the EMA-smoothed one, at no more false alarms?
+# synthetic eeg alternates between a calm level (inside the calibrated band) and an aroused level (outside);
+# decision latency = time from the true level change to the controller's state change.
+# hysteresis thresholds are swept with evaluate_batch, the predictive path gets the smallest threshold whose
+# false alarms (exits during settled calm stretches) do not exceed the baseline's at 30.
+#   python -m benchmarks.predictive_bench
+#   python -m benchmarks.predictive_bench --minutes 30 --process-noise 25 --lead 0.5
+import argparse
+import numpy as np
+
+
+def record(minutes, seed, calm, aroused, calibration_seconds):
+    from processing.processor import Processor
+    from streams.synthetic_stream import SyntheticEEGStream
+
+    rng = np.random.default_rng(seed)
+    stream = SyntheticEEGStream(seed=seed, artifact_rate=0.01)
+    processor = Processor()
+    fs = processor.sampling_rate
+
+    # calibration on the calm level, then calm/aroused stretches of 20-60 s
+    segments = [(calibration_seconds, calm)]
+    total, level = calibration_seconds, aroused
+    while total < minutes * 60:
+        seconds = rng.uniform(20, 60)
+        segments.append((seconds, level))
+        total += seconds
+        level = calm if level == aroused else aroused
+    chunks, levels = [], []
+    for seconds, value in segments:
+        stream.set_arousal(value)
+        chunks.append(stream.generate(int(seconds * fs)))
+        levels.append(np.full(chunks[-1].shape[1], value))
+    data, levels = np.concatenate(chunks, axis=1), np.concatenate(levels)
+
+    hop, window = int(round(processor.hop_seconds * fs)), processor.window_samples
+    ends = np.arange(window, data.shape[1], hop)
+    calibration_hops = int(np.searchsorted(ends, calibration_seconds * fs))
+    processor.start_calibration()
+    smoothed, raw, artifact = np.full(len(ends), np.nan), np.full(len(ends), np.nan), np.zeros(len(ends), bool)
+    for i, end in enumerate(ends):
+        arousal, artifact[i], _ = processor.process_eeg(data[:, end - window:end].copy())
+        if arousal is not None and not artifact[i]:
+            smoothed[i] = arousal
+            raw[i] = processor.last_features[processor.selected_feature]
+            if i < calibration_hops:
+                processor.add_calibration_value(arousal)
+        if i == calibration_hops - 1:
+            processor.finish_calibration()
+
+    control = slice(calibration_hops, None)
+    return {
+        'smoothed': smoothed[control],
+        'raw': raw[control],
+        'artifact': artifact[control],
+        'truth_in': levels[ends[control] - 1] == calm,
+        'band': tuple(processor.viability_band),
+        'hop_seconds': hop / fs,
+    }
+
+
+def score(states, truth_in, hop_seconds, settle_hops):
+    changes = np.flatnonzero(np.diff(truth_in.astype(np.int8))) + 1
+    bounds = list(changes) + [len(truth_in)]
+    exit_latency, entry_latency = [], []
+    settled = np.zeros(len(truth_in), bool)
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        # first decision matching the new truth within the stretch
+        hits = np.flatnonzero(states[start:end] == truth_in[start])
+        latency = hits[0] * hop_seconds if len(hits) else np.nan
+        (entry_latency if truth_in[start] else exit_latency).append(latency)
+        if truth_in[start]:
+            settled[start + settle_hops:end] = True
+    false_exits = int(np.count_nonzero(np.diff(states.astype(np.int8))[settled[1:]] == -1))
+    return {
+        'exit_latency': float(np.nanmean(exit_latency)),
+        'exit_latency_p95': float(np.nanpercentile(exit_latency, 95)),
+        'entry_latency': float(np.nanmean(entry_latency)),
+        'false_exits': false_exits,
+        'false_out_time': float(np.mean(~states[settled])),
+        'missed_exits': int(np.isnan(exit_latency).sum()),
+    }
+
+
+def main():
+    from controller.estimator import PredictiveEstimator
+    from controller.logic import evaluate_batch
+
+    parser = argparse.ArgumentParser(description="Decision latency of EMA vs predictive estimator on a replay.")
+    parser.add_argument("--minutes", type=float, default=15)
+    parser.add_argument("--calm", type=float, default=0.3, help="synthetic arousal inside the band")
+    parser.add_argument("--aroused", type=float, default=0.6, help="synthetic arousal outside the band")
+    parser.add_argument("--process-noise", type=float, default=25.0)
+    parser.add_argument("--lead", type=float, default=0.5, help="seconds the estimator predicts ahead")
+    parser.add_argument("--baseline-threshold", type=int, default=30)
+    parser.add_argument("--settle", type=float, default=10.0, help="seconds after a true change before exits count as false")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"recording {args.minutes:.0f} min of synthetic eeg...")
+    session = record(args.minutes, args.seed, args.calm, args.aroused, calibration_seconds=60)
+    hop = session['hop_seconds']
+    settle_hops = int(args.settle / hop)
+    thresholds = np.arange(1, 3 * args.baseline_threshold + 1)
+
+    estimator = PredictiveEstimator(process_noise=args.process_noise, lead_seconds=args.lead, dt=hop)
+    predicted = estimator.run(session['raw'])
+
+    def sweep(series):
+        states, _, _ = evaluate_batch(series, session['band'], session['artifact'], thresholds, in_range=True)
+        return [score(row, session['truth_in'], hop, settle_hops) for row in states]
+
+    baseline_scores, predicted_scores = sweep(session['smoothed']), sweep(predicted)
+    base = baseline_scores[args.baseline_threshold - 1]
+    matched = next((i for i, s in enumerate(predicted_scores)
+                    if s['false_exits'] <= base['false_exits'] and s['false_out_time'] <= base['false_out_time']
+                    and s['missed_exits'] == 0), None)
+
+    def show(name, s):
+        print(f"  {name:<36} exit {s['exit_latency']:5.2f} s (p95 {s['exit_latency_p95']:5.2f})  entry {s['entry_latency']:5.2f} s  "
+              f"false exits {s['false_exits']:3d}  false out-time {s['false_out_time']:6.2%}")
+
+    print(f"band [{session['band'][0]:.3f}, {session['band'][1]:.3f}], {len(predicted)} control hops")
+    show(f"EMA, hysteresis {args.baseline_threshold}", base)
+    show(f"predictive, hysteresis {args.baseline_threshold}", predicted_scores[args.baseline_threshold - 1])
+    if matched is None:
+        print("  no hysteresis threshold keeps the predictive path at the baseline false-alarm rate")
+        raise SystemExit(1)
+    best = predicted_scores[matched]
+    show(f"predictive, hysteresis {thresholds[matched]} (matched)", best)
+    print(f"  -> exits detected {base['exit_latency'] - best['exit_latency']:.2f} s sooner "
+          f"({1 - best['exit_latency'] / base['exit_latency']:.0%}), entries {base['entry_latency'] - best['entry_latency']:.2f} s sooner")
+
+
+if __name__ == "__main__":
+    main()
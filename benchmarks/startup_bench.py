@@ -0,0 +1,84 @@
+# startup-time benchmark for main.py
+# run from the repo root:  python -m benchmarks.startup_bench
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("brainflow", "matplotlib", "altair", "pandas")
+
+# what the old main.py pulled in at module level on every rerun
+EAGER_IMPORTS = """
+import streamlit, numpy, pandas, multiprocessing, altair, matplotlib.pyplot
+import streams.simulated_stream, streams.muse_stream, processing.processor, controller.logic
+import actuator.ui, actuator.sim_ui, plot_stream
+from brainflow.board_shim import BoardShim, BoardIds
+"""
+
+# what each path of the current main.py actually imports
+SCENARIOS = {
+    "eager baseline (old main.py)": EAGER_IMPORTS,
+    "landing page": "import main",
+    "simulation mode": "import main\nimport pandas, streams.simulated_stream, actuator.sim_ui",
+    "live eeg mode": "import main\nimport pandas, processing.processor, controller.logic, actuator.ui, streams.muse_stream, plot_stream",
+}
+
+PROBE = """
+import sys, time
+t0 = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - t0
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def time_scenario(code, repeats):
+    # each measurement needs a fresh interpreter, otherwise sys.modules hides the cost
+    timings = []
+    loaded = ""
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(code=code, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        elapsed, _, loaded = out.partition(" ")
+        timings.append(float(elapsed))
+    return min(timings), loaded
+
+
+def time_board_info(repeats=1000):
+    from brainflow.board_shim import BoardShim, BoardIds
+    from streams.board_info import get_board_info
+
+    board_id = BoardIds.MUSE_2_BOARD.value
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        BoardShim.get_sampling_rate(board_id)
+        BoardShim.get_eeg_channels(board_id)
+    direct = (time.perf_counter() - t0) / repeats
+
+    get_board_info()
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        get_board_info()
+    cached = (time.perf_counter() - t0) / repeats
+    return direct, cached
+
+
+def main(repeats=5):
+    print(f"import time, best of {repeats} fresh interpreters")
+    baseline = None
+    for name, code in SCENARIOS.items():
+        best, loaded = time_scenario(code, repeats)
+        if baseline is None:
+            baseline = best
+        print(f"  {name:<30} {best * 1000:8.1f} ms  ({best / baseline:5.1%} of baseline)  heavy: {loaded or '-'}")
+
+    direct, cached = time_board_info()
+    print("board metadata per rerun")
+    print(f"  BoardShim queries              {direct * 1e6:8.2f} us")
+    print(f"  get_board_info (cached)        {cached * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
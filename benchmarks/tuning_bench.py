@@ -0,0 +1,82 @@
+# offline gain optimizer, started from weak gains, vs the slider defaults and the relay auto-tuner's ziegler-nichols
+# gains, scored on seeds the optimizer never saw (every term relative to the slider defaults on the same scenario);
+# also the time of scoring a generation in processes. the optimizer has to beat the auto-tuner by --margin: the
+# high-latency scenario (controller/tuning.py) is where the relay's gains, tuned on the undelayed arousal, fall short.
+#   python -m benchmarks.tuning_bench
+#   python -m benchmarks.tuning_bench --generations 30 --workers 4 --set latency=30
+import argparse
+import contextlib
+import io
+import time
+
+
+# gains the online relay auto-tuner settles on for these controls (SimulatedStream.start_auto_tuning)
+def relay_gains(controls, seed, steps=4000):
+    from streams.simulated_stream import SimulatedStream, run_simulation
+
+    stream = SimulatedStream(seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_simulation({**controls, "feedback_on": True, "controller_type": "PID Controller"}, steps, stream=stream, auto_tune=True)
+    return {"kp": stream.kp, "ki": stream.ki, "kd": stream.kd}
+
+
+def main():
+    from controller.tuning import evaluate_gains, optimize_gains, reference_terms, tuning_scenarios
+    from streams.simulated_stream import SIM_DEFAULTS
+    from headless import parse_value
+
+    parser = argparse.ArgumentParser(description="Offline PID gain optimizer against defaults and the relay auto-tuner.")
+    parser.add_argument("--generations", type=int, default=15)
+    parser.add_argument("--population", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--holdout-seeds", type=int, default=6, help="unseen seeds per scenario for the final score")
+    parser.add_argument("--margin", type=float, default=0.05, help="least relative cost reduction over the auto-tuner")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override a base control")
+    parser.add_argument("--start", type=float, nargs=4, default=[0.02, 0.001, 0.0, 1.0], metavar=("KP", "KI", "KD", "EFFORT"),
+                        help="gains the search starts from")
+    args = parser.parse_args()
+
+    controls = {**SIM_DEFAULTS, "controller_type": "PID Controller"}
+    for assignment in args.set:
+        key, _, raw = assignment.partition('=')
+        controls[key] = parse_value(raw)
+    start_gains = dict(zip(("kp", "ki", "kd", "effort_amplification"), args.start))
+    scenarios = tuning_scenarios(controls)
+    holdout = tuple(range(100, 100 + args.holdout_seeds))
+
+    timings = {}
+    for label, options in (("sequential", {"workers": 1}), (f"{args.workers} workers", {"workers": args.workers})):
+        start = time.perf_counter()
+        result = optimize_gains({**controls, **start_gains}, population=args.population, generations=args.generations, **options)
+        timings[label] = time.perf_counter() - start
+        print(f"{label:<28} {timings[label]:6.2f} s, {result['evaluations']} candidates, "
+              f"cost {result['cost']:.4f}")
+
+    relay = {**relay_gains(controls, seed=0), "effort_amplification": controls["effort_amplification"]}
+    candidates = {
+        "search start": start_gains,
+        "slider defaults": {key: controls[key] for key in result['gains']},
+        "relay auto-tuner": relay,
+        "optimized": result['gains'],
+    }
+    print(f"held-out score over {len(scenarios)} scenarios x {len(holdout)} unseen seeds:")
+    held_out = {}
+    reference = reference_terms(scenarios, holdout)
+    for label, gains in candidates.items():
+        held_out[label], terms = evaluate_gains(gains, scenarios, holdout, reference=reference)
+        print(f"  {label:<17} cost {held_out[label]:.4f}  "
+              + ", ".join(f"{name} {value:.3f}" for name, value in terms.items())
+              + "  (" + ", ".join(f"{key} {value:.3f}" for key, value in gains.items()) + ")")
+
+    for label in ("relay auto-tuner", "optimized"):
+        _, terms = evaluate_gains(candidates[label], scenarios[-1:], holdout, reference=reference[-1:])
+        print(f"  high latency only, {label:<16} sse {terms['sse']:.3f}, time_to_goal {terms['time_to_goal']:.3f}")
+    for label in ("slider defaults", "relay auto-tuner"):
+        print(f"optimized vs {label}: {1 - held_out['optimized'] / held_out[label]:+.1%} lower cost")
+    ok = held_out["optimized"] <= held_out["search start"] \
+        and held_out["optimized"] <= (1 - args.margin) * held_out["relay auto-tuner"]
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# closed-loop digital twin: how much control quality the pipeline's latency costs. the simulated subject regulates on
+# the real Processor / Controller output (eeg window, EMA, hysteresis) instead of its true arousal; each pipeline
+# setting is compared against ideal sensing on the same seeds, and the run must stay well above real time.
+#   python -m benchmarks.twin_bench
+#   python -m benchmarks.twin_bench --seconds 600 --seeds 3 --set controller_type="PID Controller"
+import argparse
+import time
+import numpy as np
+
+# pipeline settings swept: window length (eeg seconds per decision), decision hysteresis, kalman prediction
+SETTINGS = {
+    "ideal sensing": {"ideal": True},
+    "window 1 s": {"window": 1.0},
+    "window 2 s": {"window": 2.0},
+    "window 4 s": {"window": 4.0},
+    "window 2 s, hyst 1 s": {"window": 2.0, "hysteresis": 1.0},
+    "window 2 s, predictive": {"window": 2.0, "predictive": True},
+}
+
+
+def main():
+    from streams.digital_twin import DigitalTwin, twin_summary
+    from streams.simulated_stream import SIM_DEFAULTS
+    from headless import parse_value
+
+    parser = argparse.ArgumentParser(description="Closed-loop digital twin: control quality against pipeline latency.")
+    parser.add_argument("--seconds", type=float, default=180.0, help="simulated seconds per run")
+    parser.add_argument("--seeds", type=int, default=2)
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override a simulation control")
+    args = parser.parse_args()
+
+    controls = {**SIM_DEFAULTS, "feedback_on": True, "target_arousal": 0.5}
+    for assignment in args.set:
+        key, _, raw = assignment.partition('=')
+        controls[key] = parse_value(raw)
+
+    print(f"{controls['controller_type']}, target {controls['target_arousal']}, {args.seconds:.0f} s x {args.seeds} seeds")
+    print(f"{'setting':<24} {'in band':>8} {'mse':>8} {'agree':>7} {'lag s':>6} {'energy':>7} {'realtime':>9}")
+    results = {}
+    for label, options in SETTINGS.items():
+        summaries, wall = [], 0.0
+        for seed in range(args.seeds):
+            start = time.perf_counter()
+            twin = DigitalTwin(controls, seed=seed, **options)
+            rows = twin.run(args.seconds)
+            wall += time.perf_counter() - start
+            summaries.append(twin_summary(rows, controls["target_arousal"], twin.step_seconds))
+        mean = {key: float(np.mean([s[key] for s in summaries]))
+                for key in ("in_band_pct", "mse", "decision_agreement_pct", "perception_lag", "energy_spent")}
+        mean["realtime_factor"] = args.seconds * args.seeds / wall
+        results[label] = mean
+        print(f"{label:<24} {mean['in_band_pct']:7.1f}% {mean['mse']:8.4f} {mean['decision_agreement_pct']:6.1f}% "
+              f"{mean['perception_lag']:6.2f} {mean['energy_spent']:7.2f} {mean['realtime_factor']:8.0f}x")
+
+    pipeline = [label for label in results if label != "ideal sensing"]
+    windows = [results[f"window {w} s"]["perception_lag"] for w in (1, 2, 4)]
+    ok = (all(results[label]["realtime_factor"] > 1 for label in pipeline)
+          and windows == sorted(windows) and windows[0] < windows[-1])
+    print(f"perception lag by window {', '.join(f'{lag:.2f}' for lag in windows)} s: "
+          f"{'grows with the window' if ok else 'UNEXPECTED'}")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+#constant-velocity kalman filter (steady state = alpha-beta filter) over the raw per-hop arousal index
+# the index describes a 2 s window that ends now, so it trails the user; the filter estimates level and
+# velocity from every clean hop and reports the level `lead_seconds` ahead instead of the EMA's lagging value.
+# only the ratio of process to measurement noise shapes the gains, so one unitless knob works for any feature:
+# larger process_noise -> follows changes faster, passes more noise.
+class PredictiveEstimator:
+    def __init__(self, process_noise=25.0, lead_seconds=0.5, dt=0.1):
+        self.process_noise = process_noise  # velocity random walk per second, relative to one hop's noise
+        self.lead_seconds = lead_seconds
+        self.dt = dt                        # seconds per hop, follow the processor's hop when it changes
+        self.reset()
+
+    def reset(self):
+        self.level = None
+        self.velocity = 0.0
+        self.p00, self.p01, self.p11 = 1.0, 0.0, 1.0  # covariance, in units of the measurement variance
+        self.pending_dt = 0.0
+
+    # hops without a usable value only let time pass
+    def skip(self):
+        if self.level is not None:
+            self.pending_dt += self.dt
+
+    def update(self, measurement):
+        if self.level is None:
+            self.level = float(measurement)
+            return self.prediction
+
+        dt = self.dt + self.pending_dt
+        self.pending_dt = 0.0
+        q = self.process_noise
+        # predict: x = F x, P = F P F' + Q
+        self.level += dt * self.velocity
+        p00 = self.p00 + dt * (2 * self.p01 + dt * self.p11) + q * dt ** 3 / 3
+        p01 = self.p01 + dt * self.p11 + q * dt ** 2 / 2
+        p11 = self.p11 + q * dt
+        # correct with the measurement (variance 1)
+        s = p00 + 1.0
+        k0, k1 = p00 / s, p01 / s
+        innovation = measurement - self.level
+        self.level += k0 * innovation
+        self.velocity += k1 * innovation
+        self.p00, self.p01, self.p11 = (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01
+        return self.prediction
+
+    @property
+    def prediction(self):
+        return None if self.level is None else self.level + self.lead_seconds * self.velocity
+
+    # whole series at once (replays): NaN = skipped hop, returns NaN there too
+    def run(self, measurements):
+        out = np.full(len(measurements), np.nan)
+        for i, value in enumerate(measurements):
+            if np.isnan(value):
+                self.skip()
+            else:
+                out[i] = self.update(value)
+        return out
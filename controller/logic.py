@@ -1,3 +1,5 @@
+import numpy as np
+
 #FEEDBACK LOGIC regulator
 
 class Controller:
@@ -5,10 +7,26 @@ class Controller:
         self.in_range = False
         self.last_good_arousal = 0.5
         self.hysteresis_counter = 0
-        self.hysteresis_threshold = 30  # needs 30 consecutive out-of-range samples to change state -> 3 sec
+        self.hysteresis_seconds = 3.0   # out of range this long before the state changes
+        self.hysteresis_threshold = 30  # the same in consecutive out-of-range hops, kept in step by set_hop
+        self.estimator = None           # optional PredictiveEstimator: decide on the predicted current value
+
+    # the hysteresis is a time, so a longer hop needs fewer out-of-range hops (at least one) to flip
+    def set_hop(self, hop_seconds):
+        self.hysteresis_threshold = max(1, int(round(self.hysteresis_seconds / hop_seconds)))
+        if self.estimator is not None:
+            self.estimator.dt = hop_seconds
 
-    def update_state(self, arousal_index, viability_band, artifact_detected):
+    # raw_index: unsmoothed per-hop index, what the estimator fuses (falls back to arousal_index)
+    def update_state(self, arousal_index, viability_band, artifact_detected, raw_index=None):
         #updates sys based on current arousal
+        if self.estimator is not None:
+            measurement = raw_index if raw_index is not None else arousal_index
+            if artifact_detected or measurement is None:
+                self.estimator.skip()
+            else:
+                arousal_index = self.estimator.update(measurement)
+
         if artifact_detected:
             return self.in_range, self.last_good_arousal  #last good state
 
@@ -27,4 +45,65 @@ class Controller:
         if self.hysteresis_counter >= self.hysteresis_threshold:
             self.in_range = False
 
-        return self.in_range, self.last_good_arousal
\ No newline at end of file
+        return self.in_range, self.last_good_arousal
+
+    # vectorized update_state over a whole array, continues from (and updates) the current state
+    # (with an estimator its recursion runs first, then the hysteresis is evaluated in one pass)
+    def update_batch(self, arousal, viability_band, artifact_detected=None, raw_index=None):
+        if self.estimator is not None:
+            measurements = np.array(raw_index if raw_index is not None else arousal, dtype=float)
+            if artifact_detected is not None:
+                measurements[np.asarray(artifact_detected, dtype=bool)] = np.nan
+            arousal = self.estimator.run(measurements)
+        in_range, last_good, final = evaluate_batch(arousal, viability_band, artifact_detected, self.hysteresis_threshold,
+                                                    self.in_range, self.last_good_arousal, self.hysteresis_counter)
+        self.in_range = bool(final['in_range'])
+        self.last_good_arousal = final['last_good_arousal']
+        self.hysteresis_counter = final['hysteresis_counter']
+        return in_range, last_good
+
+
+#whole-session version of Controller.update_state, e.g. for replays or threshold sweeps
+# arousal: array (NaN = no value), viability_band: (lower, upper) scalars or per-sample arrays,
+# artifact_detected: bool array or None. hysteresis_threshold may be an array of thresholds ->
+# in_range comes back as (n_thresholds x n_samples), one row per threshold, all from one pass.
+# the result is identical to calling update_state sample by sample from the given start state.
+def evaluate_batch(arousal, viability_band, artifact_detected=None, hysteresis_threshold=30,
+                   in_range=False, last_good_arousal=0.5, hysteresis_counter=0):
+    arousal = np.asarray(arousal, dtype=float)
+    n = len(arousal)
+    lower, upper = (np.broadcast_to(np.asarray(bound, dtype=float), (n,)) for bound in viability_band)
+    valid = ~np.isnan(arousal)
+    if artifact_detected is not None:
+        valid &= ~np.asarray(artifact_detected, dtype=bool)
+
+    # only valid samples move the state; invalid ones repeat the previous state
+    values = arousal[valid]
+    inside = (lower[valid] <= values) & (values <= upper[valid])
+    k = np.arange(len(values))
+    last_inside = np.maximum.accumulate(np.where(inside, k, -1)) if len(values) else k
+    seen_inside = last_inside >= 0
+    # consecutive out-of-range samples; a run from the start continues the incoming counter
+    counter = np.where(seen_inside, k - last_inside, hysteresis_counter + k + 1)
+    # state a run started from: True after an in-range sample, else the incoming state
+    prior = seen_inside | in_range
+
+    # update_state flips off once counter >= threshold, also right after an in-range sample (counter 0)
+    # when the threshold is 0 or below
+    thresholds = np.asarray(hysteresis_threshold)
+    states = (inside | prior) & (counter < thresholds[..., None])
+
+    # spread back over all samples: each sample shows the state after the last valid one
+    last_valid = np.maximum.accumulate(np.where(valid, np.cumsum(valid) - 1, -1))
+    before_first = last_valid < 0
+    take = np.maximum(last_valid, 0)
+    full_states = np.where(before_first, in_range, states[..., take] if len(values) else in_range)
+    full_states = np.broadcast_to(full_states, thresholds.shape + (n,))
+    last_good = np.where(before_first, last_good_arousal, values[take] if len(values) else last_good_arousal)
+
+    final = {
+        'in_range': full_states[..., -1] if n else np.asarray(in_range),
+        'last_good_arousal': float(last_good[-1]) if n else last_good_arousal,
+        'hysteresis_counter': int(counter[-1]) if len(values) else hysteresis_counter,
+    }
+    return full_states.astype(bool), last_good, final
@@ -0,0 +1,201 @@
+import os
+import threading
+from collections import deque
+import numpy as np
+from streams.simulated_stream import SIM_DEFAULTS, SIM_SCENARIOS
+
+# search box = the simulator sliders' ranges, so a result can always be pushed into them
+TUNING_BOUNDS = {
+    "kp": (0.0, 1.0),
+    "ki": (0.0, 0.1),
+    "kd": (0.0, 1.0),
+    "effort_amplification": (1.0, 10.0),
+}
+# objective = weighted sum of per-run terms, each relative to the same term of the slider-default gains on the same
+# scenario (1 = as good as the defaults), averaged over every scenario:
+#   sse          mean squared distance to the target
+#   time_to_goal time until `goal_seconds` in band without a break, as a fraction of the run (1 = never)
+#   energy       energy spent per simulated second
+#   burnout      fraction of the run with fatigue > 0.7, +1 if the run burnt out
+# raw, the terms differ by orders of magnitude and burnout, which the gains barely move, drowned the rest
+OBJECTIVE_WEIGHTS = {"sse": 10.0, "time_to_goal": 2.0, "energy": 1.0, "burnout": 0.5}
+# a default term below this (e.g. no burnout at all) divides by this instead
+TERM_FLOOR = 1e-3
+DEFAULT_GAINS = {key: value for key, value in SIM_DEFAULTS.items() if key in TUNING_BOUNDS}
+# scenarios only the search runs, on top of the simulator's presets. high latency: the subject acts on an arousal
+# estimate `sensing_delay` seconds old (twice the default latency of 5 steps), at a target it can hold without
+# fatigue -> the gains decide whether the loop settles or winds up and oscillates, and the relay auto-tuner, which
+# tunes on the undelayed arousal, keeps an integral gain this loop cannot take
+TUNING_SCENARIOS = {
+    "high latency": {"target_arousal": 0.5, "sensing_delay": 0.5},
+}
+
+
+def tuned_keys(controller_type):
+    # the P controller ignores ki / kd
+    return ["kp", "effort_amplification"] if controller_type == "P Controller" else list(TUNING_BOUNDS)
+
+
+#the slider settings plus every preset scenario on top of them, all with feedback on -> gains are judged on
+# the situations the simulator offers instead of the one currently on screen
+def tuning_scenarios(controls, scenarios=None):
+    presets = {**SIM_SCENARIOS, **TUNING_SCENARIOS}
+    base = {**SIM_DEFAULTS, **controls, "feedback_on": True}
+    names = list(presets) if scenarios is None else scenarios
+    return [base] + [{**base, **presets[name]} for name in names]
+
+
+#mean terms of one candidate on one scenario over its seeds, stepping the simulator directly
+def scenario_terms(gains, controls, seeds=(0, 1), steps=1200, goal_seconds=3):
+    from streams.simulated_stream import SimulatedStream
+
+    controls = {**controls, **gains}
+    rate = controls["sensor_sampling_rate"]
+    goal_steps = max(int(goal_seconds * rate), 1)
+    delay_steps = int(round(controls.get("sensing_delay", 0.0) * rate))
+    lower, upper = controls["target_arousal"] - controls["natural_flux"], controls["target_arousal"] + controls["natural_flux"]
+    terms = {name: 0.0 for name in OBJECTIVE_WEIGHTS}
+    for seed in seeds:
+        stream = SimulatedStream(seed=seed, dt=1 / rate)
+        stream.reset(controls["state_name"])
+        sse = energy_spent = 0.0
+        fatigued = streak = 0
+        goal_step, burnt_out = None, False
+        sensed = deque([stream.current_arousal], maxlen=delay_steps + 1)
+        for step in range(steps):
+            arousal, _, fatigue, is_burnt_out, _, _, energy_cost = stream.get_arousal_value(
+                controls["state_name"], controls["target_arousal"],
+                controls["natural_flux"], controls["noise_level"],
+                controls["kp"], controls["ki"], controls["kd"],
+                controls["latency"], True,
+                controls["environmental_threat"], controls["effort_amplification"],
+                controls["controller_type"], sensed[0] if delay_steps else None
+            )
+            sensed.append(arousal)
+            sse += (controls["target_arousal"] - arousal) ** 2
+            energy_spent += energy_cost
+            fatigued += fatigue > 0.7
+            burnt_out |= is_burnt_out
+            if goal_step is None:
+                streak = streak + 1 if lower <= arousal <= upper else 0
+                if streak >= goal_steps:
+                    goal_step = step
+        terms["sse"] += sse / steps
+        terms["energy"] += energy_spent * rate / steps
+        terms["time_to_goal"] += (goal_step + 1) / steps if goal_step is not None else 1.0
+        terms["burnout"] += fatigued / steps + burnt_out
+    return {name: float(value) / len(seeds) for name, value in terms.items()}
+
+
+#the default gains' terms per scenario, what evaluate_gains normalizes by
+def reference_terms(scenarios, seeds=(0, 1), steps=1200, goal_seconds=3):
+    return [scenario_terms(DEFAULT_GAINS, controls, seeds, steps, goal_seconds) for controls in scenarios]
+
+
+#cost of one candidate over every (scenario, seed) run. returns (cost, terms), terms relative to `reference`
+# (reference_terms of the same scenarios, computed here when not given) and averaged over the scenarios
+def evaluate_gains(gains, scenarios, seeds=(0, 1), steps=1200, weights=None, goal_seconds=3, reference=None):
+    weights = {**OBJECTIVE_WEIGHTS, **(weights or {})}
+    if reference is None:
+        reference = reference_terms(scenarios, seeds, steps, goal_seconds)
+    terms = {name: 0.0 for name in OBJECTIVE_WEIGHTS}
+    for controls, default in zip(scenarios, reference):
+        for name, value in scenario_terms(gains, controls, seeds, steps, goal_seconds).items():
+            terms[name] += value / max(default[name], TERM_FLOOR) / len(scenarios)
+    return sum(weights[name] * terms[name] for name in terms), terms
+
+
+def _evaluate(job):
+    return evaluate_gains(*job)
+
+
+#offline gain search: a diagonal-covariance evolution strategy (separable CMA-ES without the evolution paths) over the
+# slider box scaled to [0, 1]. each generation samples `population` candidates around the mean, scores them over
+# all scenarios and seeds (in `workers` processes when > 1), and moves the mean to the weighted best half;
+# the step size shrinks with the spread of that half. starts from the gains in `controls` (the current sliders)
+# on_generation(generation, best) is called after every generation, e.g. for a progress bar
+def optimize_gains(controls, scenarios=None, seeds=(0, 1), steps=1200, weights=None, population=8, generations=15,
+                   sigma=0.25, workers=None, seed=0, on_generation=None):
+    controls = {**SIM_DEFAULTS, **controls}
+    if scenarios is None:
+        scenarios = tuning_scenarios(controls)
+    reference = reference_terms(scenarios, seeds, steps)
+    keys = tuned_keys(controls["controller_type"])
+    low = np.array([TUNING_BOUNDS[k][0] for k in keys])
+    span = np.array([TUNING_BOUNDS[k][1] for k in keys]) - low
+    to_gains = lambda x: {k: float(v) for k, v in zip(keys, low + np.clip(x, 0.0, 1.0) * span)}
+
+    rng = np.random.default_rng(seed)
+    mean = np.clip((np.array([controls[k] for k in keys], dtype=float) - low) / span, 0.0, 1.0)
+    step = np.full(len(keys), sigma)
+    elite = max(population // 2, 1)
+    recombination = np.log(elite + 0.5) - np.log(np.arange(1, elite + 1))
+    recombination /= recombination.sum()
+
+    start_cost, start_terms = evaluate_gains(to_gains(mean), scenarios, seeds, steps, weights, reference=reference)
+    best = {"gains": to_gains(mean), "cost": start_cost, "terms": start_terms}
+    result = {"start": dict(best), "evaluations": 2, "history": [start_cost]}
+
+    workers = min(population, os.cpu_count() or 1) if workers is None else workers
+    executor = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(workers)
+    try:
+        for generation in range(generations):
+            candidates = np.clip(mean + step * rng.standard_normal((population, len(keys))), 0.0, 1.0)
+            jobs = [(to_gains(x), scenarios, seeds, steps, weights, 3, reference) for x in candidates]
+            scored = list(executor.map(_evaluate, jobs)) if executor is not None else [_evaluate(job) for job in jobs]
+
+            costs = np.array([cost for cost, _ in scored])
+            result["evaluations"] += population
+            order = np.argsort(costs)[:elite]
+            cost, terms = scored[order[0]]
+            if cost < best["cost"]:
+                best = {"gains": to_gains(candidates[order[0]]), "cost": cost, "terms": terms}
+            result["history"].append(best["cost"])
+
+            spread = np.sqrt(recombination @ (candidates[order] - mean) ** 2)
+            mean = recombination @ candidates[order]
+            step = np.maximum(0.7 * step + 0.3 * spread, 0.01)
+            if on_generation is not None:
+                on_generation(generation, best)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    result.update(best)
+    return result
+
+
+#optimize_gains on a daemon thread, for the dashboard: the page polls `generation` / `best_cost` for progress and
+# picks up `result` (or `error`) once `done` is set; scored in this thread, a process pool is not forked from the
+# threaded streamlit server
+class GainSearch:
+    def __init__(self, controls, generations=15, **options):
+        self.controls = controls
+        self.generations = generations
+        self.options = options
+        self.generation = 0
+        self.best_cost = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="gain-search", daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            self.result = optimize_gains(self.controls, generations=self.generations, workers=1,
+                                         on_generation=self.progress, **self.options)
+        except Exception as error:
+            self.error = error
+        finally:
+            self.done.set()
+
+    def progress(self, generation, best):
+        self.generation, self.best_cost = generation + 1, best["cost"]
@@ -0,0 +1,406 @@
+# headless entry point: runs the pipeline or the simulator without streamlit
+#   python headless.py eeg --source synthetic --duration 120 --out decisions.csv
+#   python headless.py eeg --source file --path session.npy --metrics metrics.json
+#   python headless.py eeg --source muse --duration 600
+#   python headless.py eeg --source synthetic --duration 3600 --out decisions.parquet --raw-out raw.parquet
+#   python headless.py sim --scenario exam --steps 5000 --set controller_type="PID Controller" --set feedback_on=true
+#   python headless.py sim --hours 8 --slow-dt 300 --set feedback_on=true --set controller_type="PID Controller"
+#   python headless.py tune --set controller_type="PID Controller" --weight burnout=2 --workers 4
+#   python headless.py twin --seconds 600 --window 4 --set target_arousal=0.5 --out twin.csv
+import argparse
+import contextlib
+import json
+import sys
+import time
+
+
+#decisions / history / raw eeg, streamed as they are produced: csv (stdout by default) or parquet by extension
+# stdout: where '-' / no path writes (the real stdout while library prints are redirected to stderr)
+def open_output(path, stdout=None):
+    from streams.export import TableWriter, export_format
+
+    if path and path != '-':
+        try:
+            return TableWriter(path, export_format(path))
+        except ValueError as e:
+            raise SystemExit(str(e))
+    return TableWriter(stdout or sys.stdout)
+
+
+def write_metrics(metrics, path):
+    text = json.dumps(metrics, indent=2, default=float)
+    if path:
+        with open(path, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text, file=sys.stderr)
+
+
+def parse_value(raw):
+    lowered = raw.lower()
+    if lowered in ('true', 'false'):
+        return lowered == 'true'
+    for cast in (int, float):
+        try:
+            return cast(raw)
+        except ValueError:
+            pass
+    return raw
+
+
+#----------------------------------EEG PIPELINE--------------------------------------------------------------------------
+
+def make_stream(args):
+    if args.source == "muse":
+        from streams.muse_stream import MuseStream
+        stream = MuseStream(resample=args.resample)
+    elif args.source == "network":
+        from streams.network_stream import NetworkStream
+        stream = NetworkStream(port=args.port, resample=args.resample)
+    elif args.source == "file":
+        from streams.file_stream import FileStream
+        stream = FileStream(args.path, chunk_size=args.chunk_size)
+    else:
+        from streams.synthetic_stream import SyntheticEEGStream
+        stream = SyntheticEEGStream(arousal=args.arousal, chunk_size=args.chunk_size,
+                                    realtime=args.realtime, artifact_rate=args.artifact_rate, seed=args.seed,
+                                    packet_loss=args.packet_loss, timing_jitter=args.timing_jitter, resample=args.resample)
+    if args.decimate > 1:
+        from streams.decimated_stream import DecimatedStream
+        stream = DecimatedStream(stream, args.decimate)
+    return stream
+
+
+def run_eeg(args):
+    from processing.processor import Processor
+    from processing.pipeline import SessionPipeline
+    from controller.logic import Controller
+
+    from streams.board_info import get_board_info
+
+    sampling_rate = get_board_info()["sampling_rate"] // args.decimate
+    processor = Processor(eeg_window_size=args.window, hop_seconds=args.hop, sampling_rate=sampling_rate)
+    processor.motion_threshold = args.motion_threshold
+    processor.ptp_threshold = args.ptp_threshold
+    processor.line_length_threshold = args.line_length_threshold
+    processor.max_dropped_fraction = args.max_dropped
+    processor.set_adaptive_band(args.adaptive_band, args.band_adaptation_rate)
+    processor.set_feature(args.feature)
+    if args.band:
+        processor.set_base_band(args.band)
+        processor.is_calibrated = True
+    headset = args.headset or args.source
+    profile = None
+    if args.user and not args.band and not args.recalibrate:
+        from processing.profiles import load_profile
+        profile = load_profile(args.user, headset)
+    controller = Controller()
+    controller.hysteresis_seconds = args.hysteresis
+    if args.predictive:
+        from controller.estimator import PredictiveEstimator
+        controller.estimator = PredictiveEstimator(process_noise=args.process_noise, lead_seconds=args.lead)
+    pipeline = SessionPipeline(processor=processor, controller=controller, calibration_samples=args.calibration_samples,
+                               min_calibration_samples=args.min_calibration_samples, profile=profile,
+                               drift_tolerance=args.drift_tolerance, adaptive_hop=args.adaptive_hop,
+                               max_hop_seconds=args.max_hop)
+
+    bus = None
+    if args.osc or args.udp or args.websocket_port is not None:
+        from actuator.output_bus import OutputBus
+        bus = OutputBus(osc_targets=args.osc, udp_targets=args.udp, websocket_port=args.websocket_port)
+        if args.websocket_port is not None:
+            print(f"output bus websocket on ws://127.0.0.1:{bus.websocket_port}", file=sys.stderr)
+
+    # live boards deliver in real time, so --duration is wall-clock; replayed/synthetic data is limited by data time
+    live = args.source in ("muse", "network") or args.realtime
+    start = time.perf_counter()
+    stdout = sys.stdout
+    stream = out = raw_out = None
+    # library progress prints go to stderr so stdout stays a clean csv
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            stream = make_stream(args)
+            pipeline.packet_monitor = getattr(stream, 'packet_monitor', None)
+            # opened once the source is up: a source that fails to open leaves no empty output files behind
+            out = open_output(args.out, stdout)
+            raw_out = open_output(args.raw_out, stdout) if args.raw_out else None
+            run_loop(stream, pipeline, args, live, out, bus, raw_out)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if hasattr(stream, 'release'):
+                stream.release()
+            for output in (out, raw_out):
+                if output is not None:
+                    output.close()
+            if bus is not None:
+                bus.close()
+
+    wall = time.perf_counter() - start
+    metrics = pipeline.summary()
+    if args.user and pipeline.calibration_source == "calibration":
+        from processing.profiles import save_profile
+        metrics['profile_saved'] = save_profile(processor, args.user, headset)
+    if hasattr(stream, 'metrics'):
+        metrics['stream'] = stream.metrics()  # network relay: packet monitor + reordering counts
+    if bus is not None:
+        metrics['output_bus'] = bus.stats()
+    metrics['wall_seconds'] = wall
+    metrics['realtime_factor'] = metrics['data_seconds'] / wall if wall > 0 else 0.0
+    write_metrics(metrics, args.metrics)
+
+
+def run_loop(stream, pipeline, args, live, out, bus=None, raw_out=None):
+    import numpy as np
+
+    channel_names = pipeline.processor.channel_names
+    start = time.perf_counter()
+    while True:
+        if getattr(stream, 'finished', False):
+            break
+        if args.duration:
+            elapsed = time.perf_counter() - start if live else pipeline.samples_received / pipeline.sampling_rate
+            if elapsed >= args.duration:
+                break
+
+        eeg_data = stream.get_data()
+        if eeg_data.shape[1] == 0:
+            if live:
+                time.sleep(0.01)
+            continue
+
+        if raw_out is not None:
+            sample = np.arange(pipeline.samples_received, pipeline.samples_received + eeg_data.shape[1])
+            raw_out.write_columns({'sample': sample, 'time': sample / pipeline.sampling_rate,
+                                   **{name: eeg_data[i] for i, name in enumerate(channel_names)}})
+        for decision in pipeline.push(eeg_data):
+            out.write_row(decision)
+            if bus is not None:
+                bus.publish(decision)
+
+
+#----------------------------------SIMULATION----------------------------------------------------------------------------
+
+def sim_controls(args):
+    from streams.simulated_stream import SIM_DEFAULTS, SIM_SCENARIOS
+
+    controls = dict(SIM_DEFAULTS)
+    if args.state:
+        controls["state_name"] = args.state
+    if args.scenario:
+        controls.update(SIM_SCENARIOS[args.scenario])
+    for assignment in args.set:
+        key, _, raw = assignment.partition('=')
+        if key not in SIM_DEFAULTS:
+            raise SystemExit(f"unknown control '{key}', expected one of: {', '.join(SIM_DEFAULTS)}")
+        controls[key] = parse_value(raw)
+    return controls
+
+
+# --hours: long study with the multi-rate kernel, one row per slow step (window means) instead of one per step
+def run_sim(args):
+    from streams.simulated_stream import SIM_HISTORY_COLUMNS, run_multirate, run_simulation
+
+    controls = sim_controls(args)
+    start = time.perf_counter()
+    if args.hours:
+        rows = run_multirate(controls, args.hours * 3600, slow_dt=args.slow_dt, seed=args.seed)
+        columns = list(rows[0]) if rows else []
+        steps = sum(row["steps"] for row in rows)
+        weights = [row["seconds"] for row in rows]
+        sim_seconds = args.hours * 3600
+    else:
+        rows = run_simulation(controls, args.steps, seed=args.seed, auto_tune=args.auto_tune)
+        columns = SIM_HISTORY_COLUMNS
+        steps = args.steps
+        weights = [1.0] * len(rows)
+        sim_seconds = args.steps / controls["sensor_sampling_rate"]
+    wall = time.perf_counter() - start
+
+    out = open_output(args.out)
+    try:
+        for row in rows:
+            out.write_row({column: row[column] for column in columns})
+    finally:
+        out.close()
+
+    total = sum(weights)
+    write_metrics({
+        'controls': controls,
+        'steps': steps,
+        'sim_seconds': sim_seconds,
+        'wall_seconds': wall,
+        'realtime_factor': sim_seconds / wall if wall > 0 else 0.0,
+        'time_in_band': sum(w * row["in_band"] for w, row in zip(weights, rows)) / total if rows else 0.0,
+        'total_energy_spent': sum(row["energy_spent"] for row in rows),
+        'final_fatigue': rows[-1]["fatigue"] if rows else 0.0,
+    }, args.metrics)
+
+
+#offline gain search around the given controls (+ every preset scenario), prints the `sim --set` flags of the result
+def run_tune(args):
+    from controller.tuning import OBJECTIVE_WEIGHTS, optimize_gains
+
+    controls = sim_controls(args)
+    weights = {}
+    for assignment in args.weight:
+        key, _, raw = assignment.partition('=')
+        if key not in OBJECTIVE_WEIGHTS:
+            raise SystemExit(f"unknown objective term '{key}', expected one of: {', '.join(OBJECTIVE_WEIGHTS)}")
+        weights[key] = float(raw)
+
+    def progress(generation, best):
+        print(f"generation {generation + 1}/{args.generations}: cost {best['cost']:.4f}", file=sys.stderr)
+
+    start = time.perf_counter()
+    result = optimize_gains(controls, seeds=tuple(range(args.seeds)), steps=args.steps, weights=weights,
+                            population=args.population, generations=args.generations, workers=args.workers,
+                            seed=args.seed, on_generation=progress)
+    print(" ".join(f"--set {key}={value:.4f}" for key, value in result['gains'].items()))
+    write_metrics({**result, 'controls': controls, 'wall_seconds': time.perf_counter() - start}, args.metrics)
+
+
+#closed loop of the simulated subject and the real pipeline (streams/digital_twin.py), next to the same subject with
+# ideal sensing on the same seed -> what the window / EMA / hysteresis latency costs the control
+def run_twin(args):
+    from streams.digital_twin import DigitalTwin, twin_summary
+
+    controls = {**sim_controls(args), "feedback_on": True}
+    options = {"window": args.window, "hop": args.hop, "feature": args.feature, "hysteresis": args.hysteresis,
+               "predictive": args.predictive, "gate": not args.no_gate, "artifact_rate": args.artifact_rate}
+    start = time.perf_counter()
+    twin = DigitalTwin(controls, seed=args.seed, **options)
+    rows = twin.run(args.seconds)
+    wall = time.perf_counter() - start
+    ideal = DigitalTwin(controls, seed=args.seed, gate=not args.no_gate, ideal=True)
+    ideal_rows = ideal.run(args.seconds)
+
+    out = open_output(args.out)
+    try:
+        for row in rows:
+            out.write_row(row)
+    finally:
+        out.close()
+
+    write_metrics({
+        'controls': controls,
+        'pipeline': options,
+        'sim_seconds': args.seconds,
+        'wall_seconds': wall,
+        'realtime_factor': args.seconds / wall if wall > 0 else 0.0,
+        'twin': twin_summary(rows, controls["target_arousal"], twin.step_seconds),
+        'ideal': twin_summary(ideal_rows, controls["target_arousal"], ideal.step_seconds),
+    }, args.metrics)
+
+
+#----------------------------------------------------------------------------------------------------------------------------
+def build_parser():
+    from streams.simulated_stream import SIM_SCENARIOS
+
+    parser = argparse.ArgumentParser(description="Run Muse arousal sessions without the Streamlit UI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    eeg = sub.add_parser("eeg", help="stream eeg through Processor and Controller")
+    eeg.add_argument("--source", choices=("muse", "network", "file", "synthetic"), default="synthetic")
+    eeg.add_argument("--port", type=int, default=5000, help="UDP port for --source network (OSC relay, see streams/udp_replay.py)")
+    eeg.add_argument("--path", help="recording to replay with --source file (.npy channel-major or brainflow csv)")
+    eeg.add_argument("--duration", type=float, default=60.0, help="seconds of data to process (0 = until source ends / ctrl-c)")
+    eeg.add_argument("--window", type=float, default=2.0, help="seconds of eeg per decision")
+    eeg.add_argument("--hop", type=float, default=0.1, help="seconds between decisions")
+    eeg.add_argument("--decimate", type=int, choices=(1, 2, 4), default=1, help="downsample before processing (256 Hz -> 128 / 64 Hz)")
+    eeg.add_argument("--adaptive-hop", action="store_true", help="lengthen the hop under cpu pressure, shorten it when idle")
+    eeg.add_argument("--max-hop", type=float, default=1.0, help="longest hop the adaptive mode may use")
+    eeg.add_argument("--band", type=float, nargs=2, metavar=("LOWER", "UPPER"), help="fixed viability band, skips calibration")
+    eeg.add_argument("--calibration-samples", type=int, default=80, help="max clean hops to calibrate on")
+    eeg.add_argument("--min-calibration-samples", type=int, default=30, help="stop earlier once Q1/Q3 converge")
+    eeg.add_argument("--user", help="load/save this user's calibration profile")
+    eeg.add_argument("--headset", help="headset id for the profile (default: the source name)")
+    eeg.add_argument("--recalibrate", action="store_true", help="ignore a stored profile")
+    eeg.add_argument("--drift-tolerance", type=float, default=1.5, help="allowed baseline drift in baseline std units")
+    eeg.add_argument("--adaptive-band", action="store_true", help="let the viability band follow slow drift")
+    eeg.add_argument("--band-adaptation-rate", type=float, default=0.002)
+    eeg.add_argument("--feature", default="alpha_beta", help="arousal feature (see processing/features.py); all features are logged")
+    eeg.add_argument("--hysteresis", type=float, default=3.0, help="seconds out of range before the state flips")
+    eeg.add_argument("--predictive", action="store_true", help="decide on a kalman prediction of the raw index instead of the EMA")
+    eeg.add_argument("--process-noise", type=float, default=25.0, help="predictive: how fast the index may change (higher = faster, noisier)")
+    eeg.add_argument("--lead", type=float, default=0.5, help="predictive: seconds to predict ahead")
+    eeg.add_argument("--motion-threshold", type=float, default=10000, help="per-channel variance limit (uV^2) on the raw window, mains hum included")
+    eeg.add_argument("--ptp-threshold", type=float, help="per-channel peak-to-peak limit (uV)")
+    eeg.add_argument("--line-length-threshold", type=float, help="per-channel line-length limit per window")
+    eeg.add_argument("--chunk-size", type=int, default=32, help="samples per read for file/synthetic sources")
+    eeg.add_argument("--arousal", type=float, default=0.3, help="synthetic source arousal level (0-1)")
+    eeg.add_argument("--artifact-rate", type=float, default=0.0, help="synthetic source motion bursts per chunk")
+    eeg.add_argument("--packet-loss", type=float, default=0.0, help="synthetic source: share of BLE packets lost")
+    eeg.add_argument("--timing-jitter", type=float, default=0.0, help="synthetic source: mean extra packet delay (s)")
+    eeg.add_argument("--resample", action="store_true", help="fill lost packets by interpolation (uniform time grid)")
+    eeg.add_argument("--max-dropped", type=float, default=0.05, help="skip windows missing more than this share of samples")
+    eeg.add_argument("--realtime", action="store_true", help="pace the synthetic source at the board sampling rate")
+    eeg.add_argument("--seed", type=int)
+    eeg.add_argument("--osc", action="append", default=[], metavar="HOST:PORT", help="publish decisions as OSC/UDP (repeatable)")
+    eeg.add_argument("--udp", action="append", default=[], metavar="HOST:PORT", help="publish decisions as json/UDP (repeatable)")
+    eeg.add_argument("--websocket-port", type=int, help="serve decisions on a local websocket (0 = any free port)")
+    eeg.add_argument("--out", help="decisions .csv or .parquet (default: csv on stdout)")
+    eeg.add_argument("--raw-out", help="also stream the raw eeg to this .csv or .parquet")
+    eeg.add_argument("--metrics", help="metrics json (default stderr)")
+    eeg.set_defaults(func=run_eeg)
+
+    sim = sub.add_parser("sim", help="run SimulatedStream scenarios at full speed")
+    sim.add_argument("--scenario", choices=tuple(SIM_SCENARIOS))
+    sim.add_argument("--state", choices=("Calm", "Focused", "Stressed"))
+    sim.add_argument("--steps", type=int, default=2000)
+    sim.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override a simulation control")
+    sim.add_argument("--auto-tune", action="store_true", help="start the relay auto-tuner at step 0")
+    sim.add_argument("--hours", type=float, help="long study with the multi-rate kernel instead of --steps fine steps")
+    sim.add_argument("--slow-dt", type=float, default=300.0, help="--hours: longest fatigue / energy step (s)")
+    sim.add_argument("--seed", type=int)
+    sim.add_argument("--out", help="history .csv or .parquet (default: csv on stdout)")
+    sim.add_argument("--metrics", help="metrics json (default stderr)")
+    sim.set_defaults(func=run_sim)
+
+    tune = sub.add_parser("tune", help="search kp/ki/kd and effort amplification offline on the simulator")
+    tune.add_argument("--scenario", choices=tuple(SIM_SCENARIOS), help="base settings (all scenarios are scored on top of them)")
+    tune.add_argument("--state", choices=("Calm", "Focused", "Stressed"))
+    tune.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override a simulation control, e.g. controller_type=\"P Controller\"")
+    tune.add_argument("--weight", action="append", default=[], metavar="TERM=WEIGHT", help="objective weight (sse, time_to_goal, energy, burnout)")
+    tune.add_argument("--seeds", type=int, default=2, help="seeded runs per scenario")
+    tune.add_argument("--steps", type=int, default=1200, help="steps per run")
+    tune.add_argument("--population", type=int, default=8)
+    tune.add_argument("--generations", type=int, default=15)
+    tune.add_argument("--workers", type=int, help="processes scoring a generation (default: one per cpu)")
+    tune.add_argument("--seed", type=int, default=0)
+    tune.add_argument("--metrics", help="result json (default stderr)")
+    tune.set_defaults(func=run_tune)
+
+    twin = sub.add_parser("twin", help="close the loop: simulated subject -> synthetic eeg -> pipeline -> subject")
+    twin.add_argument("--scenario", choices=tuple(SIM_SCENARIOS))
+    twin.add_argument("--state", choices=("Calm", "Focused", "Stressed"))
+    twin.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override a simulation control")
+    twin.add_argument("--seconds", type=float, default=300.0, help="simulated seconds")
+    twin.add_argument("--window", type=float, default=2.0, help="seconds of eeg per decision")
+    twin.add_argument("--hop", type=float, default=0.1, help="seconds between decisions")
+    twin.add_argument("--feature", default="alpha_beta", help="arousal feature (see processing/features.py)")
+    twin.add_argument("--hysteresis", type=float, default=3.0, help="seconds out of range before the state flips")
+    twin.add_argument("--predictive", action="store_true", help="decide on a kalman prediction of the raw index")
+    twin.add_argument("--no-gate", action="store_true", help="subject regulates all the time, not only when out of range")
+    twin.add_argument("--artifact-rate", type=float, default=0.0, help="synthetic motion bursts per chunk")
+    twin.add_argument("--seed", type=int, default=0)
+    twin.add_argument("--out", help="twin history .csv or .parquet (default: csv on stdout)")
+    twin.add_argument("--metrics", help="metrics json (default stderr)")
+    twin.set_defaults(func=run_twin)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "eeg" and args.source == "file" and not args.path:
+        parser.error("--source file needs --path")
+    if args.command in ("eeg", "twin"):
+        from processing.features import FEATURES
+        if args.feature not in FEATURES:
+            parser.error(f"--feature must be one of: {', '.join(FEATURES)}")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
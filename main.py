@@ -1,116 +1,251 @@
 from queue import Full
 import streamlit as st
 import time
-import pandas as pd
 import numpy as np
+import multiprocessing as mp 
 
+from streams.board_info import get_board_info
 
-from streams.simulated_stream import SimulatedStream
-from streams.muse_stream import MuseStream
-from processing.processor import Processor
-from controller.logic import Controller
-from actuator.ui import render_dashboard, update_main_dashboard
-from brainflow.board_shim import BoardShim, BoardIds
-import multiprocessing as mp 
-from plot_stream import run_plot 
+# heavy modules (brainflow, pandas, matplotlib, altair, plot_stream) are imported inside the
+# mode that needs them -> every rerun of the landing page / simulation mode stays cheap
+
+
+#----------------------------------SHARED ENGINES-----------------------------------------------------------------------
+# every browser tab on the same device (or on the simulation) attaches to one engine (streams/engine_hub.py):
+# one acquisition + processing cost for any number of viewers. the controlling viewer changes settings,
+# starts / stops and calibrates, everybody else watches read-only
+
+LIVE_CONTROL_KEYS = ("band_width_multiplier", "adaptive_band", "decision_hop", "adaptive_hop", "predictive_estimator",
+                     "record_raw", "bus_osc", "bus_udp", "bus_websocket_port")
+
+
+def viewer_id():
+    if 'viewer_id' not in st.session_state:
+        import uuid
+        st.session_state.viewer_id = uuid.uuid4().hex
+    return st.session_state.viewer_id
+
+
+#engine of this tab (None once it was closed), also keeps the tab registered as a viewer
+def current_engine():
+    from streams.engine_hub import HUB
+
+    key = st.session_state.get('engine_key')
+    return HUB.touch(key, viewer_id()) if key else None
+
+
+def is_owner(engine):
+    return engine is not None and engine.owner == viewer_id()
+
+
+#the controlling viewer changed what every page shows (stop, restart, calibration, new simulation run)
+def page_changed(engine):
+    engine.state['revision'] += 1
+
+
+def page_changed_since_run(engine):
+    return engine.state['revision'] != st.session_state.get('engine_revision')
+
+
+#the owner's widget values, so whoever takes over next starts from the engine's current settings
+def share_controls(engine, keys):
+    engine.state['controls'] = {key: st.session_state[key] for key in keys if key in st.session_state}
 
-from actuator.sim_ui import render_sim, render_sim_dashboard, update_dashboard, render_sim_analysis
-from actuator.ui import render_post_session_analysis
+
+def render_ownership(engine):
+    from streams.engine_hub import HUB
+
+    viewers = len(engine.viewers)
+    if is_owner(engine):
+        st.sidebar.caption(f"You control this session ({viewers} viewer{'s' if viewers != 1 else ''} connected)")
+        return True
+    st.sidebar.caption(f"Watching read-only, another viewer controls this session ({viewers} viewers connected)")
+    if st.sidebar.button("Take Control", key="take_control"):
+        for key, value in engine.state.get('controls', {}).items():
+            st.session_state[key] = value
+        HUB.claim(engine.key, viewer_id())
+        st.rerun()
+    return False
+
+
+#keeps this tab registered while no dashboard is refreshing, and redraws it when the owner changes the page
+@st.fragment(run_every=1.0)
+def engine_heartbeat():
+    engine = current_engine()
+    if engine is None or page_changed_since_run(engine):
+        st.rerun()
+
+
+def open_live_engine(engine, source, relay_port, decimation, resample):
+    from processing.processor import Processor
+    from controller.logic import Controller
+    from plot_stream import run_plot
+
+    board_info = get_board_info()
+    shared = engine.state
+    st.info("Starting live plot window...")
+    plot_queue = mp.Queue()
+    plot_process = mp.Process(
+        target=run_plot, 
+        args=(plot_queue, board_info["sampling_rate"] // decimation, board_info["eeg_names"], 5),
+        daemon=True  #clean close
+    )
+    plot_process.start()
+    shared['plot_queue'], shared['plot_process'] = plot_queue, plot_process
+    time.sleep(2)  
+    st.success("Plot window started!")
+
+    try:
+        if source.startswith("Network"):
+            from streams.network_stream import NetworkStream
+            stream = NetworkStream(port=int(relay_port), sampling_rate=board_info["sampling_rate"],
+                                   channel_names=board_info["eeg_names"], resample=resample)
+        else:
+            from streams.muse_stream import MuseStream
+            stream = MuseStream(data_queue=plot_queue, resample=resample)
+    except Exception:
+        close_engine(shared)
+        raise
+    if decimation > 1:
+        from streams.decimated_stream import DecimatedStream
+        stream = DecimatedStream(stream, decimation)
+    shared['stream'] = stream
+    shared['processor'] = Processor(sampling_rate=stream.sampling_rate)
+    shared['controller'] = Controller()
+    shared['stopped'] = False
+    shared['revision'] = 0
+
+
+def open_sim_engine(engine):
+    from streams.simulated_stream import SimulatedStream, SIM_DEFAULTS
+    from streams.live_session import SimulationSession
+
+    engine.state['sim_session'] = SimulationSession(SimulatedStream(), SIM_DEFAULTS)
+    engine.state['revision'] = 0
+
+
+#last viewer gone: stop the threads, release the device, close the bus and the plot window
+def close_engine(shared):
+    for name in ('live_session', 'sim_session'):
+        if name in shared:
+            shared[name].stop()
+    if hasattr(shared.get('stream'), 'release'):
+        shared['stream'].release()
+    if shared.get('output_bus') is not None:
+        shared['output_bus'].close()
+    plot_process = shared.get('plot_process')
+    if plot_process is not None and plot_process.is_alive():
+        plot_process.terminate()
+        plot_process.join()
 
 
 #----------------------------------REAL MODE----------------------------------------------------------------------------
 
-def run_real_mode():
-    if 'processor' not in st.session_state: st.session_state.processor = Processor()
-    if 'controller' not in st.session_state: st.session_state.controller = Controller()
-    
-    # Initialize history tracking
-    if 'real_history' not in st.session_state:
-        st.session_state.real_history = pd.DataFrame(columns=["arousal", "lower_band", "upper_band", "in_range", "artifact"])
-    if 'session_start_time' not in st.session_state:
-        st.session_state.session_start_time = time.time()
-    if 'total_samples' not in st.session_state:
-        st.session_state.total_samples = 0
-    if 'artifact_count' not in st.session_state:
-        st.session_state.artifact_count = 0
-    if 'session_stopped' not in st.session_state:
-        st.session_state.session_stopped = False
-
-    processor = st.session_state.processor
-    controller = st.session_state.controller
-    stream = st.session_state.stream
-    
-    sampling_rate = BoardShim.get_sampling_rate(BoardIds.MUSE_2_BOARD.value)
-    num_channels = len(BoardShim.get_eeg_channels(BoardIds.MUSE_2_BOARD.value))
-    samples_for_processor = sampling_rate * processor.eeg_window_size
+#yields the arousal of every clean window, stepping one processor hop through the incoming stream
+def clean_hops(stream, processor, sampling_rate, num_channels, variance_text, plot_queue=None):
+    samples_needed = processor.window_samples
+    calibration_buffer = np.empty((num_channels, 0))
+    monitor = getattr(stream, 'packet_monitor', None)
+
+    while True:
+        eeg_data = stream.get_data()
+        
+        if plot_queue is not None and eeg_data.shape[1] > 0:
+            try: plot_queue.put_nowait(eeg_data)
+            except Full: pass
+        
+        if not eeg_data.any(): 
+            time.sleep(0.05)
+            continue
+        
+        calibration_buffer = np.concatenate((calibration_buffer, eeg_data), axis=1)
+
+        if calibration_buffer.shape[1] >= samples_needed:
+            data_to_process = calibration_buffer[:, -samples_needed:]
+            dropped = monitor.dropped_in_last(samples_needed) if monitor is not None else 0
+            arousal, artifact, variance = processor.process_eeg(data_to_process.copy(), dropped_samples=dropped)
+            variance_text.metric("Live Variance", f"{variance:,.0f}")
+            
+            if arousal is not None and not artifact:
+                yield arousal
+
+            samples_to_remove = max(1, int(round(sampling_rate * processor.hop_seconds)))
+            calibration_buffer = calibration_buffer[:, samples_to_remove:]
+
 
-    # memory buffer: stores most recent eeg samples continuously
-    if 'main_buffer' not in st.session_state:
-        st.session_state.main_buffer = np.empty((num_channels, 0))
+def run_real_mode(engine):
+    from actuator.ui import render_post_session_analysis
+    from streams.live_session import LiveSession
+
+    shared = engine.state
+    processor = shared['processor']
+    controller = shared['controller']
+    stream = shared['stream']
+    st.session_state.engine_revision = shared['revision']
+    owner = render_ownership(engine)
+    
+    board_info = get_board_info()
+    sampling_rate = processor.sampling_rate  # below the board rate when the stream is decimated
+    num_channels = len(board_info["eeg_channels"])
     
     
     # ----------------------------------------- UI STUFF
-    # sidebar stop btn
+    # sidebar stop btn (controller owner only, stops it for every viewer)
     st.sidebar.title("Session Control")
-    if st.sidebar.button("Stop Session", key="stop_real_session"):
-        st.session_state.session_stopped = True
+    if owner and st.sidebar.button("Stop Session", key="stop_real_session"):
+        if 'live_session' in shared:
+            shared['live_session'].stop()
+            shared['final_history'] = shared['live_session'].snapshot(full_history=True)['history']
+        shared['stopped'] = True
+        page_changed(engine)
         st.rerun()
     
     # sidebar restart btn -> reset
-    if st.session_state.get('session_stopped', False):
+    if owner and shared['stopped']:
         if st.sidebar.button("Start New Session", key="restart_session"):
-            st.session_state.real_history = pd.DataFrame(columns=["arousal", "lower_band", "upper_band", "in_range", "artifact"])
-            st.session_state.session_start_time = time.time()
-            st.session_state.total_samples = 0
-            st.session_state.artifact_count = 0
-            st.session_state.session_stopped = False
-            if 'ui_placeholders' in st.session_state:
-                del st.session_state.ui_placeholders
+            shared.pop('live_session', None)
+            shared.pop('final_history', None)
+            shared['stopped'] = False
+            page_changed(engine)
             st.rerun()
     
-    # viability band IQR adjustement
-    if processor.is_calibrated and not st.session_state.get('session_stopped', False):
-        st.sidebar.divider()
-        
-        if 'original_viability_band' not in st.session_state:
-            st.session_state.original_viability_band = processor.viability_band.copy()
-        
-        original_band = st.session_state.original_viability_band
-        band_center = np.mean(original_band)
-        original_width = original_band[1] - original_band[0]
-        
-        width_multiplier = st.sidebar.slider(
-            "Band Width",
-            min_value=0.5,
-            max_value=2.0,
-            value=1.0,
-            step=0.1,
-            format="%.1fx",
-            key="band_width_multiplier",
-        )
-        
-        new_width = original_width * width_multiplier
-        new_lower = band_center - (new_width / 2)
-        new_upper = band_center + (new_width / 2)
-        
-        processor.viability_band = [new_lower, new_upper]
-        
-    
     # SESSION ANALYSIS
-    if st.session_state.session_stopped:
+    if shared['stopped']:
         st.title("Session Stopped")
-        if not st.session_state.real_history.empty:
-            render_post_session_analysis(st.session_state.real_history, processor.viability_band)
+        history = shared.get('final_history')
+        live_session = shared.get('live_session')
+        if history is not None and not history.empty:
+            render_post_session_analysis(history, processor.viability_band, session_id=live_session.session_id,
+                                         raw=live_session.raw)
         else:
             st.info("No data was collected during this session.")
+        engine_heartbeat()
         return
     
     # CALIBRATION 
+    if not processor.is_calibrated and not owner:
+        st.title("Step 1: Calibration")
+        st.info("Waiting for the controlling viewer to calibrate...")
+        engine_heartbeat()  # redraws this page once calibration is done
+        return
     if not processor.is_calibrated:
+        from processing.profiles import load_profile, save_profile, apply_profile, ProfileValidator
+        from streams.engine_hub import HUB
+
         st.title("Step 1: Calibration")
         st.info("Goal: relax until the 'Live Variance' is low and stable.")
         st.sidebar.title("Tuning Controls")
-        motion_threshold = st.sidebar.slider("Artifact Threshold", 500, 80000, 10000, 500, key="artifact_threshold_slider")
+        motion_threshold = st.sidebar.slider("Artifact Threshold", 500, 80000, 10000, 500, key="artifact_threshold_slider",
+                                             help="Variance (uV²) of each channel's raw window, before filtering; mains hum counts towards it")
+        window_seconds = st.sidebar.slider("Window Length", 1.0, 4.0, float(processor.eeg_window_size), 0.5, format="%.1fs", key="window_length")
+        processor.set_window(window_seconds)
+        from processing.features import FEATURES
+        feature_names = list(FEATURES)
+        feature = st.sidebar.selectbox("Arousal Feature", feature_names, index=feature_names.index(processor.selected_feature), key="arousal_feature")
+        processor.set_feature(feature)
+        user = st.sidebar.text_input("User", key="profile_user").strip()
+        headset = getattr(stream, 'device_label', "default")
+        profile = load_profile(user, headset) if user else None
         col1, col2 = st.columns(2)
         with col1: 
             st.write("Progress:")
@@ -120,221 +255,413 @@ def run_real_mode():
             st.write("Signal Quality:")
             variance_text = st.metric("Live Variance", "waiting...")
         
+        if profile is not None:
+            saved_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(profile["timestamp"]))
+            st.write(f"Saved profile for **{user}** on headset {headset} from {saved_at}, band [{profile['viability_band'][0]:.3f}, {profile['viability_band'][1]:.3f}]")
+            if st.button("Use Saved Profile (quick check)", key="use_profile_button"):
+                # short validation pass: only recalibrate when today's baseline has drifted
+                processor.motion_threshold = motion_threshold
+                validator = ProfileValidator(profile)
+                with HUB.hold(engine.key, viewer_id()):
+                    for arousal in clean_hops(stream, processor, sampling_rate, num_channels, variance_text, shared.get('plot_queue')):
+                        done = validator.update(arousal)
+                        progress_text.text(f"Checking profile {validator.count}/{validator.samples} clean samples...")
+                        progress_bar.progress(validator.count / validator.samples)
+                        if done:
+                            break
+                if validator.passed:
+                    apply_profile(processor, profile)
+                    page_changed(engine)
+                    st.success(f"Profile still valid (drift {validator.drift:.2f}), calibration skipped!")
+                    time.sleep(1)
+                    st.rerun()
+                st.warning(f"Baseline drifted ({validator.drift:.2f} > {validator.tolerance:.2f}). Please run a full calibration.")
+        
         if st.button("Start Calibration", key="start_calibration_button"):
             processor.motion_threshold = motion_threshold
-            st.session_state.baseline_arousal_values = []
+            # stops early once the Q1/Q3 standard errors are small enough, target_samples is the upper bound
+            clean_samples = 0
             target_samples = 80
+            processor.start_calibration(min_samples=30, max_samples=target_samples)
+
+            # the blocking loop does not touch the hub, so the owner is held registered until it is done
+            with HUB.hold(engine.key, viewer_id()):
+                for arousal in clean_hops(stream, processor, sampling_rate, num_channels, variance_text, shared.get('plot_queue')):
+                    converged = processor.add_calibration_value(arousal)
+                    clean_samples += 1
+                    progress_text.text(f"Collected {clean_samples}/{target_samples} clean samples...")
+                    progress_bar.progress(clean_samples / target_samples)
+                    if converged or clean_samples >= target_samples:
+                        break
             
-            samples_needed = sampling_rate * processor.eeg_window_size
-            calibration_buffer = np.empty((num_channels, 0))
-
-            while len(st.session_state.baseline_arousal_values) < target_samples:
-                eeg_data = stream.get_data()
-                
-                if 'plot_queue' in st.session_state and eeg_data.shape[1] > 0:
-                    try: st.session_state.plot_queue.put_nowait(eeg_data)
-                    except Full: pass
-                
-                if not eeg_data.any(): 
-                    time.sleep(0.05)
-                    continue
-                
-                calibration_buffer = np.concatenate((calibration_buffer, eeg_data), axis=1)
-
-                if calibration_buffer.shape[1] >= samples_needed:
-                    data_to_process = calibration_buffer[:, -samples_needed:]
-                    arousal, artifact, variance = processor.process_eeg(data_to_process.copy())
-                    variance_text.metric("Live Variance", f"{variance:,.0f}")
-                    
-                    if arousal is not None and not artifact:
-                        st.session_state.baseline_arousal_values.append(arousal)
-                    
-                    progress = len(st.session_state.baseline_arousal_values) / target_samples
-                    progress_text.text(f"Collected {len(st.session_state.baseline_arousal_values)}/{target_samples} clean samples...")
-                    progress_bar.progress(progress)
-
-                    step_size_seconds = 0.1
-                    samples_to_remove = int(sampling_rate * step_size_seconds)
-                    calibration_buffer = calibration_buffer[:, samples_to_remove:]
-            
-            processor.calibrate(st.session_state.baseline_arousal_values) # -> sets viability band around eeg data
+            processor.finish_calibration() # -> sets viability band around eeg data
+            if user:
+                save_profile(processor, user, headset)
+            page_changed(engine)
             st.success("Calibration complete!")
             time.sleep(1)
             st.rerun()
         return
 
-    # MAIN SESSION 
-    if 'ui_placeholders' not in st.session_state:
-        st.session_state.ui_placeholders = render_dashboard()
-
-    # MAIN LOOP
-    while True:
-        eeg_data = stream.get_data()
-        
-        if 'plot_queue' in st.session_state and eeg_data.shape[1] > 0:
-            try: st.session_state.plot_queue.put_nowait(eeg_data)
-            except Full: pass
-        
-        if not eeg_data.any(): 
-            time.sleep(0.02)
-            continue
-
-        st.session_state.main_buffer = np.concatenate((st.session_state.main_buffer, eeg_data), axis=1)
-
-        if st.session_state.main_buffer.shape[1] >= samples_for_processor:
-            processing_data = st.session_state.main_buffer[:, -samples_for_processor:]
-
-            # process EEG data ONCE
-            arousal, artifact_detected, _ = processor.process_eeg(processing_data.copy())
-            in_range, last_good_arousal = controller.update_state(arousal, processor.viability_band, artifact_detected)
-            
-            # track history
-            st.session_state.total_samples += 1
-            if artifact_detected:
-                st.session_state.artifact_count += 1
-
-            new_entry = pd.DataFrame([{
-                "arousal": last_good_arousal,
-                "lower_band": processor.viability_band[0],
-                "upper_band": processor.viability_band[1],
-                "in_range": in_range,
-                "artifact": artifact_detected
-            }])
-            st.session_state.real_history = pd.concat([st.session_state.real_history, new_entry], ignore_index=True)
-            if len(st.session_state.real_history) > 200:
-                st.session_state.real_history = st.session_state.real_history.iloc[-200:]
-
-            # calc session stats
-            session_duration = time.time() - st.session_state.session_start_time
-            artifact_rate = (st.session_state.artifact_count / st.session_state.total_samples * 100) if st.session_state.total_samples > 0 else 0
-            session_stats = {
-                'duration': session_duration,
-                'total_samples': st.session_state.total_samples,
-                'artifact_rate': artifact_rate
-            }
-
-            update_main_dashboard(
-                st.session_state.ui_placeholders, 
-                last_good_arousal, 
-                processor.viability_band, 
-                in_range, 
-                artifact_detected,
-                st.session_state.real_history,
-                session_stats
-            )
-            
-            max_buffer_size = sampling_rate * 5 # 5seconds
-            if st.session_state.main_buffer.shape[1] > max_buffer_size:
-                st.session_state.main_buffer = st.session_state.main_buffer[:, -max_buffer_size:]
-        
-        time.sleep(0.02)
+    # MAIN SESSION: acquisition + decisions run on the LiveSession thread of the shared engine, outside the script run.
+    # the sidebar controls and the dashboard are fragments -> moving a slider reruns only its fragment and
+    # the new value is picked up at the next hop, the loop itself never restarts
+    if 'live_session' not in shared:
+        shared['live_session'] = LiveSession(stream, processor, controller, plot_queue=shared.get('plot_queue'))
+    live_session = shared['live_session']
+    if owner:
+        with st.sidebar:
+            live_controls(live_session)
+            profiler_controls(live_session)
+    else:
+        settings = live_session.settings
+        st.sidebar.caption(f"Band width {settings.get('band_scale', 1.0):.1f}x, hop {settings.get('hop_seconds', processor.hop_seconds):.2f}s"
+                           f"{', adaptive band' if settings.get('adaptive_band') else ''}"
+                           f"{', adaptive hop' if settings.get('adaptive_hop') else ''}"
+                           f"{', predictive' if settings.get('predictive') else ''}")
+    live_session.start()
+    live_dashboard()
+    profile_report(engine)
+
+
+#sidebar of a running session (controller owner only); widget changes rerun only this fragment
+@st.fragment
+def live_controls(live_session):
+    engine = current_engine()
+    if not is_owner(engine):
+        st.rerun()  # somebody else took control -> read-only page
+    shared = engine.state
+    st.divider()
+    width_multiplier = st.slider(
+        "Band Width",
+        min_value=0.5,
+        max_value=2.0,
+        value=1.0,
+        step=0.1,
+        format="%.1fx",
+        key="band_width_multiplier",
+    )
+    adaptive_band = st.checkbox("Adaptive Band (follow slow drift)", key="adaptive_band")
+    hop_seconds = st.slider("Decision Hop", 0.05, 1.0, 0.1, 0.05, format="%.2fs", key="decision_hop")
+    adaptive_hop = st.checkbox("Adaptive Hop (back off under CPU load)", key="adaptive_hop")
+    predictive = st.checkbox("Predictive Estimator (react sooner)", key="predictive_estimator")
+    record_raw = st.checkbox("Record Raw EEG (for export)", key="record_raw")
+
+    # decisions out to external lights / audio / haptics, rebuilt when the targets change
+    with st.expander("Output Bus"):
+        osc_targets = st.text_input("OSC targets (host:port, ...)", key="bus_osc").strip()
+        udp_targets = st.text_input("JSON/UDP targets (host:port, ...)", key="bus_udp").strip()
+        websocket_port = st.number_input("WebSocket port (0 = off)", 0, 65535, 0, key="bus_websocket_port")
+    bus_config = (osc_targets, udp_targets, int(websocket_port))
+    # the session keeps running; it switches to the new bus at its next hop (a publish to the closed one is a no-op)
+    if shared.get('output_bus_config') != bus_config:
+        if shared.get('output_bus') is not None:
+            shared['output_bus'].close()
+        shared['output_bus'] = None
+        shared['output_bus_config'] = bus_config
+        if any(bus_config):
+            from actuator.output_bus import OutputBus
+            try:
+                shared['output_bus'] = OutputBus(
+                    osc_targets=[t for t in osc_targets.split(",") if t.strip()],
+                    udp_targets=[t for t in udp_targets.split(",") if t.strip()],
+                    websocket_port=int(websocket_port) or None)
+            except (OSError, ValueError) as e:
+                st.error(f"Output bus: {e}")
+
+    # width is applied around the calibrated (or drift-tracked) Q1/Q3 band
+    live_session.update_settings(band_scale=width_multiplier, adaptive_band=adaptive_band, hop_seconds=hop_seconds,
+                                 adaptive_hop=adaptive_hop, predictive=predictive, record_raw=record_raw,
+                                 output_bus=shared.get('output_bus'))
+    share_controls(engine, LIVE_CONTROL_KEYS)
+
+
+#redraws from the session snapshot on its own timer, independent of the decision rate
+@st.fragment(run_every=0.25)
+def live_dashboard():
+    from processing.downsample import CHART_POINTS
+    from actuator.ui import render_dashboard, update_main_dashboard
+
+    engine = current_engine()
+    if engine is None or page_changed_since_run(engine):
+        st.rerun()  # stopped / restarted by the controlling viewer
+    live_session = engine.state.get('live_session')
+    if live_session is None:
+        return
+    snapshot = live_session.snapshot(points=CHART_POINTS)  # the whole session, bounded point count
+    if snapshot['error']:
+        st.error(f"Acquisition stopped: {snapshot['error']}")
+    placeholders = render_dashboard()
+    latest = snapshot['latest']
+    if latest is None:
+        placeholders["status_container"].info("Waiting for the first decision...")
+        return
+    update_main_dashboard(
+        placeholders, 
+        latest["arousal"], 
+        snapshot['viability_band'], 
+        latest["in_range"], 
+        latest["artifact"],
+        snapshot['history'],
+        snapshot['stats']
+    )
         
         
         
 #--------------------------SIMULATION MODE----------------------------------------------------------------------------------
 
-def run_simulation_mode():
+def run_simulation_mode(engine):
+    from actuator.sim_ui import render_sim_buttons, render_sim_analysis
+
     st.title("System Viability Simulation")
 
-    if 'sim_is_running' not in st.session_state: st.session_state.sim_is_running = False
-    if 'sim_stream' not in st.session_state: st.session_state.sim_stream = SimulatedStream()
-    if 'sim_history' not in st.session_state: st.session_state.sim_history = pd.DataFrame()
-    
+    # the simulation steps on the SimulationSession thread of the shared engine; controls and dashboard are fragments
+    shared = engine.state
+    st.session_state.engine_revision = shared['revision']
+    owner = render_ownership(engine)
+    sim_session = shared['sim_session']
+
+    start_button = stop_button = False
+    if owner:
+        with st.sidebar:
+            sim_controls(sim_session)
+            gain_search_progress()
+            profiler_controls(sim_session)
+        start_button, stop_button = render_sim_buttons()
+    else:
+        controls = sim_session.controls
+        st.sidebar.caption(f"{controls['state_name']}, target {controls['target_arousal']:.2f}, {controls['controller_type']} "
+                           f"(kp {controls['kp']:.2f}, ki {controls['ki']:.3f}, kd {controls['kd']:.2f}), "
+                           f"feedback {'on' if controls['feedback_on'] else 'off'}")
+    if start_button:
+        shared.pop('final_history', None)
+        sim_session.start(st.session_state.state_name)
+        page_changed(engine)
+        st.rerun()
+    if stop_button and sim_session.running:
+        sim_session.stop()
+        shared['final_history'] = sim_session.snapshot(recent=None)['history']
+        page_changed(engine)
+        st.rerun()
+
+    history = shared.get('final_history')
+    if sim_session.running:
+        sim_dashboard()
+    elif history is not None and not history.empty:
+        st.info("Simulation stopped. Showing analysis of the collected data.")
+        controls = sim_session.controls
+        render_sim_analysis(history, controls["target_arousal"], controls["sensor_sampling_rate"],
+                            session_id=sim_session.session_id)
+        engine_heartbeat()
+    else:
+        engine_heartbeat()
+    profile_report(engine)
+
+
+#simulation sidebar (controller owner only); widget changes rerun only this fragment and reach the running
+# simulation at its next step
+@st.fragment
+def sim_controls(sim_session):
+    from streams.simulated_stream import SIM_DEFAULTS, SIM_SCENARIOS
+    from actuator.sim_ui import render_sim
+
+    engine = current_engine()
+    if not is_owner(engine):
+        st.rerun()
+
     def set_scenario(scenario_name):
-        st.session_state.sim_is_running = True
-        st.session_state.sim_history = pd.DataFrame(columns=["arousal", "lower_band", "upper_band", "fatigue", "energy", "energy_spent", "in_band"])
-        
-        if scenario_name == "caffeine":
-            st.session_state.gain = 0.5; st.session_state.latency = 2; st.session_state.noise_level = 0.02; st.session_state.environmental_threat = 0.0; st.session_state.effort_amplification = 5.0
-        elif scenario_name == "drowsy":
-            st.session_state.state_name = "Focused"; st.session_state.gain = 0.05; st.session_state.latency = 30; st.session_state.noise_level = 0.01; st.session_state.environmental_threat = 0.0; st.session_state.effort_amplification = 3.0
-        elif scenario_name == "exam":
-            st.session_state.state_name = "Focused"; st.session_state.target_arousal = 0.6; st.session_state.gain = 0.15; st.session_state.environmental_threat = 0.4; st.session_state.effort_amplification = 5.0
-        
-        st.session_state.sim_stream.reset(st.session_state.state_name)
+        for key, value in SIM_SCENARIOS[scenario_name].items():
+            st.session_state[key] = value
+        sim_session.set_controls({key: st.session_state[key] for key in SIM_DEFAULTS})
+        engine.state.pop('final_history', None)
+        sim_session.start(st.session_state.state_name)
+        page_changed(engine)
+        st.session_state.sim_restarted = True
+
+    # gains found by the offline optimizer go into the sliders before they are drawn
+    tuned = st.session_state.pop('tuned_gains', None)
+    if tuned is not None:
+        st.session_state.update(tuned)
 
-    sim_stream = st.session_state.sim_stream
     controls = render_sim(
         on_caffeine_click=lambda: set_scenario("caffeine"),
         on_drowsy_click=lambda: set_scenario("drowsy"),
         on_exam_click=lambda: set_scenario("exam")
     )
+    sim_session.set_controls({key: controls[key] for key in SIM_DEFAULTS})
+    share_controls(engine, SIM_DEFAULTS)
+
+    if controls["spike_up"]: sim_session.spike(0.2)
+    if controls["spike_down"]: sim_session.spike(-0.2)
+    if controls["auto_tune_button"]:
+        sim_session.start_auto_tuning()
+        st.info("Auto-Tuning process started...")
+    if controls["optimize_button"]:
+        optimize_sim_gains(controls)
+    report = st.session_state.get('tuning_report')
+    if report:
+        st.success(report)
+    error = st.session_state.get('tuning_error')
+    if error:
+        st.error(error)
+    # a scenario started a new run -> the main area switches to the live dashboard
+    if st.session_state.pop('sim_restarted', False):
+        st.rerun()
+
+
+#offline search over the current settings and every preset scenario (controller/tuning.py) on a background thread,
+# so the sidebar stays responsive; gain_search_progress shows it and pushes the result into the sliders
+def optimize_sim_gains(controls):
+    from streams.simulated_stream import SIM_DEFAULTS
+    from controller.tuning import GainSearch
+
+    search = st.session_state.get('gain_search')
+    if search is None or search.done.is_set():
+        st.session_state.tuning_report = st.session_state.tuning_error = None
+        st.session_state.gain_search = GainSearch({key: controls[key] for key in SIM_DEFAULTS}).start()
+
+
+#progress of the running gain search; once it is done the gains go into the sliders on a full rerun
+@st.fragment(run_every=0.5)
+def gain_search_progress():
+    search = st.session_state.get('gain_search')
+    if search is None:
+        return
+    if not search.done.is_set():
+        cost = "" if search.best_cost is None else f" cost {search.best_cost:.3f}"
+        st.progress(search.generation / search.generations, text=f"Optimizing gains...{cost}")
+        return
+    del st.session_state.gain_search
+    if search.error is not None:
+        st.session_state.tuning_error = f"Gain search failed: {search.error}"
+    else:
+        result = search.result
+        st.session_state.tuned_gains = {key: round(value, 4) for key, value in result['gains'].items()}
+        st.session_state.tuning_report = (
+            f"Gains optimized: cost {result['start']['cost']:.3f} -> {result['cost']:.3f} "
+            f"({result['evaluations']} candidates): "
+            + ", ".join(f"{key} {value:.3f}" for key, value in result['gains'].items()))
+    st.rerun()
+
+
+@st.fragment(run_every=0.2)
+def sim_dashboard():
+    from processing.downsample import CHART_POINTS
+    from actuator.sim_ui import render_sim_dashboard, update_dashboard
+
+    engine = current_engine()
+    if engine is None or page_changed_since_run(engine):
+        st.rerun()  # stopped / restarted by the controlling viewer
+    sim_session = engine.state['sim_session']
+    snapshot = sim_session.snapshot(points=CHART_POINTS)
+    if snapshot['error']:
+        st.error(f"Simulation stopped: {snapshot['error']}")
     live_placeholders = render_sim_dashboard()
+    latest = snapshot['latest']
+    if latest is None:
+        return
 
     state_intervals = {}
     FIXED_FLUX_FOR_DISPLAY = 0.05 
-    for state, values in sim_stream.states.items():
+    for state, values in sim_session.sim_stream.states.items():
         initial = values['initial_arousal']
         state_intervals[state] = [initial - FIXED_FLUX_FOR_DISPLAY, initial + FIXED_FLUX_FOR_DISPLAY]
 
-    if controls["start_button"]:
-        st.session_state.sim_is_running = True
-        st.session_state.sim_history = pd.DataFrame(columns=["arousal", "lower_band", "upper_band", "fatigue", "energy", "energy_spent", "in_band"])
-        sim_stream.reset(controls["state_name"])
-        # clear
-        if 'post_analysis_container' in st.session_state:
-            st.session_state.post_analysis_container.empty()
-            del st.session_state.post_analysis_container
+    update_dashboard(live_placeholders, latest["arousal"], latest["viability_band"], snapshot['history'],
+                     latest["noise_level"], latest["fatigue"], latest["is_burnt_out"], state_intervals, latest["energy"],
+                     latest["pid_gains"])
+
+#--------------------------PROFILER----------------------------------------------------------------------------------------
+
+#time-boxed profile of the running session loop (controller owner only, see streams/profiler.py): the capture runs
+# next to the session, which keeps going; when it is done the toggle switches back off and the page shows the report
+@st.fragment(run_every=1.0)
+def profiler_controls(session):
+    from streams.profiler import PROFILE_MODES, SessionProfiler
+
+    engine = current_engine()
+    if engine is None or not is_owner(engine):
+        st.rerun()
+    shared = engine.state
+    profiler = shared.get('profiler')
+    capturing = profiler is not None and not profiler.done.is_set()
+    if profiler is not None and not capturing and shared.get('profile_result') is not profiler.result:
+        shared['profile_result'] = profiler.result
+        st.session_state.profiler_on = False
         st.rerun()
 
-    if controls["stop_button"]: st.session_state.sim_is_running = False; st.rerun()
-    if controls["spike_up"]: sim_stream.apply_spike(0.2);
-    if controls["spike_down"]: sim_stream.apply_spike(-0.2);
+    def toggle():
+        current = shared.get('profiler')
+        running = current is not None and not current.done.is_set()
+        if st.session_state.profiler_on and not running:
+            session.profiler = SessionProfiler(session.session_id, session.thread, st.session_state.profiler_mode,
+                                               st.session_state.profiler_duration)
+            shared['profiler'] = session.profiler.start()
+        elif not st.session_state.profiler_on and running:
+            current.stop()
 
-    if controls["auto_tune_button"]:
-        sim_stream.start_auto_tuning()
-        st.info("Auto-Tuning process started...")
-        
-    if st.session_state.sim_is_running:
-        st.session_state.get('post_analysis_container', st.empty()).empty()
-        while st.session_state.sim_is_running:
-            control_keys = [
-                "state_name", "target_arousal", "natural_flux", "latency", 
-                "sensor_sampling_rate", "kp", "ki", "kd", "noise_level", 
-                "feedback_on", "environmental_threat", "effort_amplification", 
-                "controller_type"
-            ]
-            current_controls = {key: st.session_state.get(key) for key in control_keys}
-        
-            # pass new PID gains & controller type
-            arousal, viability_band, fatigue, is_burnt_out, energy, pid_gains, energy_spent = sim_stream.get_arousal_value(
-                current_controls["state_name"], current_controls["target_arousal"],
-                current_controls["natural_flux"], current_controls["noise_level"], 
-                current_controls["kp"], current_controls["ki"], current_controls["kd"],
-                current_controls["latency"], current_controls["feedback_on"],
-                current_controls["environmental_threat"], current_controls["effort_amplification"],
-                current_controls["controller_type"]  
-
-            )
-
-            # check if in viability band
-            in_band = viability_band[0] <= arousal <= viability_band[1]
-
-            new_entry = pd.DataFrame([{
-                "arousal": arousal, 
-                "lower_band": viability_band[0], 
-                "upper_band": viability_band[1], 
-                "fatigue": fatigue, 
-                "energy": energy,
-                "energy_spent": energy_spent,
-                "in_band": in_band
-            }])
-            st.session_state.sim_history = pd.concat([st.session_state.sim_history, new_entry], ignore_index=True)
-            if len(st.session_state.sim_history) > 200: st.session_state.sim_history = st.session_state.sim_history.iloc[-200:]
-            
-            update_dashboard(live_placeholders, arousal, viability_band, st.session_state.sim_history, current_controls["noise_level"], fatigue, is_burnt_out, state_intervals, energy, pid_gains)            
-            time.sleep(1 / current_controls["sensor_sampling_rate"])
-            
-            if not st.session_state.sim_is_running: break
-    
-    elif not st.session_state.sim_history.empty:
-        live_placeholders["live_area"].empty()
-        post_analysis_container = st.container()
-        st.session_state.post_analysis_container = post_analysis_container
-        with post_analysis_container:
-            st.info("Simulation stopped. Showing analysis of the collected data.")
-            sampling_rate = st.session_state.get("sensor_sampling_rate", 20)
-            render_sim_analysis(st.session_state.sim_history, st.session_state.target_arousal, sampling_rate)
+    with st.expander("Profiler", expanded=capturing):
+        st.selectbox("Profiler", PROFILE_MODES, key="profiler_mode", disabled=capturing, label_visibility="collapsed",
+                     format_func=lambda m: {"sampling": "Sampling (low overhead)", "cprofile": "cProfile (exact, slows the loop)"}[m])
+        st.slider("Capture Length", 2, 60, 10, format="%ds", key="profiler_duration", disabled=capturing)
+        st.toggle("Profile Session", key="profiler_on", on_change=toggle, disabled=not session.running and not capturing)
+        if capturing:
+            st.progress(1 - profiler.remaining / profiler.duration, text=f"Profiling... {profiler.remaining:.0f} s left")
+
+
+def profile_report(engine):
+    from actuator.ui import render_profile
+
+    result = engine.state.get('profile_result')
+    if result is not None:
+        with st.expander(f"Profile of session {result.get('session_id')}", expanded=True):
+            render_profile(result)
+
+
+#--------------------------MULTI-DEVICE MODE----------------------------------------------------------------------------------
+
+def run_multi_mode():
+    from streams.stream_manager import StreamManager, muse_factory, synthetic_factory
+    from actuator.multi_ui import render_multi_sidebar
+
+    st.title("Multi-Device Session")
+    controls = render_multi_sidebar()
+
+    if controls["stop_button"] and 'stream_manager' in st.session_state:
+        st.session_state.stream_manager.stop()
+
+    if controls["start_button"]:
+        if 'stream_manager' in st.session_state:
+            st.session_state.stream_manager.stop()
+        if not controls["devices"]:
+            st.warning("Add at least one device.")
+            return
+        factory = synthetic_factory if controls["synthetic"] else muse_factory
+        try:
+            st.session_state.stream_manager = StreamManager(controls["devices"], stream_factory=factory)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.session_state.stream_manager.start()
+
+    manager = st.session_state.get('stream_manager')
+    if manager is None:
+        st.info("List the headsets in the sidebar and press Start All.")
+        return
+
+    multi_overview()
+
+
+# acquisition runs on the manager threads, this fragment only redraws
+@st.fragment(run_every=0.25)
+def multi_overview():
+    from actuator.multi_ui import render_overview, update_overview
+
+    manager = st.session_state.get('stream_manager')
+    if manager is None:
+        return
+    placeholders = render_overview(list(manager.sessions))
+    update_overview(placeholders, manager.health(), manager.histories())
 
 #----------------------------------------------------------------------------------------------------------------------------
 def main():
@@ -344,50 +671,67 @@ def main():
 
     mode = st.sidebar.selectbox(
         "Select Application Mode",
-        ("Select a mode...", "Live EEG", "Simulation Mode"),
+        ("Select a mode...", "Live EEG", "Multi-Device", "Simulation Mode"),
         key='mode_selector'
     )
 
-    #checks for mode change -> queue for multiprocessing
+    #checks for mode change -> leave this tab's engine (closed once nobody watches it anymore)
     if mode != st.session_state.mode:
-        if 'plot_process' in st.session_state and st.session_state.plot_process.is_alive():
-            st.session_state.plot_process.terminate()
-            st.session_state.plot_process.join() 
-            st.session_state.pop('plot_process')
-            st.session_state.pop('plot_queue')
+        from streams.engine_hub import HUB
+
+        if 'stream_manager' in st.session_state:
+            st.session_state.pop('stream_manager').stop()
+        if 'engine_key' in st.session_state:
+            HUB.detach(st.session_state.pop('engine_key'), viewer_id())
         st.session_state.mode = mode
         st.rerun()
 
 
     if mode == "Live EEG":
-        if 'plot_process' not in st.session_state:
-            st.info("Starting live plot window...")
-            board_id = BoardIds.MUSE_2_BOARD.value
-            
-            plot_queue = mp.Queue()
-            st.session_state.plot_queue = plot_queue
-            
-            plot_process = mp.Process(
-                target=run_plot, 
-                args=(plot_queue, BoardShim.get_sampling_rate(board_id), BoardShim.get_eeg_names(board_id), 5),
-                daemon=True  #clean close
-            )
-            plot_process.start()
-            st.session_state.plot_process = plot_process
-            
-            time.sleep(2)  
-            st.success("Plot window started!")
-
-        if 'stream' not in st.session_state:
-            try:
-                st.session_state.stream = MuseStream(data_queue=st.session_state.plot_queue)
-            except Exception as e:
-                st.error(f"Failed to connect to Muse: {e}")
-                st.stop()
-        run_real_mode()
+        from streams.engine_hub import HUB
+
+        board_info = get_board_info()
+        attached = 'engine_key' in st.session_state
+        # 128/64 Hz is enough for bands up to 45/29 Hz and makes every buffer, filter and fft smaller
+        decimation = st.sidebar.selectbox("Processing Rate", (1, 2, 4), format_func=lambda f: f"{board_info['sampling_rate'] // f} Hz",
+                                          key="decimation", disabled=attached)
+        resample = st.sidebar.checkbox("Fill Lost Packets (interpolate)", key="resample", disabled=attached)
+        # BLE straight to the headset, or eeg relayed as OSC/UDP by a companion app / another host
+        source = st.sidebar.radio("EEG Source", ("Muse (Bluetooth)", "Network Relay (OSC/UDP)"), key="eeg_source",
+                                  disabled=attached)
+        relay_port = None
+        if source.startswith("Network"):
+            relay_port = st.sidebar.number_input("Relay UDP Port", 1, 65535, 5000, key="relay_port", disabled=attached)
+        # one engine per device: a second tab on the same headset / relay port joins the running one
+        key = st.session_state.get('engine_key', f"udp:{int(relay_port)}" if relay_port else "muse")
+        if attached:
+            # the settings above are fixed while connected: disconnect, change them, connect again
+            # (the device is only reopened with them once no other viewer watches it)
+            if st.sidebar.button("Disconnect", key="disconnect_button"):
+                HUB.detach(st.session_state.pop('engine_key'), viewer_id())
+                st.rerun()
+        elif HUB.get(key) is None and not st.sidebar.button("Connect", key="connect_button", type="primary"):
+            st.title("Live EEG")
+            st.info("Choose the EEG source and processing settings in the sidebar, then press Connect.")
+            st.stop()
+        try:
+            engine = HUB.attach(key, viewer_id(), on_close=close_engine,
+                                create=lambda engine: open_live_engine(engine, source, relay_port, decimation, resample))
+        except Exception as e:
+            st.error(f"Failed to connect to {source}: {e}")
+            st.stop()
+        st.session_state.engine_key = key
+        run_real_mode(engine)
+
+    elif mode == "Multi-Device":
+        run_multi_mode()
 
     elif mode == "Simulation Mode":
-        run_simulation_mode()
+        from streams.engine_hub import HUB
+
+        engine = HUB.attach("simulation", viewer_id(), create=open_sim_engine, on_close=close_engine)
+        st.session_state.engine_key = "simulation"
+        run_simulation_mode(engine)
 
     else:
         st.title("Muse Arousal Stability System")
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+#index of the sample that completes the first run of `length` consecutive True values (None if there is none)
+# run-length encoding of the mask instead of walking it sample by sample
+def first_run_end(mask, length):
+    mask = np.asarray(mask, dtype=bool)
+    length = max(int(length), 1)
+    edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    long_enough = np.flatnonzero(ends - starts >= length)
+    if len(long_enough) == 0:
+        return None
+    return int(starts[long_enough[0]]) + length - 1
+
+
+#post-session metrics on plain arrays, nothing is written back into the history DataFrame
+# goal = `goal_seconds` in band without a break; energy / energy_spent (simulation) are read at the goal sample
+def session_analysis(arousal, target, in_band=None, artifact=None, sampling_rate=10, goal_seconds=3,
+                     energy=None, energy_spent=None, bins=30):
+    arousal = np.asarray(arousal, dtype=float)
+    position_error = arousal - target
+    velocity = np.diff(arousal, prepend=arousal[:1])
+    velocity[np.isnan(velocity)] = 0.0
+    finite_error = position_error[np.isfinite(position_error)]
+
+    goal_index = first_run_end(in_band, goal_seconds * sampling_rate) if in_band is not None else None
+    result = {
+        'position_error': position_error,
+        'velocity_error': velocity,
+        'cost': float(np.sum(finite_error ** 2)),
+        'goal_index': goal_index,
+        'time_to_goal': (goal_index + 1) / sampling_rate if goal_index is not None else None,
+        'in_band_pct': float(np.mean(in_band) * 100) if in_band is not None and len(arousal) else 0.0,
+        'artifact_pct': float(np.mean(artifact) * 100) if artifact is not None and len(arousal) else 0.0,
+        'energy_at_goal': None,
+        'energy_spent_at_goal': None,
+        'histogram': np.histogram(finite_error, bins=bins) if len(finite_error) else None,
+    }
+    if goal_index is not None and energy is not None:
+        result['energy_at_goal'] = float(energy[goal_index])
+    if goal_index is not None and energy_spent is not None:
+        result['energy_spent_at_goal'] = float(np.nansum(energy_spent[:goal_index + 1]))
+    return result
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+#per-channel signal-quality stats of one window, all channels at once
+def window_stats(window):
+    return {
+        "variance": np.var(window, axis=1),
+        "ptp": np.ptp(window, axis=1),
+        "line_length": np.abs(np.diff(window, axis=1)).sum(axis=1),
+    }
+
+
+#same stats over the last `window_samples` samples, updated incrementally as chunks arrive
+# running sums are kept relative to a per-channel reference value (numerically stable like Welford)
+# and rebuilt from the ring once per window length, so drift never accumulates
+class ArtifactDetector:
+    def __init__(self, num_channels, window_samples):
+        self.window = window_samples
+        self.ring = np.zeros((num_channels, window_samples))
+        self.diff_ring = np.zeros((num_channels, window_samples))  # |x[t] - x[t-1]| for each sample in the ring
+        self.pos = 0
+        self.count = 0
+        self.shift = None
+        self.last_sample = None
+        self.sum = np.zeros(num_channels)
+        self.sumsq = np.zeros(num_channels)
+        self.line_length = np.zeros(num_channels)
+
+    def push(self, chunk):
+        k = chunk.shape[1]
+        if k == 0:
+            return
+        if self.shift is None:
+            self.shift = chunk[:, :1].copy()
+            self.last_sample = chunk[:, 0].copy()
+
+        x = chunk - self.shift
+        diffs = np.abs(np.diff(chunk, axis=1, prepend=self.last_sample[:, None]))
+        self.last_sample = chunk[:, -1].copy()
+
+        # at most two contiguous segments (before/after wrap); never-written slots are 0, so subtracting is safe
+        written = 0
+        while written < k:
+            n = min(k - written, self.window - self.pos)
+            seg = slice(self.pos, self.pos + n)
+            new_x, new_d = x[:, written:written + n], diffs[:, written:written + n]
+            old_x, old_d = self.ring[:, seg], self.diff_ring[:, seg]
+            self.sum += (new_x - old_x).sum(axis=1)
+            self.sumsq += (new_x * new_x - old_x * old_x).sum(axis=1)
+            self.line_length += (new_d - old_d).sum(axis=1)
+            self.ring[:, seg] = new_x
+            self.diff_ring[:, seg] = new_d
+            written += n
+            self.count = min(self.window, self.count + n)
+            self.pos = (self.pos + n) % self.window
+            if self.pos == 0:
+                self.rebuild()
+
+    def rebuild(self):
+        data = self.ring[:, :self.count]
+        self.sum = data.sum(axis=1)
+        self.sumsq = (data * data).sum(axis=1)
+        self.line_length = self.diff_ring[:, :self.count].sum(axis=1)
+
+    @property
+    def is_full(self):
+        return self.count == self.window
+
+    def stats(self):
+        n = max(self.count, 1)
+        mean = self.sum / n
+        return {
+            "variance": np.maximum(self.sumsq / n - mean * mean, 0.0),
+            "ptp": np.ptp(self.ring[:, :self.count], axis=1) if self.count else np.zeros(len(self.sum)),
+            # the oldest diff reaches back before the window -> leave it out
+            "line_length": self.line_length - self.diff_ring[:, self.pos if self.is_full else 0],
+        }
@@ -0,0 +1,74 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+#linear-phase low-pass FIR (kaiser window) for decimating by `factor`
+# passband defaults to 45 Hz (top of the gamma band) or 0.45 * output rate, whichever is lower;
+# the stopband starts where the first alias would fold back onto the passband edge
+def design_antialias(factor, sampling_rate, passband=None, attenuation=60.0):
+    out_rate = sampling_rate / factor
+    passband = passband if passband is not None else min(45.0, 0.45 * out_rate)
+    stopband = out_rate - passband
+    if stopband <= passband:
+        raise ValueError(f"passband {passband} Hz does not fit an output rate of {out_rate} Hz")
+
+    transition = 2 * np.pi * (stopband - passband) / sampling_rate
+    num_taps = int(np.ceil((attenuation - 7.95) / (2.285 * transition))) + 1
+    num_taps += 1 - num_taps % 2  # odd -> integer group delay
+    if attenuation > 50:
+        beta = 0.1102 * (attenuation - 8.7)
+    else:
+        beta = 0.5842 * (attenuation - 21) ** 0.4 + 0.07886 * (attenuation - 21)
+
+    cutoff = (passband + stopband) / 2 / sampling_rate  # cycles per input sample
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(num_taps, beta)
+    return taps / taps.sum()  # unity gain at DC
+
+
+#streaming anti-alias filter + downsampler for (n_channels x n_samples) chunks
+# only every factor-th output is computed (polyphase-equivalent cost), and the last num_taps - 1
+# input samples plus the output phase carry over, so chunk boundaries never show up in the output
+class PolyphaseDecimator:
+    def __init__(self, factor, sampling_rate, passband=None, attenuation=60.0):
+        self.factor = int(factor)
+        self.input_rate = sampling_rate
+        self.sampling_rate = sampling_rate // self.factor  # brainflow filters want an integer rate
+        if sampling_rate % self.factor:
+            raise ValueError(f"{sampling_rate} Hz is not divisible by a decimation factor of {self.factor}")
+        self.taps = design_antialias(self.factor, sampling_rate, passband, attenuation) if self.factor > 1 else np.ones(1)
+        self.reversed_taps = self.taps[::-1].copy()
+        self.history = None
+        self.offset = 0  # start of the next output's input window, relative to the carried-over history
+
+    # latency added by the filter (linear phase -> same for every frequency)
+    @property
+    def delay_seconds(self):
+        return (len(self.taps) - 1) / 2 / self.input_rate
+
+    def reset(self):
+        self.history = None
+        self.offset = 0
+
+    def process(self, chunk):
+        if self.factor == 1:
+            return chunk
+        num_taps = len(self.taps)
+        if self.history is None:
+            if chunk.shape[1] == 0:
+                return chunk
+            # start from a flat signal at the first value instead of zeros -> no startup step
+            self.history = np.repeat(chunk[:, :1], num_taps - 1, axis=1)
+
+        x = np.concatenate((self.history, chunk), axis=1)
+        count = max(0, (x.shape[1] - num_taps - self.offset) // self.factor + 1)
+        if count:
+            windows = sliding_window_view(x, num_taps, axis=1)[:, self.offset:self.offset + count * self.factor:self.factor]
+            out = windows @ self.reversed_taps
+        else:
+            out = np.empty((x.shape[0], 0))
+
+        next_start = self.offset + count * self.factor
+        self.history = x[:, x.shape[1] - (num_taps - 1):]
+        self.offset = next_start - (x.shape[1] - (num_taps - 1))
+        return out
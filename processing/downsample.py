@@ -0,0 +1,70 @@
+import numpy as np
+
+# level of detail for charts: whatever the session length, the browser gets a bounded number of points
+CHART_POINTS = 1500
+DENSITY_BINS = 80
+
+
+#min / max of each bucket (plus both ends): keeps every peak and excursion, fully vectorized -> cheap enough
+# to run on the whole session at every dashboard tick
+def minmax_indices(y, points=CHART_POINTS):
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= points:
+        return np.arange(n)
+    buckets = max((points - 2) // 2, 1)
+    size = -(-n // buckets)
+    pad = size * buckets - n
+    missing = np.isnan(y)
+    low = np.pad(np.where(missing, np.inf, y), (0, pad), constant_values=np.inf).reshape(buckets, size)
+    high = np.pad(np.where(missing, -np.inf, y), (0, pad), constant_values=-np.inf).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    indices = np.concatenate(([0, n - 1], offsets + low.argmin(axis=1), offsets + high.argmax(axis=1)))
+    return np.unique(indices[indices < n])
+
+
+#largest-triangle-three-buckets: picks the point per bucket that best keeps the visual shape of the line
+# (one python step per output point, meant for the cached post-session charts)
+def lttb_indices(y, points=CHART_POINTS, x=None):
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= points or points < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    selected = np.empty(points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        average_x = x[end:next_end].mean()
+        average_y = np.nanmean(y[end:next_end]) if np.isfinite(y[end:next_end]).any() else y[a]
+        area = np.abs((x[a] - average_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (average_y - y[a]))
+        a = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        selected[i + 1] = a
+    return selected
+
+
+#rows of a history frame to draw: min-max over every column (each keeps its own peaks), or lttb on the first one
+def downsample_frame(frame, points=CHART_POINTS, columns=None, method="minmax"):
+    if len(frame) <= points:
+        return frame
+    columns = list(columns or frame.columns)
+    if method == "lttb":
+        indices = lttb_indices(frame[columns[0]].to_numpy(dtype=float), points)
+    else:
+        per_column = max(points // len(columns), 4)
+        indices = np.unique(np.concatenate([minmax_indices(frame[c].to_numpy(dtype=float), per_column) for c in columns]))
+    return frame.iloc[indices]
+
+
+#2D histogram of a point cloud as rectangles (only the occupied cells), for a phase portrait of any length
+def density_grid(x, y, bins=DENSITY_BINS):
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.any():
+        return {'x': [], 'x2': [], 'y': [], 'y2': [], 'count': []}
+    counts, x_edges, y_edges = np.histogram2d(x[finite], y[finite], bins=bins)
+    ix, iy = np.nonzero(counts)
+    return {'x': x_edges[ix], 'x2': x_edges[ix + 1], 'y': y_edges[iy], 'y2': y_edges[iy + 1], 'count': counts[ix, iy]}
@@ -0,0 +1,108 @@
+import numpy as np
+from brainflow.data_filter import DataFilter, DetrendOperations, FilterTypes, WindowOperations
+
+# same bands and filter chain as DataFilter.get_avg_band_powers(..., apply_filter=True)
+BANDS = {
+    "delta": (2.0, 4.0),
+    "theta": (4.0, 8.0),
+    "alpha": (8.0, 13.0),
+    "beta": (13.0, 30.0),
+    "gamma": (30.0, 45.0),
+}
+BAND_NAMES = list(BANDS)
+POSTERIOR = ('TP9', 'TP10')
+FRONTAL = ('AF7', 'AF8')
+
+
+#absolute band power of every clean channel, computed once per hop and shared by all features
+class Spectrum:
+    def __init__(self, powers, channel_names):
+        self.powers = powers  # n_channels x n_bands, NaN rows for skipped (bad) channels
+        self.channel_index = {name: i for i, name in enumerate(channel_names)}
+
+    def rows(self, names):
+        rows = [self.channel_index[name] for name in names if name in self.channel_index]
+        return [i for i in rows if not np.isnan(self.powers[i, 0])]
+
+    # brainflow semantics: average absolute powers over channels, then divide by the total
+    def relative(self, names):
+        rows = self.rows(names)
+        if not rows:
+            return None
+        mean = self.powers[rows].mean(axis=0)
+        return dict(zip(BAND_NAMES, mean / mean.sum()))
+
+    def absolute(self, name, band):
+        rows = self.rows([name])
+        return self.powers[rows[0], BAND_NAMES.index(band)] if rows else None
+
+
+def compute_spectrum(eeg_data, channel_rows, channel_names, sampling_rate):
+    nyquist = sampling_rate / 2
+    nfft = DataFilter.get_nearest_power_of_two(eeg_data.shape[1])
+    if nfft > eeg_data.shape[1]:
+        nfft //= 2
+    # at decimated rates drop stop bands / band edges above nyquist
+    stops = [(low, high) for low, high in ((48.0, 52.0), (58.0, 62.0)) if high < nyquist]
+    bandpass_high = min(45.0, 0.9 * nyquist)
+
+    powers = np.full((eeg_data.shape[0], len(BANDS)), np.nan)
+    for i in channel_rows:
+        x = eeg_data[i].copy()
+        DataFilter.detrend(x, DetrendOperations.CONSTANT.value)
+        for low, high in stops:
+            DataFilter.perform_bandstop(x, sampling_rate, low, high, 4, FilterTypes.BUTTERWORTH_ZERO_PHASE, 0.0)
+        DataFilter.perform_bandpass(x, sampling_rate, 2.0, bandpass_high, 4, FilterTypes.BUTTERWORTH_ZERO_PHASE, 0.0)
+        psd = DataFilter.get_psd_welch(x, nfft, nfft // 2, sampling_rate, WindowOperations.HANNING.value)
+        powers[i] = [DataFilter.get_band_power(psd, low, min(high, bandpass_high)) if low < bandpass_high else 0.0
+                     for low, high in BANDS.values()]
+    return Spectrum(powers, channel_names)
+
+
+#name -> function(spectrum) returning a float, or None when its channels are missing
+FEATURES = {}
+
+
+def register_feature(name):
+    def decorator(fn):
+        FEATURES[name] = fn
+        return fn
+    return decorator
+
+
+@register_feature("alpha_beta")
+def alpha_beta(spectrum):
+    # original index: posterior relative alpha (calm) minus frontal relative beta (alert)
+    posterior, frontal = spectrum.relative(POSTERIOR), spectrum.relative(FRONTAL)
+    if posterior is None or frontal is None:
+        return None
+    return posterior["alpha"] - frontal["beta"]
+
+
+@register_feature("theta_beta")
+def theta_beta(spectrum):
+    # drowsiness / inattention: rises when theta dominates beta
+    bands = spectrum.relative(POSTERIOR + FRONTAL)
+    return None if bands is None else bands["theta"] / bands["beta"]
+
+
+@register_feature("engagement")
+def engagement(spectrum):
+    # Pope engagement index beta / (alpha + theta)
+    bands = spectrum.relative(POSTERIOR + FRONTAL)
+    return None if bands is None else bands["beta"] / (bands["alpha"] + bands["theta"])
+
+
+@register_feature("frontal_asymmetry")
+def frontal_asymmetry(spectrum):
+    # ln(right alpha) - ln(left alpha); needs both frontal channels
+    right, left = spectrum.absolute('AF8', "alpha"), spectrum.absolute('AF7', "alpha")
+    if right is None or left is None or right <= 0 or left <= 0:
+        return None
+    return float(np.log(right) - np.log(left))
+
+
+@register_feature("posterior_alpha")
+def posterior_alpha(spectrum):
+    bands = spectrum.relative(POSTERIOR)
+    return None if bands is None else bands["alpha"]
@@ -0,0 +1,193 @@
+import time
+import numpy as np
+from processing.processor import Processor
+from controller.logic import Controller
+from processing.profiles import ProfileValidator, apply_profile
+from processing.artifacts import ArtifactDetector
+from processing.scheduler import HopScheduler
+
+
+#glue between a stream and Processor/Controller without any UI
+# buffers raw chunks, processes the latest window every `hop_seconds` and returns one decision per hop
+class SessionPipeline:
+    # calibration ends once the standard error of Q1/Q3 is small enough (>= min_calibration_samples clean hops)
+    # or at calibration_samples clean hops, whichever comes first
+    # with a stored `profile`, the first `validation_samples` clean hops only check it for drift;
+    # if it still fits it is applied, otherwise those hops count towards a full calibration
+    # hop_seconds defaults to the processor's hop; adaptive_hop stretches it (up to max_hop_seconds) when a hop's
+    # processing time nears the hop itself and shrinks it back when idle -> see metrics/summary decision_rate
+    def __init__(self, processor=None, controller=None, hop_seconds=None, calibration_samples=80, min_calibration_samples=30,
+                 profile=None, validation_samples=20, drift_tolerance=1.5, adaptive_hop=False, max_hop_seconds=1.0,
+                 packet_monitor=None):
+        self.processor = processor if processor is not None else Processor()
+        self.controller = controller if controller is not None else Controller()
+        self.calibration_samples = calibration_samples
+        self.validator = None
+        self.calibration_source = "preset" if self.processor.is_calibrated else None
+        if not self.processor.is_calibrated:
+            self.processor.start_calibration(min_samples=min(min_calibration_samples, calibration_samples),
+                                             max_samples=calibration_samples)
+            # a profile calibrated on another feature has a different scale -> recalibrate
+            if profile is not None and profile.get("feature", "alpha_beta") == self.processor.selected_feature:
+                self.validator = ProfileValidator(profile, samples=validation_samples, tolerance=drift_tolerance)
+
+        self.sampling_rate = self.processor.sampling_rate
+        if hop_seconds is not None:
+            self.processor.set_hop(hop_seconds)
+        # hops are counted in data time (sample indices), so the scheduler only decides the hop length here
+        self.scheduler = HopScheduler(self.processor.hop_seconds, adaptive=adaptive_hop, max_hop=max_hop_seconds)
+        self.window_samples = self.processor.window_samples
+        self.set_hop(self.processor.hop_seconds)
+
+        self.buffer = np.empty((len(self.processor.eeg_channels), 0))
+        self.buffer_start = 0    # absolute sample index of buffer[:, 0]
+        self.samples_received = 0
+        self.next_hop_end = self.window_samples
+        # channel stats are updated as samples arrive, so each hop's artifact check is O(1)
+        self.artifact_detector = ArtifactDetector(len(self.processor.eeg_channels), self.window_samples)
+        self.detector_fed = 0  # absolute index up to which samples went into the detector
+        # the stream's PacketMonitor (if any): its sample positions are the same absolute indices as ours
+        self.packet_monitor = packet_monitor
+
+        self.metrics = {
+            'samples_received': 0,
+            'hops': 0,
+            'artifacts': 0,
+            'process_time_total': 0.0,
+            'process_time_max': 0.0,
+            'stage_time_totals': {},
+            'bad_channel_counts': {},
+            'hop_changes': 0,
+            'dropped_windows': 0,
+        }
+        self.last_stage_times = {}
+
+    @property
+    def phase(self):
+        if self.processor.is_calibrated:
+            return "control"
+        return "validation" if self.validator is not None else "calibration"
+
+    # feed a (n_channels x n_samples) chunk, get back the decisions of every completed hop
+    def push(self, eeg_data):
+        if eeg_data.shape[1] == 0:
+            return []
+
+        self.buffer = np.concatenate((self.buffer, eeg_data), axis=1)
+        self.samples_received += eeg_data.shape[1]
+        self.metrics['samples_received'] = self.samples_received
+
+        decisions = []
+        while self.samples_received >= self.next_hop_end:
+            end = self.next_hop_end - self.buffer_start
+            self.artifact_detector.push(self.buffer[:, max(self.detector_fed - self.buffer_start, 0):end])
+            self.detector_fed = self.next_hop_end
+            window = self.buffer[:, end - self.window_samples:end]
+            dropped = 0
+            if self.packet_monitor is not None:
+                dropped = self.packet_monitor.dropped_between(self.next_hop_end - self.window_samples, self.next_hop_end)
+            decisions.append(self.process_window(window, self.next_hop_end / self.sampling_rate, self.artifact_detector.stats(), dropped))
+            self.next_hop_end += self.hop_samples
+
+        # keep only what the next window still needs
+        keep_from = self.next_hop_end - self.window_samples - self.buffer_start
+        if keep_from > 0:
+            self.buffer = self.buffer[:, keep_from:]
+            self.buffer_start += keep_from
+        return decisions
+
+    def process_window(self, window, timestamp, artifact_stats=None, dropped_samples=0):
+        processor = self.processor
+        phase = self.phase
+        hop = processor.hop_seconds
+
+        start = time.perf_counter()
+        arousal, artifact_detected, variance = processor.process_eeg(window.copy(), artifact_stats, dropped_samples)
+        bad_channels = [name for name, bad in zip(processor.channel_names, processor.last_bad_channels) if bad]
+        control_start = time.perf_counter()
+        if phase != "control":
+            if arousal is not None and not artifact_detected:
+                converged = processor.add_calibration_value(arousal)
+                if phase == "validation":
+                    self.check_profile(arousal)
+                elif converged or processor.calibration_values.count >= self.calibration_samples:
+                    processor.finish_calibration()
+                    self.calibration_source = "calibration"
+            in_range, last_good_arousal = None, arousal
+        else:
+            raw_index = processor.last_features.get(processor.selected_feature)
+            in_range, last_good_arousal = self.controller.update_state(arousal, processor.viability_band, artifact_detected, raw_index)
+        end = time.perf_counter()
+        elapsed = end - start
+
+        self.last_stage_times = {**processor.stage_times, 'controller': end - control_start}
+        self.last_stage_times['overhead'] = elapsed - sum(self.last_stage_times.values())
+        for stage, seconds in self.last_stage_times.items():
+            self.metrics['stage_time_totals'][stage] = self.metrics['stage_time_totals'].get(stage, 0.0) + seconds
+
+        self.metrics['hops'] += 1
+        self.metrics['artifacts'] += int(artifact_detected)
+        self.metrics['dropped_windows'] += int(dropped_samples > processor.max_dropped_fraction * self.window_samples)
+        for name in bad_channels:
+            self.metrics['bad_channel_counts'][name] = self.metrics['bad_channel_counts'].get(name, 0) + 1
+        self.metrics['process_time_total'] += elapsed
+        self.metrics['process_time_max'] = max(self.metrics['process_time_max'], elapsed)
+        self.update_hop(elapsed, timestamp)
+
+        return {
+            "time": timestamp,
+            "phase": phase,
+            "arousal": last_good_arousal,
+            "lower_band": processor.viability_band[0],
+            "upper_band": processor.viability_band[1],
+            "in_range": in_range,
+            "artifact": artifact_detected,
+            "bad_channels": " ".join(bad_channels),
+            "variance": variance,
+            "hop": hop,
+            "dropped": dropped_samples,
+            # raw (unsmoothed) value of every registered feature, None when it could not be computed
+            **{f"feature_{name}": processor.last_features.get(name) for name in processor.feature_names},
+        }
+
+    # a hop is a whole number of samples (0.1 s at 256 Hz -> 26 samples = 0.1016 s): the processor's EMA, the
+    # controller's hysteresis and the logged hop use that effective length, the scheduler keeps the nominal one
+    def set_hop(self, hop):
+        self.hop_samples = max(1, int(round(self.sampling_rate * hop)))
+        self.processor.set_hop(self.hop_samples / self.sampling_rate)
+        self.controller.set_hop(self.processor.hop_seconds)
+
+    def update_hop(self, elapsed, timestamp):
+        hop = self.scheduler.record(elapsed, now=timestamp)
+        if max(1, int(round(self.sampling_rate * hop))) != self.hop_samples:
+            self.set_hop(hop)
+            self.metrics['hop_changes'] += 1
+
+    def check_profile(self, arousal):
+        validator = self.validator
+        if not validator.update(arousal):
+            return
+        self.validator = None
+        self.metrics['profile_drift'] = validator.drift
+        if validator.passed:
+            apply_profile(self.processor, validator.profile)
+            self.processor.calibration_values = None
+            self.calibration_source = "profile"
+        else:
+            print(f"Profile drifted ({validator.drift:.2f} > {validator.tolerance:.2f}), running full calibration")
+
+    def summary(self):
+        hops = self.metrics['hops']
+        return {
+            **self.metrics,
+            'artifact_rate': self.metrics['artifacts'] / hops if hops else 0.0,
+            'process_time_mean': self.metrics['process_time_total'] / hops if hops else 0.0,
+            'data_seconds': self.samples_received / self.sampling_rate,
+            'viability_band': list(self.processor.viability_band),
+            'is_calibrated': self.processor.is_calibrated,
+            'feature': self.processor.selected_feature,
+            'hop_seconds': self.processor.hop_seconds,
+            'decision_rate': self.scheduler.decision_rate,
+            **({'stream': self.packet_monitor.metrics()} if self.packet_monitor is not None else {}),
+            'calibration_source': self.calibration_source,
+        }
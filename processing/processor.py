@@ -1,64 +1,133 @@
+import time
 import numpy as np
 from brainflow.data_filter import DataFilter, DetrendOperations, NoiseTypes
-from brainflow.board_shim import BoardShim, BoardIds
+from streams.board_info import get_board_info
+from processing.quantile import CalibrationBuffer, DriftingBand
+from processing.artifacts import window_stats
+from processing.features import FEATURES, compute_spectrum
 
 class Processor:
-    def __init__(self, eeg_window_size=2):
-        self.board_id = BoardIds.MUSE_2_BOARD.value
-        self.sampling_rate = BoardShim.get_sampling_rate(self.board_id)
+    # eeg_window_size: seconds of eeg per decision, hop_seconds: time between decisions
+    # sampling_rate: rate of the incoming data when it is not the board rate (e.g. behind a DecimatedStream)
+    def __init__(self, eeg_window_size=2, hop_seconds=0.1, sampling_rate=None):
+        board_info = get_board_info()
+        self.board_id = board_info["board_id"]
+        self.sampling_rate = sampling_rate if sampling_rate is not None else board_info["sampling_rate"]
+        # below ~104 Hz the 50 Hz notch is above nyquist (and the decimation filter already removed mains)
+        self.remove_mains = self.sampling_rate / 2 > 52
         
-        self.eeg_channels = BoardShim.get_eeg_channels(self.board_id)
-        self.channel_names = BoardShim.get_eeg_names(self.board_id)
-        self.eeg_window_size = eeg_window_size
+        self.eeg_channels = board_info["eeg_channels"]
+        self.channel_names = board_info["eeg_names"]
+        self.set_window(eeg_window_size)
         
         self.posterior_channel_indices = [i for i, name in enumerate(self.channel_names) if name in ['TP9', 'TP10']]
         self.frontal_channel_indices = [i for i, name in enumerate(self.channel_names) if name in ['AF7', 'AF8']]     
         
-        self.ema_alpha = 0.1
+        self.ema_alpha = 0.1               # per hop at ema_reference_hop, rescaled for other hops
+        self.ema_reference_hop = 0.1
+        self.set_hop(hop_seconds)
+        # every registered feature is computed from one shared spectrum per hop,
+        # the selected one becomes the (smoothed) arousal index, the others are only logged
+        self.selected_feature = "alpha_beta"
+        self.feature_names = list(FEATURES)
+        self.last_features = {}
         self.is_calibrated = False
         self.viability_band = [0.4, 0.6]
-        self.motion_threshold = 10000
+        self.motion_threshold = 10000      # per-channel variance (uV^2) above which a channel is bad, raw (mains hum counts)
+        self.ptp_threshold = None          # optional per-channel peak-to-peak limit (uV)
+        self.line_length_threshold = None  # optional per-channel line-length limit (uV per window)
+        self.last_bad_channels = None
+        self.max_dropped_fraction = 0.05   # windows missing more than this share of samples (lost packets) are skipped
+        self.last_dropped_samples = 0
+
+        # viability band = base_band (calibrated Q1/Q3) widened/narrowed by band_scale around its center
+        self.base_band = [0.4, 0.6]
+        self.band_scale = 1.0
+        self.adaptive_band = False        # True -> base_band slowly follows drift after calibration
+        self.band_adaptation_rate = 0.002
+        self.band_tracker = None
+        self.calibration_values = None
+        self.baseline_stats = None
         
         self.last_raw_eeg = None
         self.last_filtered_eeg = None
+        self.stage_times = {}  # seconds spent per stage in the last process_eeg call
+
+
+    # per-channel bad mask from window_stats / ArtifactDetector.stats output
+    def detect_bad_channels(self, stats):
+        bad = stats["variance"] > self.motion_threshold
+        if self.ptp_threshold is not None:
+            bad |= stats["ptp"] > self.ptp_threshold
+        if self.line_length_threshold is not None:
+            bad |= stats["line_length"] > self.line_length_threshold
+        return bad
 
 
     # shape = n_channels x n_samples
-    def process_eeg(self, eeg_data):
-        if eeg_data.shape[1] < self.sampling_rate * self.eeg_window_size: #check window length seconds
+    # artifact_stats: precomputed channel stats (SessionPipeline keeps them incrementally), else computed here
+    # dropped_samples: samples lost in transmission inside this window (PacketMonitor)
+    def process_eeg(self, eeg_data, artifact_stats=None, dropped_samples=0):
+        if eeg_data.shape[1] < self.window_samples: #check window length seconds
             return None, False, 0.0
 
+        # a window with lost packets is corrupted whatever it looks like -> skip before any stats
+        self.last_dropped_samples = dropped_samples
+        if dropped_samples > self.max_dropped_fraction * self.window_samples:
+            self.last_bad_channels = np.zeros(len(self.channel_names), dtype=bool)
+            self.last_features = {}
+            self.stage_times = {'artifact': 0.0}
+            return None, True, 0.0
+
         self.last_raw_eeg = eeg_data.copy()
+        t0 = time.perf_counter()
+
+        # artifact check first: a rejected window never pays for filtering or band powers
+        stats = artifact_stats if artifact_stats is not None else window_stats(eeg_data)
+        bad = self.detect_bad_channels(stats)
+        self.last_bad_channels = bad
+        current_variance = float(stats["variance"].max())
+        # salvage the window as long as each region keeps at least one clean channel
+        posterior = [i for i in self.posterior_channel_indices if not bad[i]]
+        frontal = [i for i in self.frontal_channel_indices if not bad[i]]
+        t1 = time.perf_counter()
+        self.stage_times = {'artifact': t1 - t0}
+        self.last_features = {}
+        if not posterior or not frontal:
+            return None, True, current_variance
 
         #remove noise (openBCI code)
-        for i in range(len(self.eeg_channels)):
+        for i in posterior + frontal:
             DataFilter.detrend(eeg_data[i], DetrendOperations.CONSTANT.value)
-            DataFilter.remove_environmental_noise(eeg_data[i], self.sampling_rate, NoiseTypes.FIFTY.value)
+            if self.remove_mains:
+                DataFilter.remove_environmental_noise(eeg_data[i], self.sampling_rate, NoiseTypes.FIFTY.value)
         self.last_filtered_eeg = eeg_data.copy()
+        t2 = time.perf_counter()
+        self.stage_times['filter'] = t2 - t1
 
-        current_variance = np.var(eeg_data[0])
-        if current_variance > self.motion_threshold:
-            return None, True, current_variance
-
-
-        #take log values of PSDs to compress the range & normalize variance
-        posterior_bands = DataFilter.get_avg_band_powers(eeg_data, self.posterior_channel_indices, self.sampling_rate, True)
-        posterior_alpha_log = posterior_bands[0][2]
 
-        frontal_bands = DataFilter.get_avg_band_powers(eeg_data, self.frontal_channel_indices, self.sampling_rate, True)
-        frontal_beta_log = frontal_bands[0][3]
+        # one spectrum for all features -> adding a feature adds no FFTs
+        spectrum = compute_spectrum(eeg_data, posterior + frontal, self.channel_names, self.sampling_rate)
+        self.last_features = {name: FEATURES[name](spectrum) for name in self.feature_names}
+        self.last_features = {name: None if value is None else float(value) for name, value in self.last_features.items()}
         
-        # AROUSAL calc
-        arousal_index = posterior_alpha_log - frontal_beta_log
-            # alpha: 8-12 Hz -> calm, eyes closed -> low arousal
-            # beta: 13-30 Hz -> alert, active thinking -> high arousal
-            
-            
+        # AROUSAL calc (default alpha_beta: posterior alpha - frontal beta)
+        # alpha: 8-12 Hz -> calm, eyes closed -> low arousal
+        # beta: 13-30 Hz -> alert, active thinking -> high arousal
+        arousal_index = self.last_features.get(self.selected_feature)
+        if arousal_index is None: # the selected feature lost its channels
+            return None, True, current_variance
+
         # smooth with EMA (exponential moving average)
         if not hasattr(self, 'smoothed_arousal'):
             self.smoothed_arousal = arousal_index
         else:
-            self.smoothed_arousal = self.ema_alpha * arousal_index + (1 - self.ema_alpha) * self.smoothed_arousal
+            self.smoothed_arousal = self.hop_ema_alpha * arousal_index + (1 - self.hop_ema_alpha) * self.smoothed_arousal
+
+        if self.is_calibrated and self.band_tracker is not None:
+            self.base_band = self.band_tracker.update(self.smoothed_arousal)
+            self.update_viability_band()
+        self.stage_times['features'] = time.perf_counter() - t2
 
         return self.smoothed_arousal, False, current_variance
    
@@ -70,8 +139,81 @@ class Processor:
             lower_bound = np.percentile(arousal_values, 25)  # Q1
             upper_bound = np.percentile(arousal_values, 75)  # Q3
             
-            self.viability_band = [lower_bound, upper_bound]
+            self.baseline_stats = {"mean": float(np.mean(arousal_values)), "std": float(np.std(arousal_values, ddof=1)) if len(arousal_values) > 1 else 0.0, "count": len(arousal_values)}
+            self.set_base_band([lower_bound, upper_bound])
             self.is_calibrated = True
             
             print(f"CALIBRATION COMPLETE")
-            print(f"New Viability Band: [{self.viability_band[0]:.3f}, {self.viability_band[1]:.3f}]\n")
\ No newline at end of file
+            print(f"New Viability Band: [{self.viability_band[0]:.3f}, {self.viability_band[1]:.3f}]\n")
+
+
+    #incremental calibration: feed clean baseline values one by one (at most max_samples are kept)
+    def start_calibration(self, min_samples=30, tolerance=0.25, max_samples=None):
+        self.calibration_values = CalibrationBuffer(min_samples=min_samples, tolerance=tolerance, max_samples=max_samples)
+
+    # returns True once the Q1/Q3 standard errors are small enough to stop early
+    def add_calibration_value(self, arousal):
+        if self.calibration_values is None:
+            self.start_calibration()
+        return self.calibration_values.update(arousal)
+
+    def finish_calibration(self):
+        values = self.calibration_values
+        if values is None or values.count == 0:
+            return
+        self.baseline_stats = {"mean": values.mean, "std": values.std, "count": values.count}
+        self.set_base_band(values.band)
+        self.is_calibrated = True
+        self.calibration_values = None
+        print(f"CALIBRATION COMPLETE ({values.count} samples)")
+        print(f"New Viability Band: [{self.viability_band[0]:.3f}, {self.viability_band[1]:.3f}]\n")
+
+
+    # the index depends on the window length -> only change it before calibrating
+    def set_window(self, seconds):
+        self.eeg_window_size = seconds
+        self.window_samples = int(round(self.sampling_rate * seconds))
+
+    # keeps the EMA time constant in seconds fixed when the hop changes (0.1 per 0.1 s hop ~ 1 s)
+    def set_hop(self, hop_seconds):
+        self.hop_seconds = hop_seconds
+        ratio = hop_seconds / self.ema_reference_hop
+        self.hop_ema_alpha = self.ema_alpha if ratio == 1 else 1 - (1 - self.ema_alpha) ** ratio
+
+    # a different feature lives on a different scale -> smoothing and calibration start over
+    def set_feature(self, name):
+        if name not in FEATURES:
+            raise ValueError(f"unknown feature '{name}', choose from {', '.join(FEATURES)}")
+        if name == self.selected_feature:
+            return
+        self.selected_feature = name
+        if hasattr(self, 'smoothed_arousal'):
+            del self.smoothed_arousal
+        self.is_calibrated = False
+        self.baseline_stats = None
+
+    def set_base_band(self, band):
+        self.base_band = [float(band[0]), float(band[1])]
+        self.band_tracker = DriftingBand(self.base_band, self.band_adaptation_rate) if self.adaptive_band else None
+        self.update_viability_band()
+
+    def set_band_scale(self, scale):
+        self.band_scale = scale
+        self.update_viability_band()
+
+    def set_adaptive_band(self, enabled, rate=None):
+        if rate is not None:
+            self.band_adaptation_rate = rate
+        self.adaptive_band = enabled
+        if not enabled:
+            self.band_tracker = None
+        elif self.band_tracker is None:
+            self.band_tracker = DriftingBand(self.base_band, self.band_adaptation_rate)
+        else:
+            self.band_tracker.rate = self.band_adaptation_rate
+
+    def update_viability_band(self):
+        lower, upper = self.base_band
+        center = (lower + upper) / 2
+        half_width = (upper - lower) * self.band_scale / 2
+        self.viability_band = [center - half_width, center + half_width]
\ No newline at end of file
@@ -0,0 +1,88 @@
+import json
+import os
+import re
+import time
+import numpy as np
+
+PROFILE_DIR = os.environ.get("MUSE_PROFILE_DIR", os.path.join(os.path.expanduser("~"), ".muse_cyb_sys", "profiles"))
+
+
+def profile_path(user, headset, directory=None):
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{user}__{headset}")
+    return os.path.join(directory or PROFILE_DIR, f"{slug}.json")
+
+
+#calibration result of one user on one headset
+def save_profile(processor, user, headset, directory=None):
+    profile = {
+        "user": user,
+        "headset": headset,
+        "viability_band": list(processor.base_band),
+        "motion_threshold": processor.motion_threshold,
+        "feature": processor.selected_feature,
+        "baseline_stats": processor.baseline_stats,
+        "sampling_rate": processor.sampling_rate,
+        "timestamp": time.time(),
+    }
+    path = profile_path(user, headset, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)  # never leave a half-written profile behind
+    return path
+
+
+def load_profile(user, headset, directory=None):
+    path = profile_path(user, headset, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def apply_profile(processor, profile):
+    processor.set_feature(profile.get("feature", "alpha_beta"))
+    processor.motion_threshold = profile["motion_threshold"]
+    processor.baseline_stats = profile.get("baseline_stats")
+    processor.set_base_band(profile["viability_band"])
+    processor.is_calibrated = True
+    print(f"PROFILE LOADED ({profile['user']} / {profile['headset']})")
+    print(f"Viability Band: [{processor.viability_band[0]:.3f}, {processor.viability_band[1]:.3f}]\n")
+
+
+#short check that today's baseline still matches the stored one
+# drift = |live mean - stored mean| in units of the stored baseline spread
+class ProfileValidator:
+    def __init__(self, profile, samples=20, tolerance=1.5):
+        self.profile = profile
+        self.samples = samples
+        self.tolerance = tolerance
+        self.count = 0
+        self.mean = 0.0
+
+        stats = profile.get("baseline_stats") or {}
+        lower, upper = profile["viability_band"]
+        self.reference_mean = stats.get("mean", (lower + upper) / 2)
+        # IQR / 1.35 ~ std of a normal baseline, used when no std was stored
+        self.reference_spread = max(stats.get("std") or 0.0, (upper - lower) / 1.35, 1e-6)
+
+    def update(self, arousal):
+        self.count += 1
+        self.mean += (arousal - self.mean) / self.count
+        return self.done
+
+    @property
+    def done(self):
+        return self.count >= self.samples
+
+    @property
+    def drift(self):
+        return float(np.abs(self.mean - self.reference_mean) / self.reference_spread)
+
+    @property
+    def passed(self):
+        return self.done and self.drift <= self.tolerance
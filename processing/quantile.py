@@ -0,0 +1,78 @@
+import numpy as np
+from collections import deque
+
+
+#calibration baseline: exact Q1/Q3 (np.percentile) over the clean values, bounded by the caller's sample budget.
+# finished early once the standard error of both quartiles is within `tolerance` x IQR: distribution-free (half the
+# spread between the order statistics at p -/+ sqrt(p(1-p)/n_eff)), with n_eff = n (1 - rho) / (1 + rho) for the
+# lag-1 autocorrelation rho -> consecutive, overlapping and EMA-smoothed hops only count as much as they are new
+class CalibrationBuffer:
+    def __init__(self, min_samples=30, tolerance=0.25, max_samples=None):
+        self.min_samples = min_samples
+        self.tolerance = tolerance
+        self.values = deque(maxlen=max_samples)
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    def update(self, x):
+        self.values.append(float(x))
+        return self.converged
+
+    @property
+    def band(self):
+        return [float(q) for q in np.percentile(self.values, [25, 75])]
+
+    @property
+    def mean(self):
+        return float(np.mean(self.values))
+
+    @property
+    def std(self):
+        return float(np.std(self.values, ddof=1)) if self.count > 1 else 0.0
+
+    # largest standard error of Q1 / Q3 as a fraction of the IQR
+    @property
+    def relative_error(self):
+        values = np.array(self.values)
+        n = len(values)
+        if n < 3:
+            return np.inf
+        centered = values - values.mean()
+        power = centered @ centered
+        rho = float(np.clip(centered[1:] @ centered[:-1] / power, 0.0, 0.99)) if power > 0 else 0.0
+        effective = n * (1 - rho) / (1 + rho)
+        lower, upper = self.band
+        errors = []
+        for p in (0.25, 0.75):
+            spread = np.sqrt(p * (1 - p) / effective)
+            low, high = np.percentile(values, [100 * max(p - spread, 0.0), 100 * min(p + spread, 1.0)])
+            errors.append((high - low) / 2)
+        return max(errors) / max(upper - lower, 1e-12)
+
+    @property
+    def converged(self):
+        return self.count >= self.min_samples and self.relative_error <= self.tolerance
+
+
+#slowly tracks Q1/Q3 over a long session (exponentially forgetting stochastic-approximation quantiles)
+# each clean hop nudges a quantile by rate * IQR: up by p if x is above it, down by (1 - p) if below
+class DriftingBand:
+    def __init__(self, band, rate=0.002):
+        self.lower, self.upper = float(band[0]), float(band[1])
+        self.rate = rate  # ~1/rate hops to follow a shift, 0.002 at 10 hops/s -> a few minutes
+        self.min_width = max(self.upper - self.lower, 1e-6) * 0.1
+
+    def update(self, x):
+        step = self.rate * max(self.upper - self.lower, self.min_width)
+        self.lower += step * (0.25 - (x < self.lower)) * 2
+        self.upper += step * (0.75 - (x < self.upper)) * 2
+        if self.upper - self.lower < self.min_width:
+            center = (self.lower + self.upper) / 2
+            self.lower, self.upper = center - self.min_width / 2, center + self.min_width / 2
+        return self.band
+
+    @property
+    def band(self):
+        return [self.lower, self.upper]
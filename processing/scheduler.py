@@ -0,0 +1,71 @@
+import time
+from collections import deque
+
+
+#decision clock for the live loop: hops fall on a fixed grid (start + k * hop) instead of
+# "whenever the buffer is long enough", so decisions come at a steady rate regardless of chunk sizes
+# adaptive=True lengthens the hop when processing eats into the hop budget and shortens it again when idle
+class HopScheduler:
+    def __init__(self, hop_seconds=0.1, adaptive=False, min_hop=None, max_hop=1.0,
+                 high_load=0.7, low_load=0.3, step=1.25, load_smoothing=0.2, clock=time.perf_counter):
+        self.base_hop = hop_seconds
+        self.hop_seconds = hop_seconds
+        self.adaptive = adaptive
+        self.min_hop = min_hop if min_hop is not None else hop_seconds  # never faster than asked unless allowed
+        self.max_hop = max(max_hop, hop_seconds)
+        self.high_load = high_load  # processing time / hop above which the hop grows
+        self.low_load = low_load    # ... and below which it shrinks back
+        self.step = step
+        self.load_smoothing = load_smoothing
+        self.clock = clock
+
+        self.load = 0.0  # smoothed processing time / hop
+        self.next_deadline = None
+        self.missed = 0   # hops skipped because a decision overran by more than one hop
+        self.decision_times = deque(maxlen=50)
+
+    def due(self, now=None):
+        now = self.clock() if now is None else now
+        if self.next_deadline is None:
+            self.next_deadline = now
+        return now >= self.next_deadline
+
+    def time_to_next(self, now=None):
+        now = self.clock() if now is None else now
+        return 0.0 if self.next_deadline is None else max(0.0, self.next_deadline - now)
+
+    # call once per decision with the time it took, returns the hop until the next one
+    def record(self, process_seconds, now=None):
+        now = self.clock() if now is None else now
+        self.decision_times.append(now)
+        self.load += self.load_smoothing * (process_seconds / self.hop_seconds - self.load)
+        if self.adaptive:
+            self.adapt()
+
+        if self.next_deadline is None:
+            self.next_deadline = now
+        self.next_deadline += self.hop_seconds
+        # one late hop is caught up right away, a longer stall skips ahead instead of bursting decisions
+        behind = int((now - self.next_deadline) // self.hop_seconds)
+        if behind > 0:
+            self.missed += behind
+            self.next_deadline += behind * self.hop_seconds
+        return self.hop_seconds
+
+    def adapt(self):
+        if self.load > self.high_load and self.hop_seconds < self.max_hop:
+            new_hop = min(self.hop_seconds * self.step, self.max_hop)
+        elif self.load < self.low_load and self.hop_seconds > self.min_hop:
+            new_hop = max(self.hop_seconds / self.step, self.min_hop)
+        else:
+            return
+        self.load *= self.hop_seconds / new_hop  # same processing time against the new budget
+        self.hop_seconds = new_hop
+
+    # decisions per second over the recent past (what the controller actually gets)
+    @property
+    def decision_rate(self):
+        if len(self.decision_times) < 2:
+            return 1.0 / self.hop_seconds
+        span = self.decision_times[-1] - self.decision_times[0]
+        return (len(self.decision_times) - 1) / span if span > 0 else 1.0 / self.hop_seconds
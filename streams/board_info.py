@@ -0,0 +1,17 @@
+from functools import lru_cache
+
+
+#board metadata never changes while the app runs -> query brainflow once per process
+@lru_cache(maxsize=None)
+def get_board_info(board_id=None):
+    from brainflow.board_shim import BoardShim, BoardIds  # lazy: simulation mode never needs brainflow
+
+    if board_id is None:
+        board_id = BoardIds.MUSE_2_BOARD.value
+
+    return {
+        "board_id": board_id,
+        "sampling_rate": BoardShim.get_sampling_rate(board_id),
+        "eeg_channels": BoardShim.get_eeg_channels(board_id),
+        "eeg_names": BoardShim.get_eeg_names(board_id),
+    }
@@ -0,0 +1,27 @@
+from streams.base_stream import BaseStream
+from processing.decimation import PolyphaseDecimator
+
+
+#wraps any stream and hands out anti-aliased, downsampled chunks (e.g. 256 -> 128 or 64 Hz)
+# the arousal bands stop at 45 Hz, so everything downstream (buffers, filters, FFTs) can run at the lower rate
+class DecimatedStream(BaseStream):
+    def __init__(self, stream, factor=2, passband=None):
+        self.stream = stream
+        self.decimator = PolyphaseDecimator(factor, stream.sampling_rate, passband)
+        self.sampling_rate = self.decimator.sampling_rate
+        self.factor = self.decimator.factor
+        if getattr(stream, 'packet_monitor', None) is not None:
+            stream.packet_monitor.output_factor = self.factor  # gap positions in our (decimated) samples
+
+    # device_label, finished, channel_names, ... come from the wrapped stream
+    def __getattr__(self, name):
+        if name == "stream":
+            raise AttributeError(name)
+        return getattr(self.stream, name)
+
+    def get_data(self, noise_level=0):
+        return self.decimator.process(self.stream.get_data())
+
+    def release(self):
+        if hasattr(self.stream, 'release'):
+            self.stream.release()
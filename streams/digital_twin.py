@@ -0,0 +1,152 @@
+import numpy as np
+
+from controller.logic import Controller
+from processing.pipeline import SessionPipeline
+from processing.processor import Processor
+from streams.simulated_stream import SIM_DEFAULTS, SimulatedStream
+from streams.synthetic_stream import SyntheticEEGStream
+
+
+#arousal -> index of the real processor on synthetic eeg: the mean index of a few seconds at fixed arousal levels.
+# np.interp over it maps both ways (the index moves monotonically with the synthetic arousal, in either direction)
+def index_curve(make_processor, levels=11, seconds=4.0, seed=0):
+    arousal = np.linspace(0.0, 1.0, levels)
+    index = np.empty(levels)
+    for i, level in enumerate(arousal):
+        processor = make_processor()
+        processor.set_base_band((-np.inf, np.inf))
+        processor.is_calibrated = True
+        pipeline = SessionPipeline(processor=processor, controller=Controller())
+        stream = SyntheticEEGStream(sampling_rate=processor.sampling_rate, arousal=level, seed=seed,
+                                    chunk_size=int(seconds * processor.sampling_rate))
+        raw = [d[f"feature_{processor.selected_feature}"] for d in pipeline.push(stream.get_data())]
+        index[i] = np.nanmean([np.nan if value is None else value for value in raw[len(raw) // 2:]])
+    order = np.argsort(index)
+    return arousal[order], index[order]
+
+
+#closed loop of the simulated subject and the real pipeline, stepped as fast as the code runs:
+# SimulatedStream's arousal dynamics -> SyntheticEEGStream at that arousal -> SessionPipeline (Processor window / EMA,
+# Controller hysteresis) -> the decision and the estimate go back to the subject. out of range (Controller) the
+# subject is prompted and regulates on the pipeline's estimate (mapped back to the arousal scale), in range it
+# relaxes (feedback off); gate=False keeps it regulating all the time, still on the estimate.
+# the band is fixed: the target band mapped onto the index scale, so no calibration phase.
+# ideal=True skips eeg and pipeline: the subject sees its true arousal and the true in-band state at once -> the
+# difference to a pipeline run is what processing latency costs
+class DigitalTwin:
+    def __init__(self, controls, seed=None, window=2.0, hop=0.1, feature="alpha_beta", hysteresis=3.0, predictive=False,
+                 gate=True, artifact_rate=0.0, ideal=False):
+        self.controls = {**SIM_DEFAULTS, **controls}
+        self.gate = gate
+        self.ideal = ideal
+        self.step_seconds = 1 / self.controls["sensor_sampling_rate"]
+        self.subject = SimulatedStream(seed=seed, dt=self.step_seconds)
+        self.subject.reset(self.controls["state_name"])
+        self.steps = 0
+        self.perceived = None   # latest estimate of the pipeline, arousal scale (None until the first window is full)
+        self.in_range = False
+        target, flux = self.controls["target_arousal"], self.controls["natural_flux"]
+        if ideal:
+            return
+
+        def make_processor():
+            processor = Processor(eeg_window_size=window, hop_seconds=hop)
+            processor.set_feature(feature)
+            return processor
+
+        self.curve = index_curve(make_processor, seconds=window + 4.0)
+        processor = make_processor()
+        processor.set_base_band(sorted(self.to_index([target - flux, target + flux])))
+        processor.is_calibrated = True
+        controller = Controller()
+        controller.hysteresis_seconds = hysteresis
+        if predictive:
+            from controller.estimator import PredictiveEstimator
+            controller.estimator = PredictiveEstimator(dt=hop)
+        self.pipeline = SessionPipeline(processor=processor, controller=controller)
+        self.eeg = SyntheticEEGStream(sampling_rate=processor.sampling_rate, seed=None if seed is None else seed + 2,
+                                      artifact_rate=artifact_rate)
+        self.samples_due = 0.0
+
+    def to_index(self, arousal):
+        levels, index = self.curve
+        return np.interp(arousal, levels, index) if levels[-1] > levels[0] else np.interp(arousal, levels[::-1], index[::-1])
+
+    def to_arousal(self, index):
+        levels, values = self.curve
+        return float(np.interp(index, values, levels))
+
+    def step(self):
+        c = self.controls
+        regulating = c["feedback_on"] and self.perceived is not None and (not self.in_range or not self.gate)
+        arousal, band, fatigue, is_burnt_out, energy, _, energy_spent = self.subject.get_arousal_value(
+            c["state_name"], c["target_arousal"], c["natural_flux"], c["noise_level"],
+            c["kp"], c["ki"], c["kd"], c["latency"], regulating,
+            c["environmental_threat"], c["effort_amplification"], c["controller_type"],
+            measured_arousal=self.perceived
+        )
+        self.steps += 1
+        in_band = band[0] <= arousal <= band[1]
+        artifact = False
+        if self.ideal:
+            self.perceived, self.in_range = arousal, in_band
+        else:
+            self.eeg.set_arousal(arousal)
+            self.samples_due += self.pipeline.sampling_rate * self.step_seconds
+            self.eeg.chunk_size = int(self.samples_due)
+            self.samples_due -= self.eeg.chunk_size
+            for decision in self.pipeline.push(self.eeg.get_data()) if self.eeg.chunk_size else []:
+                artifact |= decision["artifact"]
+                if decision["arousal"] is not None:
+                    self.perceived = self.to_arousal(decision["arousal"])
+                self.in_range = bool(decision["in_range"])
+        return {
+            "time": self.steps * self.step_seconds,
+            "arousal": arousal,
+            "perceived": self.perceived,
+            "lower_band": band[0],
+            "upper_band": band[1],
+            "in_band": in_band,
+            "in_range": self.in_range,
+            "regulating": regulating,
+            "artifact": artifact,
+            "fatigue": fatigue,
+            "energy": energy,
+            "energy_spent": energy_spent,
+            "is_burnt_out": is_burnt_out,
+        }
+
+    def run(self, seconds):
+        return [self.step() for _ in range(int(round(seconds / self.step_seconds)))]
+
+
+#control quality of a twin run: true time in band, squared error, time to goal, how often the decision matched the
+# true state and the lag of the perceived arousal behind the true one (cross-correlation peak, up to max_lag s)
+def twin_summary(rows, target, step_seconds, max_lag=5.0):
+    from processing.analysis import session_analysis
+
+    arousal = np.array([row["arousal"] for row in rows])
+    perceived = np.array([np.nan if row["perceived"] is None else row["perceived"] for row in rows])
+    in_band = np.array([row["in_band"] for row in rows])
+    in_range = np.array([row["in_range"] for row in rows])
+    analysis = session_analysis(arousal, target, in_band, sampling_rate=1 / step_seconds,
+                                energy_spent=np.array([row["energy_spent"] for row in rows]))
+
+    lag = None
+    seen = np.isfinite(perceived)
+    if seen.sum() > 2:
+        a = arousal[seen] - arousal[seen].mean()
+        p = perceived[seen] - perceived[seen].mean()
+        lags = np.arange(min(int(max_lag / step_seconds), len(a) - 1) + 1)
+        correlation = [np.dot(a[:len(a) - k], p[k:]) for k in lags]
+        lag = float(lags[int(np.argmax(correlation))] * step_seconds)
+    return {
+        "in_band_pct": analysis["in_band_pct"],
+        "mse": analysis["cost"] / len(rows) if rows else 0.0,
+        "time_to_goal": analysis["time_to_goal"],
+        "decision_agreement_pct": float(np.mean(in_range == in_band) * 100) if rows else 0.0,
+        "perception_lag": lag,
+        "energy_spent": float(np.sum([row["energy_spent"] for row in rows])),
+        "final_fatigue": rows[-1]["fatigue"] if rows else 0.0,
+        "burnout_pct": float(np.mean([row["is_burnt_out"] for row in rows]) * 100) if rows else 0.0,
+    }
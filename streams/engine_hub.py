@@ -0,0 +1,186 @@
+import contextlib
+import threading
+import time
+
+
+#one backend engine (device stream, processor, controller, session thread, output bus ...) shared by every
+# viewer that opens the same key. `state` holds the engine's objects by name, like st.session_state does
+# for a single browser tab
+class SharedEngine:
+    def __init__(self, key, on_close=None):
+        self.key = key
+        self.state = {}
+        self.viewers = {}   # viewer id -> last seen (time.time())
+        self.held = set()   # viewers busy in a blocking step (calibration), never pruned meanwhile
+        self.owner = None
+        self.on_close = on_close
+        self.created = time.time()
+        self.ready = threading.Event()   # set once create() finished (or failed, see error)
+        self.error = None
+
+    # a failed create() cleaned up after itself; one still running is waited for
+    def close(self):
+        self.ready.wait()
+        if self.on_close is not None and self.error is None:
+            self.on_close(self.state)
+
+
+#engines of the whole server process: every streamlit session (browser tab) attaching to the same key gets the
+# same engine -> one acquisition and one processing cost however many people watch.
+# viewers are read-only; one of them at a time is the controller owner (settings, start / stop, calibration),
+# the first viewer of an engine gets the role, later ones can take it over.
+# a tab can vanish without notice, so viewers stay registered by attaching / touching at least every
+# `viewer_timeout` seconds; a silent owner hands the role to the most recently seen viewer, and an engine without
+# viewers is closed. a reaper thread checks every viewer_timeout / 3 seconds, so this also happens when no tab is
+# left to call the hub
+class EngineHub:
+    def __init__(self, viewer_timeout=30.0):
+        self.viewer_timeout = viewer_timeout
+        self.engines = {}
+        self.lock = threading.Lock()
+        self.reaper = None
+        self.stop_event = threading.Event()
+
+    # started with the first engine, not at import
+    def start_reaper(self):
+        if self.reaper is None:
+            self.stop_event.clear()
+            self.reaper = threading.Thread(target=self.reap_loop, name="engine-hub-reaper", daemon=True)
+            self.reaper.start()
+
+    def reap_loop(self):
+        while not self.stop_event.wait(self.viewer_timeout / 3):
+            self.reap()
+
+    def reap(self):
+        with self.lock:
+            closed = self.prune()
+        for stale in closed:
+            stale.close()
+
+    # create(engine) fills engine.state, it only runs for the first viewer of a key. it runs outside the hub lock
+    # (opening a device takes seconds): the engine is registered as pending first, other viewers of the same key
+    # wait for it to be ready, every other key carries on
+    def attach(self, key, viewer, create=None, on_close=None):
+        build = False
+        with self.lock:
+            closed = self.prune()
+            engine = self.engines.get(key)
+            if engine is None:
+                if create is None:
+                    return None
+                engine = self.engines[key] = SharedEngine(key, on_close)
+                build = True
+            engine.viewers[viewer] = time.time()
+            if engine.owner is None:
+                engine.owner = viewer
+            self.start_reaper()
+        for stale in closed:
+            stale.close()
+
+        if build:
+            try:
+                create(engine)
+            except BaseException as e:
+                with self.lock:
+                    if self.engines.get(key) is engine:
+                        del self.engines[key]
+                engine.error = e
+                raise
+            finally:
+                engine.ready.set()
+        else:
+            engine.ready.wait()
+            if engine.error is not None:
+                raise RuntimeError(f"opening {key} failed: {engine.error}")
+        return engine
+
+    # engines still being opened are left out until they are ready
+    def get(self, key):
+        with self.lock:
+            closed = self.prune()
+            engine = self.engines.get(key)
+        for stale in closed:
+            stale.close()
+        return engine if engine is not None and engine.ready.is_set() else None
+
+    def touch(self, key, viewer):
+        with self.lock:
+            closed = self.prune()
+            engine = self.engines.get(key)
+            if engine is not None:
+                engine.viewers[viewer] = time.time()
+        for stale in closed:
+            stale.close()
+        return engine if engine is not None and engine.ready.is_set() else None
+
+    def detach(self, key, viewer):
+        with self.lock:
+            engine = self.engines.get(key)
+            if engine is None:
+                return
+            engine.viewers.pop(viewer, None)
+            engine.held.discard(viewer)
+            if engine.owner == viewer:
+                engine.owner = max(engine.viewers, key=engine.viewers.get, default=None)
+            if engine.viewers:
+                return
+            del self.engines[key]
+        engine.close()
+
+    def claim(self, key, viewer):
+        with self.lock:
+            engine = self.engines.get(key)
+            if engine is None or viewer not in engine.viewers:
+                return False
+            engine.owner = viewer
+            return True
+
+    # keeps `viewer` registered (and its role) while its script is busy in a blocking step, e.g. calibration
+    @contextlib.contextmanager
+    def hold(self, key, viewer):
+        with self.lock:
+            engine = self.engines.get(key)
+            if engine is not None:
+                engine.held.add(viewer)
+        try:
+            yield
+        finally:
+            if engine is not None:
+                with self.lock:
+                    engine.held.discard(viewer)
+                    if viewer in engine.viewers:
+                        engine.viewers[viewer] = time.time()
+
+    def is_owner(self, key, viewer):
+        engine = self.engines.get(key)
+        return engine is not None and engine.owner == viewer
+
+    # drops silent viewers (under the lock), returns the engines left without viewers to close outside it
+    def prune(self):
+        now = time.time()
+        closed = []
+        for key, engine in list(self.engines.items()):
+            if not engine.ready.is_set():
+                continue  # its builder is still in create()
+            for viewer, seen in list(engine.viewers.items()):
+                if now - seen > self.viewer_timeout and viewer not in engine.held:
+                    del engine.viewers[viewer]
+            if engine.owner not in engine.viewers:
+                engine.owner = max(engine.viewers, key=engine.viewers.get, default=None)
+            if not engine.viewers:
+                closed.append(self.engines.pop(key))
+        return closed
+
+    def close_all(self):
+        self.stop_event.set()
+        if self.reaper is not None:
+            self.reaper.join(1.0)
+            self.reaper = None
+        with self.lock:
+            engines, self.engines = list(self.engines.values()), {}
+        for engine in engines:
+            engine.close()
+
+
+HUB = EngineHub()
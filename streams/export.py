@@ -0,0 +1,138 @@
+import csv
+import io
+import os
+import numpy as np
+
+EXPORT_DIR = os.environ.get("MUSE_EXPORT_DIR", os.path.join(os.path.expanduser("~"), ".muse_cyb_sys", "exports"))
+EXPORT_FORMATS = ("csv", "parquet")
+CHUNK_ROWS = 65536
+# parquet types of the known columns that can be all None in a chunk (in_range while calibrating, perceived before the
+# twin's first estimate, ...); the writer's schema comes from the first chunk, so a column that is still None there gets
+# its type from here, any other one is stored as float64
+COLUMN_TYPES = {"phase": "string", "bad_channels": "string", "in_range": "bool", "in_band": "bool", "artifact": "bool",
+                "regulating": "bool", "is_burnt_out": "bool", "dropped": "int64", "steps": "int64", "sample": "int64"}
+
+
+# parquet needs pyarrow (in requirements.txt); an install without it only offers csv
+def available_formats():
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        return ("csv",)
+    return EXPORT_FORMATS
+
+
+def export_format(path, default="csv"):
+    return "parquet" if str(path).lower().endswith((".parquet", ".pq")) else default
+
+
+def export_path(session_id, table, format, directory=None):
+    return os.path.join(directory or EXPORT_DIR, f"{session_id}_{table}.{format}")
+
+
+#one table written chunk by chunk: csv straight to the file, parquet one compressed row group per chunk
+# -> a long session never has to exist as a single csv string or DataFrame.
+# target: path or file object (csv also takes a text stream, e.g. stdout); rows can be written one at a time
+# (write_row, buffered up to chunk_rows for parquet) or as column chunks (write_columns)
+class TableWriter:
+    def __init__(self, target, format="csv", chunk_rows=CHUNK_ROWS, compression="zstd"):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"export format must be one of {EXPORT_FORMATS}, got {format!r}")
+        if format not in available_formats():
+            raise ValueError("parquet export needs pyarrow: pip install pyarrow")
+        self.format = format
+        self.chunk_rows = chunk_rows
+        self.compression = compression
+        self.owns_file = isinstance(target, (str, os.PathLike))
+        self.rows = []
+        self.row_writer = None
+        self.column_writer = None
+        self.parquet_writer = None
+        self.wrapped = format == "csv" and not self.owns_file and not isinstance(target, io.TextIOBase)
+        if format == "csv" and self.owns_file:
+            self.file = open(target, 'w', newline='')
+        elif self.wrapped:
+            self.file = io.TextIOWrapper(target, newline='', write_through=True)
+        else:
+            self.file = target
+
+    def write_row(self, row):
+        if self.format == "csv":
+            if self.row_writer is None:
+                self.row_writer = csv.DictWriter(self.file, fieldnames=list(row))
+                self.row_writer.writeheader()
+            self.row_writer.writerow(row)
+            return
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_rows:
+            self.flush_rows()
+
+    def flush_rows(self):
+        if self.rows:
+            import pyarrow as pa
+            self.write_table(pa.Table.from_pylist(self.rows))
+            self.rows = []
+
+    # columns: name -> 1d array, all the same length. csv rows go through csv.writer from plain python lists (about twice
+    # as fast as a DataFrame.to_csv per chunk); NaN is written as "nan", as write_row does
+    def write_columns(self, columns):
+        if self.format == "csv":
+            if self.column_writer is None:
+                self.column_writer = csv.writer(self.file)
+                self.column_writer.writerow(list(columns))
+            self.column_writer.writerows(zip(*(np.asarray(values).tolist() for values in columns.values())))
+            return
+        import pyarrow as pa
+        self.write_table(pa.table({name: np.asarray(values) for name, values in columns.items()}))
+
+    # every chunk is cast to the schema of the first one, with its all-None (null typed) columns promoted
+    def write_table(self, table):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.parquet_writer is None:
+            fields = [pa.field(field.name, pa.type_for_alias(COLUMN_TYPES.get(field.name, "float64")))
+                      if pa.types.is_null(field.type) else field for field in table.schema]
+            self.parquet_writer = pq.ParquetWriter(self.file, pa.schema(fields), compression=self.compression)
+        schema = self.parquet_writer.schema
+        self.parquet_writer.write_table(table.select(schema.names).cast(schema))
+
+    # the caller's file object stays open
+    def close(self):
+        if self.format == "parquet":
+            self.flush_rows()
+            if self.parquet_writer is not None:
+                self.parquet_writer.close()
+        elif self.owns_file:
+            self.file.close()
+        elif self.wrapped:
+            self.file.detach()
+        else:
+            self.file.flush()
+
+
+#column chunks of a DataFrame (views, nothing copied until a chunk is written), index kept as a column
+def frame_chunks(frame, chunk_rows=CHUNK_ROWS, index_name="decision"):
+    index = frame.index.to_numpy()
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+    for start in range(0, len(frame), chunk_rows):
+        chunk = {index_name: index[start:start + chunk_rows]}
+        chunk.update({name: values[start:start + chunk_rows] for name, values in columns.items()})
+        yield chunk
+
+
+def write_chunks(chunks, target, format="csv", chunk_rows=CHUNK_ROWS):
+    writer = TableWriter(target, format, chunk_rows)
+    try:
+        for chunk in chunks:
+            writer.write_columns(chunk)
+    finally:
+        writer.close()
+    return target
+
+
+#whole export as bytes, for a download button (built chunk by chunk into one buffer)
+def export_bytes(chunks, format="csv"):
+    buffer = io.BytesIO()
+    write_chunks(chunks, buffer, format)
+    return buffer.getvalue()
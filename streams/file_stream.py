@@ -0,0 +1,34 @@
+import numpy as np
+from streams.base_stream import BaseStream
+from streams.board_info import get_board_info
+
+
+#replays a recorded session chunk by chunk
+# .npy -> channel-major eeg array (n_channels x n_samples)
+# anything else -> brainflow file (DataFilter.write_file), eeg rows picked via board metadata
+class FileStream(BaseStream):
+    def __init__(self, path, chunk_size=32, board_id=None):
+        board_info = get_board_info(board_id)
+        self.sampling_rate = board_info["sampling_rate"]
+        self.channel_names = board_info["eeg_names"]
+
+        if str(path).endswith('.npy'):
+            self.data = np.load(path)
+        else:
+            from brainflow.data_filter import DataFilter
+            self.data = DataFilter.read_file(str(path))[board_info["eeg_channels"]]
+
+        self.chunk_size = chunk_size
+        self.position = 0
+
+    @property
+    def finished(self):
+        return self.position >= self.data.shape[1]
+
+    def get_data(self, noise_level=0):
+        chunk = self.data[:, self.position:self.position + self.chunk_size]
+        self.position += chunk.shape[1]
+        return chunk
+
+    def release(self):
+        pass
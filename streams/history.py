@@ -0,0 +1,91 @@
+import numpy as np
+
+
+#one row per decision, stored as growable numpy columns (capacity doubles when full)
+# appending is a few array writes, and charts / exports read column slices instead of a list of dicts.
+# bool values get a bool column, everything else float (None -> NaN)
+class ColumnarHistory:
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.columns = {}
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, row):
+        if self.length == self.capacity:
+            self.capacity *= 2
+            for name, column in self.columns.items():
+                grown = np.zeros(self.capacity, dtype=column.dtype)
+                grown[:self.length] = column[:self.length]
+                self.columns[name] = grown
+        for name, value in row.items():
+            column = self.columns.get(name)
+            if column is None:
+                is_bool = isinstance(value, (bool, np.bool_))
+                column = np.zeros(self.capacity, dtype=bool) if is_bool else np.full(self.capacity, np.nan)
+                self.columns[name] = column
+            column[self.length] = np.nan if value is None else value
+        for name, column in self.columns.items():
+            if name not in row:
+                column[self.length] = False if column.dtype == bool else np.nan
+        self.length += 1
+
+    def column(self, name):
+        return self.columns[name][:self.length]
+
+    # copies of the selected rows (all of them by default), indexed by decision number
+    def frame(self, indices=None):
+        import pandas as pd
+
+        if indices is None:
+            indices = np.arange(self.length)
+        return pd.DataFrame({name: column[indices] for name, column in self.columns.items()}, index=indices)
+
+    def tail(self, count):
+        return self.frame(np.arange(max(self.length - count, 0), self.length))
+
+    # the whole session at a bounded point count, keeping the peaks of every chart column
+    def downsampled(self, columns, points):
+        from processing.downsample import minmax_indices
+
+        columns = [c for c in columns if c in self.columns]
+        if self.length <= points or not columns:
+            return self.frame()
+        per_column = max(points // len(columns), 4)
+        indices = np.unique(np.concatenate([minmax_indices(self.column(c), per_column) for c in columns]))
+        return self.frame(indices)
+
+
+#raw eeg of a session as float32 chunks (the processor only keeps the last seconds), for export
+# offset: session time (s) of the first recorded sample, so raw and decision times line up
+class EEGRecording:
+    def __init__(self, channel_names, sampling_rate, offset=0.0):
+        self.channel_names = list(channel_names)
+        self.sampling_rate = sampling_rate
+        self.offset = offset
+        self.blocks = []
+        self.samples = 0
+
+    def append(self, eeg_data):
+        self.blocks.append(np.asarray(eeg_data, dtype=np.float32))
+        self.samples += eeg_data.shape[1]
+
+    # column chunks of about chunk_rows samples: sample index, time (s) and one column per channel;
+    # only one chunk is ever concatenated at a time
+    def chunks(self, chunk_rows=65536):
+        group, grouped, start = [], 0, 0
+        for block in list(self.blocks) + [None]:
+            if block is not None:
+                group.append(block)
+                grouped += block.shape[1]
+                if grouped < chunk_rows:
+                    continue
+            if not grouped:
+                break
+            eeg = np.concatenate(group, axis=1)
+            sample = np.arange(start, start + grouped)
+            yield {'sample': sample, 'time': self.offset + sample / self.sampling_rate,
+                   **{name: eeg[i] for i, name in enumerate(self.channel_names)}}
+            group, start, grouped = [], start + grouped, 0
@@ -0,0 +1,294 @@
+import threading
+import time
+import uuid
+from queue import Full
+import numpy as np
+
+from processing.scheduler import HopScheduler
+from streams.history import ColumnarHistory, EEGRecording
+
+
+CHART_COLUMNS = ("arousal", "lower_band", "upper_band")
+
+
+#readable and unique: names exports / profiles and keys the cached post-session analysis
+def new_session_id():
+    return f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+#the live eeg loop on its own thread, so it keeps running across streamlit reruns
+# the page only reads snapshot() and hands over control changes with update_settings(); they are applied
+# at the start of the next hop, never in the middle of a decision
+class LiveSession:
+    def __init__(self, stream, processor, controller, plot_queue=None, recent_size=200):
+        self.stream = stream
+        self.processor = processor
+        self.controller = controller
+        self.plot_queue = plot_queue
+        self.recent_size = recent_size
+        self.output_bus = None
+        self.session_id = new_session_id()
+        self.raw = None           # EEGRecording once raw recording is switched on (export)
+        self.record_raw = False
+        self.profiler = None      # SessionProfiler of a capture started from the page
+
+        self.scheduler = HopScheduler(processor.hop_seconds)
+        controller.set_hop(processor.hop_seconds)
+        self.buffer = np.empty((len(processor.eeg_channels), 0))
+        self.history = ColumnarHistory()   # one row per decision, the whole session (charts / analysis / export)
+        self.latest = None
+        self.total_samples = 0
+        self.artifact_count = 0
+        self.started_at = None
+
+        self.pending = {}
+        self.settings = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def update_settings(self, **settings):
+        with self.lock:
+            self.pending.update({k: v for k, v in settings.items() if self.settings.get(k, object()) != v})
+
+    def apply_settings(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        self.settings.update(pending)
+        processor, controller = self.processor, self.controller
+        if 'band_scale' in pending:
+            processor.set_band_scale(pending['band_scale'])
+        if 'adaptive_band' in pending:
+            processor.set_adaptive_band(pending['adaptive_band'])
+        if 'hop_seconds' in pending or 'adaptive_hop' in pending:
+            hop = self.settings.get('hop_seconds', processor.hop_seconds)
+            self.scheduler = HopScheduler(hop, adaptive=self.settings.get('adaptive_hop', False))
+            processor.set_hop(hop)
+            controller.set_hop(hop)
+        if 'predictive' in pending:
+            if pending['predictive'] and controller.estimator is None:
+                from controller.estimator import PredictiveEstimator
+                controller.estimator = PredictiveEstimator(dt=processor.hop_seconds)
+            elif not pending['predictive']:
+                controller.estimator = None
+        if 'output_bus' in pending:
+            self.output_bus = pending['output_bus']
+        if 'record_raw' in pending:
+            self.record_raw = pending['record_raw']
+            if self.record_raw and self.raw is None:
+                self.raw = EEGRecording(processor.channel_names, processor.sampling_rate, offset=self.elapsed())
+
+    def start(self):
+        if self.running:
+            return
+        self.stop_event.clear()
+        self.started_at = self.started_at or time.time()
+        self.thread = threading.Thread(target=self.run, name="live-session", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def elapsed(self):
+        return time.time() - self.started_at if self.started_at else 0.0
+
+    # one decision per hop on a fixed schedule, not whenever a chunk happens to arrive
+    # (decision time counts as load for the adaptive hop)
+    def run(self):
+        try:
+            self.loop()
+        except Exception as e:
+            self.error = str(e)
+
+    def loop(self):
+        processor, controller = self.processor, self.controller
+        monitor = getattr(self.stream, 'packet_monitor', None)  # lost BLE packets / jitter
+        new_samples = 0
+        while not self.stop_event.is_set():
+            self.apply_settings()
+            if self.profiler is not None:
+                self.profiler.checkpoint()
+            eeg_data = self.stream.get_data()
+
+            if self.plot_queue is not None and eeg_data.shape[1] > 0:
+                try: self.plot_queue.put_nowait(eeg_data)
+                except Full: pass
+
+            if eeg_data.shape[1] > 0:
+                self.buffer = np.concatenate((self.buffer, eeg_data), axis=1)
+                new_samples += eeg_data.shape[1]
+                if self.record_raw:
+                    self.raw.append(eeg_data)
+
+            # wait for the next hop (and for fresh data, a stalled stream would only repeat the last window)
+            window_samples = processor.window_samples
+            if self.buffer.shape[1] < window_samples or new_samples == 0 or not self.scheduler.due():
+                self.stop_event.wait(min(max(self.scheduler.time_to_next(), 0.005), 0.02))
+                continue
+
+            hop_start = time.perf_counter()
+            new_samples = 0
+            dropped = monitor.dropped_in_last(window_samples) if monitor is not None else 0
+            arousal, artifact_detected, _ = processor.process_eeg(self.buffer[:, -window_samples:].copy(), dropped_samples=dropped)
+            raw_index = processor.last_features.get(processor.selected_feature)
+            in_range, last_good_arousal = controller.update_state(arousal, processor.viability_band, artifact_detected, raw_index)
+            if self.output_bus is not None:
+                self.output_bus.publish({
+                    'time': self.elapsed(), 'arousal': last_good_arousal,
+                    'lower_band': processor.viability_band[0], 'upper_band': processor.viability_band[1],
+                    'in_range': in_range, 'artifact': artifact_detected})
+
+            row = {
+                "time": self.elapsed(),
+                "arousal": last_good_arousal,
+                "lower_band": processor.viability_band[0],
+                "upper_band": processor.viability_band[1],
+                "in_range": in_range,
+                "artifact": artifact_detected,
+                **{f"feature_{name}": value for name, value in processor.last_features.items()},
+            }
+            with self.lock:
+                self.history.append(row)
+                self.latest = row
+                self.total_samples += 1
+                self.artifact_count += bool(artifact_detected)
+
+            processor.set_hop(self.scheduler.record(time.perf_counter() - hop_start))
+            controller.set_hop(processor.hop_seconds)
+
+            max_buffer_size = processor.sampling_rate * 5  # 5 seconds
+            if self.buffer.shape[1] > max_buffer_size:
+                self.buffer = self.buffer[:, -max_buffer_size:]
+
+    # what the dashboard draws: latest decision, the history and the session stats
+    # history: the last recent_size rows, the whole session, or (points) the whole session downsampled for a chart
+    def snapshot(self, full_history=False, points=None):
+        with self.lock:
+            if points is not None:
+                history = self.history.downsampled(CHART_COLUMNS, points)
+            else:
+                history = self.history.frame() if full_history else self.history.tail(self.recent_size)
+            latest = dict(self.latest) if self.latest else None
+            total, artifacts = self.total_samples, self.artifact_count
+        monitor = getattr(self.stream, 'packet_monitor', None)
+        return {
+            'latest': latest,
+            'history': history,
+            'viability_band': tuple(self.processor.viability_band),
+            'stats': {
+                'duration': self.elapsed(),
+                'total_samples': total,
+                'artifact_rate': artifacts / total * 100 if total else 0.0,
+                'decision_rate': self.scheduler.decision_rate,
+                'hop': self.scheduler.hop_seconds,
+                **({'stream': monitor.metrics()} if monitor is not None else {}),
+            },
+            'error': self.error,
+        }
+
+
+#the simulation loop on its own thread: steps the SimulatedStream at the sensor rate with whatever the
+# sidebar controls are right now (set_controls), spikes / auto-tune requests are queued for the next step
+class SimulationSession:
+    def __init__(self, sim_stream, controls):
+        self.sim_stream = sim_stream
+        self.session_id = None
+        self.controls = dict(controls)
+        self.actions = []
+        self.history = ColumnarHistory()
+        self.latest = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None
+        self.profiler = None
+
+    def set_controls(self, controls):
+        with self.lock:
+            self.controls = dict(controls)
+
+    def spike(self, magnitude):
+        with self.lock:
+            self.actions.append(lambda: self.sim_stream.apply_spike(magnitude))
+
+    def start_auto_tuning(self):
+        with self.lock:
+            self.actions.append(self.sim_stream.start_auto_tuning)
+
+    # fresh run: new history, stream back to the base state
+    def start(self, state_name):
+        self.stop()
+        self.sim_stream.reset(state_name)
+        self.session_id = new_session_id()
+        with self.lock:
+            self.history, self.latest, self.actions = ColumnarHistory(), None, []
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="simulation-session", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                tick = time.perf_counter()
+                with self.lock:
+                    controls, actions, self.actions = self.controls, self.actions, []
+                for action in actions:
+                    action()
+                if self.profiler is not None:
+                    self.profiler.checkpoint()
+                self.sim_stream.dt = 1 / controls["sensor_sampling_rate"]
+                arousal, viability_band, fatigue, is_burnt_out, energy, pid_gains, energy_spent = self.sim_stream.get_arousal_value(
+                    controls["state_name"], controls["target_arousal"],
+                    controls["natural_flux"], controls["noise_level"],
+                    controls["kp"], controls["ki"], controls["kd"],
+                    controls["latency"], controls["feedback_on"],
+                    controls["environmental_threat"], controls["effort_amplification"],
+                    controls["controller_type"]
+                )
+                row = {
+                    "arousal": arousal,
+                    "lower_band": viability_band[0],
+                    "upper_band": viability_band[1],
+                    "fatigue": fatigue,
+                    "energy": energy,
+                    "energy_spent": energy_spent,
+                    "in_band": viability_band[0] <= arousal <= viability_band[1],
+                }
+                with self.lock:
+                    self.history.append(row)
+                    self.latest = {**row, "viability_band": viability_band, "is_burnt_out": is_burnt_out,
+                                   "pid_gains": pid_gains, "noise_level": controls["noise_level"]}
+                self.stop_event.wait(max(0.0, 1 / controls["sensor_sampling_rate"] - (time.perf_counter() - tick)))
+        except Exception as e:
+            self.error = str(e)
+
+    # recent=None -> the whole run; points -> the whole run downsampled for a chart
+    def snapshot(self, recent=200, points=None):
+        with self.lock:
+            if points is not None:
+                history = self.history.downsampled(CHART_COLUMNS, points)
+            else:
+                history = self.history.tail(recent) if recent else self.history.frame()
+            return {
+                'latest': dict(self.latest) if self.latest else None,
+                'history': history,
+                'error': self.error,
+            }
@@ -1,21 +1,31 @@
 import time
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds
 from streams.base_stream import BaseStream
+from streams.packet_monitor import PacketMonitor
 
 class MuseStream(BaseStream):
 
-    def __init__(self, data_queue=None):
+    # mac_address / serial_number pick one headset when several are in range
+    # resample=True fills lost packets by interpolation so the eeg stays on a uniform time grid
+    def __init__(self, data_queue=None, board_id=None, mac_address="", serial_number="", buffer_size=450000, resample=False):
         params = BrainFlowInputParams()
-        self.board_id = BoardIds.MUSE_2_BOARD.value
+        params.mac_address = mac_address or ""
+        params.serial_number = serial_number or ""
+        self.board_id = board_id if board_id is not None else BoardIds.MUSE_2_BOARD.value
         self.board = BoardShim(self.board_id, params)
+        self.device_label = mac_address or serial_number or "default"
         
-        print("Preparing session... Make sure your Muse is paired and connected.")
+        print(f"Preparing session ({self.device_label})... Make sure your Muse is paired and connected.")
         self.board.prepare_session()
         print("Starting stream...")
-        self.board.start_stream(450000)
+        self.board.start_stream(buffer_size)
         
         self.sampling_rate = BoardShim.get_sampling_rate(self.board_id)
         self.eeg_channels = BoardShim.get_eeg_channels(self.board_id)
+        self.package_channel = BoardShim.get_package_num_channel(self.board_id)
+        self.timestamp_channel = BoardShim.get_timestamp_channel(self.board_id)
+        # dropped packets / jitter, from the package-number and timestamp rows
+        self.packet_monitor = PacketMonitor(self.sampling_rate, resample=resample)
         
         print("Letting buffer fill...")
         time.sleep(3)
@@ -23,7 +33,7 @@ class MuseStream(BaseStream):
     def get_data(self, noise_level=0):
         data = self.board.get_board_data()
         eeg_data = data[self.eeg_channels]
-        return eeg_data
+        return self.packet_monitor.process(data[self.package_channel], data[self.timestamp_channel], eeg_data)
     
     #stops stream and release
     def release(self):
@@ -0,0 +1,157 @@
+import socket
+import threading
+import time
+from collections import deque
+import numpy as np
+from streams.osc import decode_osc, osc_packets
+from streams.base_stream import BaseStream
+from streams.packet_monitor import PacketMonitor
+from streams.synthetic_stream import MUSE_CHANNEL_NAMES
+
+CHUNK_ADDRESS = "/muse_cyb/eeg"   # ,iib: sequence number, channel count, float32 little-endian channel-major samples
+SAMPLE_ADDRESS = "/muse/eeg"      # ,ffff...: one sample per message (Mind Monitor / muse-io style relays)
+SEQUENCE_MODULUS = 1 << 31
+
+
+#muse eeg relayed over OSC/UDP by a companion app or another host (no BLE stack on this machine)
+# a reader thread collects datagrams; get_data parses what arrived and returns the samples that are ready,
+# channel-major in uV.
+# chunk packets carry a sequence number: out-of-order packets wait in a small reorder buffer until the gap
+# fills, and a gap still open after `reorder_window` later packets or `reorder_timeout` seconds is declared lost.
+# the released packets then go through the same PacketMonitor as MuseStream (drop counting, jitter from
+# arrival times, optional interpolation of lost samples). per-sample messages have no sequence number, so
+# their loss cannot be detected.
+class NetworkStream(BaseStream):
+    def __init__(self, port=5000, host="0.0.0.0", sampling_rate=256, channel_names=None, reorder_window=8,
+                 reorder_timeout=0.1, resample=False, receive_buffer=1 << 20):
+        self.sampling_rate = sampling_rate
+        self.channel_names = list(channel_names or MUSE_CHANNEL_NAMES)
+        self.device_label = f"udp:{port}"
+        self.reorder_window = reorder_window
+        self.reorder_timeout = reorder_timeout
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)  # absorbs stalls between get_data calls
+        self.socket.bind((host, port))
+        self.socket.settimeout(0.2)
+        self.port = self.socket.getsockname()[1]
+
+        self.next_sequence = None
+        self.pending = {}      # sequence -> (samples view, arrival time), waiting for an earlier packet
+        self.ready = []        # released in order since the last get_data: (sequence, samples, arrival)
+        self.sample_sequence = 0
+        self.sequence_offset = 0   # maps the sender's numbering onto ours across sender restarts
+        self.restart_distance = 64 * reorder_window
+        self.packet_monitor = PacketMonitor(sampling_rate, resample=resample, package_modulus=SEQUENCE_MODULUS)
+
+        self.packets = 0
+        self.reordered = 0
+        self.late = 0          # arrived after their gap was given up on (or duplicates) -> discarded
+        self.malformed = 0
+        self.senders_restarted = 0
+
+        # like brainflow's reader thread: only receives and stamps arrival time, parsing happens in get_data
+        self.inbox = deque()
+        self.running = True
+        self.thread = threading.Thread(target=self.receive_loop, name=f"network-stream-{self.port}", daemon=True)
+        self.thread.start()
+
+    def receive_loop(self):
+        while self.running:
+            try:
+                datagram = self.socket.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.inbox.append((datagram, time.perf_counter()))
+
+    def get_data(self, noise_level=0):
+        while self.inbox:
+            datagram, arrival = self.inbox.popleft()
+            for packet in osc_packets(datagram):
+                # a packet that does not carry every channel is dropped here, it never reaches assemble()
+                try:
+                    address, values = decode_osc(packet)
+                    if address == CHUNK_ADDRESS:
+                        sequence, channels, blob = values[:3]
+                        if channels < len(self.channel_names):
+                            raise ValueError(f"chunk with {channels} channels, expected {len(self.channel_names)}")
+                        # float32 view straight onto the datagram, copied once when the chunk is assembled
+                        samples = np.frombuffer(blob, dtype="<f4").reshape(channels, -1)[:len(self.channel_names)]
+                        self.receive(sequence % SEQUENCE_MODULUS, samples, arrival)
+                    elif address == SAMPLE_ADDRESS:
+                        if len(values) < len(self.channel_names):
+                            raise ValueError(f"sample with {len(values)} values, expected {len(self.channel_names)}")
+                        sample = np.array(values[:len(self.channel_names)], dtype=np.float32)[:, None]
+                        self.ready.append((self.sample_sequence, sample, arrival))
+                        self.sample_sequence = (self.sample_sequence + 1) % SEQUENCE_MODULUS
+                except (ValueError, IndexError, TypeError, KeyError, UnicodeDecodeError):
+                    self.malformed += 1
+        self.release_pending(time.perf_counter())
+        return self.assemble()
+
+    def receive(self, sender_sequence, samples, arrival):
+        self.packets += 1
+        sequence = (sender_sequence + self.sequence_offset) % SEQUENCE_MODULUS
+        if self.next_sequence is None:
+            self.next_sequence = sequence
+        ahead = (sequence - self.next_sequence) % SEQUENCE_MODULUS
+        waiting = [(s - self.next_sequence) % SEQUENCE_MODULUS for s in self.pending]
+        if ahead >= SEQUENCE_MODULUS // 2 and SEQUENCE_MODULUS - ahead > self.restart_distance:
+            # far behind: the sender restarted its counter -> continue our numbering after what we have, nothing lost
+            ahead = max(waiting) + 1 if waiting else 0
+            sequence = (self.next_sequence + ahead) % SEQUENCE_MODULUS
+            self.sequence_offset = (sequence - sender_sequence) % SEQUENCE_MODULUS
+            self.senders_restarted += 1
+        elif ahead >= SEQUENCE_MODULUS // 2 or sequence in self.pending:
+            self.late += 1
+            return
+        elif waiting and ahead < max(waiting):
+            self.reordered += 1  # fills a gap behind packets that overtook it
+        self.pending[sequence] = (samples, arrival)
+
+    def release_pending(self, now):
+        while self.pending:
+            if self.next_sequence in self.pending:
+                samples, arrival = self.pending.pop(self.next_sequence)
+                self.ready.append((self.next_sequence, samples, arrival))
+                self.next_sequence = (self.next_sequence + 1) % SEQUENCE_MODULUS
+                continue
+            oldest = min(arrival for _, arrival in self.pending.values())
+            if len(self.pending) < self.reorder_window and now - oldest < self.reorder_timeout:
+                break
+            # give up on the gap: jump to the earliest packet we do have, PacketMonitor counts the loss
+            self.next_sequence = min(self.pending, key=lambda s: (s - self.next_sequence) % SEQUENCE_MODULUS)
+
+    def assemble(self):
+        # taken off first: whatever happens below, the next call starts from fresh packets
+        ready, self.ready = self.ready, []
+        if not ready:
+            return np.empty((len(self.channel_names), 0))
+        counts = [samples.shape[1] for _, samples, _ in ready]
+        eeg = np.empty((len(self.channel_names), sum(counts)))
+        package_nums = np.repeat([sequence for sequence, _, _ in ready], counts)
+        timestamps = np.empty(eeg.shape[1])
+        position = 0
+        for (_, samples, arrival), n in zip(ready, counts):
+            eeg[:, position:position + n] = samples
+            # the newest sample of a packet was taken just before it was sent
+            timestamps[position:position + n] = arrival - np.arange(n - 1, -1, -1) / self.sampling_rate
+            position += n
+        return self.packet_monitor.process(package_nums, timestamps, eeg)
+
+    def metrics(self):
+        return {
+            'packets': self.packets,
+            'reordered_packets': self.reordered,
+            'late_packets': self.late,
+            'malformed_packets': self.malformed,
+            'sender_restarts': self.senders_restarted,
+            **self.packet_monitor.metrics(),
+        }
+
+    def release(self):
+        self.running = False
+        self.thread.join(1.0)
+        self.socket.close()
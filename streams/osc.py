@@ -0,0 +1,77 @@
+import struct
+
+
+#OSC 1.0 messages and bundles (no dependency), shared by the output bus (decisions out) and the network stream /
+# udp replay (eeg in)
+def _osc_string(text):
+    data = text.encode() + b"\0"
+    return data + b"\0" * (-len(data) % 4)
+
+
+def encode_osc(address, values):
+    tags, payload = [","], []
+    for value in values:
+        if value is None:
+            tags.append("N")
+        elif isinstance(value, bool):
+            tags.append("T" if value else "F")
+        elif isinstance(value, int):
+            tags.append("i")
+            payload.append(struct.pack(">i", value))
+        elif isinstance(value, float):
+            tags.append("f")
+            payload.append(struct.pack(">f", value))
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            tags.append("b")
+            payload.append(struct.pack(">i", len(value)) + bytes(value) + b"\0" * (-len(value) % 4))
+        else:
+            tags.append("s")
+            payload.append(_osc_string(str(value)))
+    return _osc_string(address) + _osc_string("".join(tags)) + b"".join(payload)
+
+
+def _read_osc_string(data, offset):
+    end = data.index(b"\0", offset)
+    return data[offset:end].decode(), end + 1 + (-(end + 1) % 4)
+
+
+# blobs come back as memoryview slices of `data` (no copy)
+def decode_osc(data):
+    address, offset = _read_osc_string(data, 0)
+    tags, offset = _read_osc_string(data, offset)
+    values = []
+    for tag in tags[1:]:
+        if tag in "if":
+            values.append(struct.unpack_from(">i" if tag == "i" else ">f", data, offset)[0])
+            offset += 4
+        elif tag in "hd":
+            values.append(struct.unpack_from(">q" if tag == "h" else ">d", data, offset)[0])
+            offset += 8
+        elif tag == "s":
+            text, offset = _read_osc_string(data, offset)
+            values.append(text)
+        elif tag == "b":
+            size = struct.unpack_from(">i", data, offset)[0]
+            values.append(memoryview(data)[offset + 4:offset + 4 + size])
+            offset += 4 + size + (-size % 4)
+        else:
+            values.append({"T": True, "F": False, "N": None}[tag])
+    return address, values
+
+
+# OSC bundle -> its element packets (nested bundles flattened); a plain message -> [message]
+def osc_packets(data):
+    if not data.startswith(b"#bundle\0"):
+        return [data]
+    packets, offset = [], 16  # "#bundle\0" + 8-byte timetag
+    while offset + 4 <= len(data):
+        size = struct.unpack_from(">i", data, offset)[0]
+        packets.extend(osc_packets(data[offset + 4:offset + 4 + size]))
+        offset += 4 + size
+    return packets
+
+
+# "host:port" or ":port" -> (host, port), host defaults to localhost
+def parse_target(text):
+    host, _, port = text.strip().rpartition(":")
+    return (host or "127.0.0.1", int(port))
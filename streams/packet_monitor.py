@@ -0,0 +1,137 @@
+import numpy as np
+from collections import deque
+
+
+#checks the board's package-number and timestamp rows for lost samples and timing jitter
+# package numbers may count samples or whole BLE packets (muse: several samples per number) -> the
+# samples per package are inferred; a jump of d > 1 means (d - 1) packages were lost.
+# boards without usable package numbers fall back to timestamp gaps.
+# every received sample gets a position on the uniform sample grid (received + lost so far):
+#  - timing jitter = spread of (timestamp - grid time) over the recent past
+#  - resample=True fills lost samples by linear interpolation, so the output stays on a uniform time grid
+# gap positions are kept in output-sample coordinates so a consumer can ask how much was lost in its window
+class PacketMonitor:
+    def __init__(self, sampling_rate, resample=False, package_modulus=None, history_seconds=60, jitter_seconds=10):
+        self.sampling_rate = sampling_rate
+        self.resample = resample
+        self.package_modulus = package_modulus  # None -> next power of two above the largest number seen
+        self.output_factor = 1                  # set by DecimatedStream: output samples are this many input samples
+
+        self.last_package = None
+        self.max_package = 0
+        self.package_numbers_valid = False
+        self.samples_per_package = 1
+        self.packages_seen = 0
+        self.last_timestamp = None
+        self.last_values = None
+        self.grid_position = -1     # grid index of the last received sample
+        self.time_origin = None     # timestamp of grid index 0
+
+        self.delivered = 0          # samples handed out so far (output coordinates before decimation)
+        self.gaps = deque()         # (delivered position of the first sample after the gap, lost samples)
+        self.history_samples = int(history_seconds * sampling_rate)
+        self.lateness = deque()     # per-chunk arrays of (timestamp - grid time)
+        self.lateness_count = 0
+        self.jitter_samples = int(jitter_seconds * sampling_rate)
+
+        self.received = 0
+        self.dropped = 0
+        self.gap_count = 0
+        self.max_gap = 0
+
+    def lost_before(self, package_nums, timestamps):
+        n = len(package_nums)
+        packages = package_nums.astype(np.int64)
+        previous = self.last_package if self.last_package is not None else packages[0]
+        steps = np.diff(packages, prepend=previous)
+        self.max_package = max(self.max_package, int(packages.max()))
+        if np.any(steps < 0):  # counter wrapped
+            modulus = self.package_modulus or 1 << self.max_package.bit_length()
+            steps %= modulus
+        self.last_package = int(packages[-1])
+
+        new_packages = int(np.count_nonzero(steps))
+        if new_packages and not self.package_numbers_valid:
+            self.package_numbers_valid = True
+            self.packages_seen = 1  # the very first package has no step
+        if self.package_numbers_valid:
+            # samples sharing one number, averaged over the whole session so chunk boundaries do not matter
+            # (updated first, so gaps in the very first chunk are already sized right)
+            self.packages_seen += new_packages
+            self.samples_per_package = max(1, int(round((self.received + n) / max(self.packages_seen, 1))))
+            return np.where(steps > 1, (steps - 1) * self.samples_per_package, 0)
+
+        # no package numbers: a timestamp step of more than 1.5 sample periods means lost samples
+        previous_time = self.last_timestamp if self.last_timestamp is not None else timestamps[0]
+        periods = np.diff(timestamps, prepend=previous_time) * self.sampling_rate
+        return np.where(periods > 1.5, np.round(periods).astype(np.int64) - 1, 0)
+
+    # package_nums, timestamps: board rows of one get_board_data() call; eeg: its eeg rows
+    def process(self, package_nums, timestamps, eeg):
+        n = eeg.shape[1]
+        if n == 0:
+            return eeg
+        lost = self.lost_before(package_nums, timestamps)
+        if self.last_values is None:
+            lost[0] = 0  # nothing before the first sample can be lost
+        positions = self.grid_position + np.cumsum(1 + lost)
+
+        # jitter: how far each sample's timestamp is from where the uniform grid puts it
+        if self.time_origin is None:
+            self.time_origin = timestamps[0] - positions[0] / self.sampling_rate
+        lateness = timestamps - (self.time_origin + positions / self.sampling_rate)
+        if abs(lateness[-1]) > 1.0:  # clock skew / long stall -> re-anchor the grid
+            self.time_origin += lateness[-1]
+            lateness -= lateness[-1]
+        self.lateness.append(lateness)
+        self.lateness_count += n
+        while self.lateness_count - len(self.lateness[0]) >= self.jitter_samples:
+            self.lateness_count -= len(self.lateness.popleft())
+
+        if self.resample and lost.any() and self.last_values is not None:
+            grid = np.arange(self.grid_position + 1, positions[-1] + 1)
+            known = np.concatenate(([self.grid_position], positions))
+            values = np.concatenate((self.last_values[:, None], eeg), axis=1)
+            out = np.array([np.interp(grid, known, row) for row in values])
+            gap_starts = positions[lost > 0] - lost[lost > 0] - (self.grid_position + 1)
+        else:
+            out = eeg
+            gap_starts = np.flatnonzero(lost)
+
+        for start, count in zip(gap_starts, lost[lost > 0]):
+            self.gaps.append((self.delivered + int(start), int(count)))
+            self.max_gap = max(self.max_gap, int(count))
+        while self.gaps and self.gaps[0][0] < self.delivered - self.history_samples:
+            self.gaps.popleft()
+
+        self.received += n
+        self.dropped += int(lost.sum())
+        self.gap_count += int(np.count_nonzero(lost))
+        self.grid_position = int(positions[-1])
+        self.last_timestamp = timestamps[-1]
+        self.last_values = eeg[:, -1].copy()
+        self.delivered += out.shape[1]
+        return out
+
+    # lost samples inside [start, end) of the delivered stream (in the consumer's sample coordinates)
+    def dropped_between(self, start, end):
+        start, end = start * self.output_factor, end * self.output_factor
+        return sum(count for position, count in self.gaps if start <= position < end) // self.output_factor
+
+    def dropped_in_last(self, num_samples):
+        delivered = self.delivered // self.output_factor
+        return self.dropped_between(delivered - num_samples, delivered)
+
+    def metrics(self):
+        lateness = np.concatenate(self.lateness) if self.lateness else np.zeros(1)
+        expected = self.received + self.dropped
+        return {
+            'received_samples': self.received,
+            'dropped_samples': self.dropped,
+            'drop_rate': self.dropped / expected if expected else 0.0,
+            'gaps': self.gap_count,
+            'max_gap_samples': self.max_gap,
+            'samples_per_package': self.samples_per_package,
+            'jitter_ms': float(np.std(lateness) * 1000),
+            'lateness_range_ms': float(np.ptp(lateness) * 1000),
+        }
@@ -0,0 +1,182 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+# not processing/profiles.py's PROFILE_DIR (calibration profiles)
+PERF_DIR = os.environ.get("MUSE_PERF_DIR", os.path.join(os.path.expanduser("~"), ".muse_cyb_sys", "perf_profiles"))
+PROFILE_MODES = ("sampling", "cprofile")
+# sampled besides the session thread: streamlit script runs (dashboard / controls fragments)
+SCRIPT_THREAD_PREFIX = "ScriptRunner"
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+#time-boxed profile of a running session, started from the page while the session keeps going.
+# sampling: a background thread reads the stacks of the session thread and of the streamlit script threads every
+# `interval` seconds (sys._current_frames) -> folded stacks for a flame graph and self / total share per function,
+# the profiled code itself runs untouched.
+# cprofile: on top of that an exact cProfile of the session thread (call counts, own / cumulative time). cProfile only
+# sees the thread that enables it, so the session loop calls checkpoint() once per iteration and it is switched on
+# and off from there; it slows the session down while it runs.
+# results are written to PERF_DIR as <session_id>_profile_<time>.folded (flamegraph.pl / speedscope) and .prof (pstats)
+class SessionProfiler:
+    def __init__(self, session_id, thread, mode="sampling", duration=10.0, interval=0.005, directory=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"profile mode must be one of {PROFILE_MODES}, got {mode!r}")
+        self.session_id = session_id
+        self.thread = thread
+        self.mode = mode
+        self.duration = duration
+        self.interval = interval
+        self.directory = directory or PERF_DIR
+        self.stacks = Counter()
+        self.ticks = 0
+        self.started = None
+        self.deadline = None
+        self.cprofile = cProfile.Profile() if mode == "cprofile" else None
+        self.cprofile_state = "pending"   # -> running -> done, only changed on the session thread
+        self.sampler = None
+        self.result = None
+        self.done = threading.Event()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.deadline = self.started + self.duration
+        self.sampler = threading.Thread(target=self.run, name="session-profiler", daemon=True)
+        self.sampler.start()
+        return self
+
+    # ends the capture early, what was collected so far is still saved
+    def stop(self):
+        self.deadline = min(self.deadline, time.perf_counter())
+
+    @property
+    def remaining(self):
+        return max(self.deadline - time.perf_counter(), 0.0) if self.deadline is not None else self.duration
+
+    # session thread, once per loop iteration
+    def checkpoint(self):
+        if self.cprofile is None or self.cprofile_state == "done":
+            return
+        if self.cprofile_state == "pending" and time.perf_counter() < self.deadline:
+            self.cprofile.enable()
+            self.cprofile_state = "running"
+        elif self.cprofile_state == "running" and time.perf_counter() >= self.deadline:
+            self.cprofile.disable()
+            self.cprofile_state = "done"
+
+    def targets(self):
+        threads = [t for t in threading.enumerate() if t.name.startswith(SCRIPT_THREAD_PREFIX)]
+        if self.thread is not None and self.thread.is_alive():
+            threads.append(self.thread)
+        return {t.ident: t.name for t in threads}
+
+    def run(self):
+        labels = {}
+        targets, refreshed = self.targets(), time.perf_counter()
+        while time.perf_counter() < self.deadline:
+            if time.perf_counter() - refreshed > 0.5:
+                targets, refreshed = self.targets(), time.perf_counter()
+            frames = sys._current_frames()
+            for ident, name in targets.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[tuple(reversed(stack))] += 1
+            del frames
+            self.ticks += 1
+            time.sleep(self.interval)
+
+        # the session thread switches cProfile off at its next iteration (or is gone)
+        wait_until = time.perf_counter() + 2.0
+        while self.cprofile_state == "running" and self.thread is not None and self.thread.is_alive() \
+                and time.perf_counter() < wait_until:
+            time.sleep(0.01)
+        try:
+            self.result = self.summary()
+        except Exception as e:
+            self.result = {'error': str(e)}
+        self.done.set()
+
+    def summary(self, top=25):
+        elapsed = min(time.perf_counter(), self.deadline) - self.started
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack[1:]):
+                total_counts[label] += count
+        ticks = max(self.ticks, 1)
+        functions = [{'function': label, 'self_pct': 100 * count / ticks, 'total_pct': 100 * total_counts[label] / ticks}
+                     for label, count in self_counts.most_common(top)]
+
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{self.session_id}_profile_{time.strftime('%H%M%S')}")
+        paths = [base + ".folded"]
+        with open(paths[0], 'w') as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        cprofile_functions = None
+        if self.cprofile is not None and self.cprofile_state == "done":
+            stats = pstats.Stats(self.cprofile)
+            paths.append(base + ".prof")
+            stats.dump_stats(paths[1])
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+            cprofile_functions = [{'function': f"{name} ({os.path.basename(file)}:{line})", 'calls': calls,
+                                   'own_s': own, 'cumulative_s': cumulative, 'per_call_ms': 1000 * cumulative / calls if calls else 0.0}
+                                  for (file, line, name), (_, calls, own, cumulative, _) in rows]
+
+        return {
+            'session_id': self.session_id,
+            'mode': self.mode,
+            'seconds': elapsed,
+            'ticks': self.ticks,
+            'threads': sorted({stack[0] for stack in self.stacks}),
+            'functions': functions,
+            'cprofile': cprofile_functions,
+            'flame': flame_nodes(self.stacks),
+            'paths': paths,
+        }
+
+
+#icicle / flame graph layout of folded stacks: one node per distinct call path, x0..x1 = share of all samples,
+# depth 0 = thread. paths thinner than min_fraction are dropped so the chart stays small
+def flame_nodes(stacks, min_fraction=0.002):
+    total = sum(stacks.values())
+    if not total:
+        return []
+    tree = {}
+    for stack, count in stacks.items():
+        children = tree
+        for label in stack:
+            node = children.setdefault(label, [0, {}])
+            node[0] += count
+            children = node[1]
+
+    nodes = []
+
+    def place(children, x0, depth):
+        for label, (count, grandchildren) in sorted(children.items(), key=lambda item: -item[1][0]):
+            width = count / total
+            if width >= min_fraction:
+                nodes.append({'name': label, 'depth': depth, 'x0': x0, 'x1': x0 + width, 'samples': count, 'pct': 100 * width})
+                place(grandchildren, x0, depth + 1)
+            x0 += width
+
+    place(tree, 0.0, 0)
+    return nodes
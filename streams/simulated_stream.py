@@ -1,10 +1,49 @@
+import math
 import numpy as np
 from collections import deque
 
+# default values of the simulation sidebar controls
+SIM_DEFAULTS = {
+    "state_name": "Calm",
+    "target_arousal": 0.75,
+    "natural_flux": 0.10,
+    "latency": 5,
+    "sensor_sampling_rate": 20,
+    "noise_level": 0.005,
+    "feedback_on": False,
+    "environmental_threat": 0.0,
+    "effort_amplification": 4.0,
+    "kp": 0.30,
+    "ki": 0.05,
+    "kd": 0.15,
+    "controller_type": "P Controller",
+}
+
+# "extreme trials": control overrides applied on top of the current controls
+SIM_SCENARIOS = {
+    "caffeine": {"gain": 0.5, "latency": 2, "noise_level": 0.02, "environmental_threat": 0.0, "effort_amplification": 5.0},
+    "drowsy": {"state_name": "Focused", "gain": 0.05, "latency": 30, "noise_level": 0.01, "environmental_threat": 0.0, "effort_amplification": 3.0},
+    "exam": {"state_name": "Focused", "target_arousal": 0.6, "gain": 0.15, "environmental_threat": 0.4, "effort_amplification": 5.0},
+}
+
+SIM_HISTORY_COLUMNS = ["arousal", "lower_band", "upper_band", "fatigue", "energy", "energy_spent", "in_band"]
+
+# time base: the per-step constants below were written for 20 Hz steps, they are scaled by substep / REFERENCE_DT
+REFERENCE_DT = 0.05
+# longest substep of the fast (arousal / controller) dynamics: explicit euler, a longer `dt` is split into substeps
+MAX_FAST_DT = REFERENCE_DT
+# slow dynamics: fatigue / burnout are updated once per FATIGUE_PERIOD seconds (20 steps of 20 Hz)
+FATIGUE_PERIOD = 1.0
+# fatigue levels where the slow dynamics change their law (override and degradation start at 0.7, burnout at 1)
+FATIGUE_BREAKPOINTS = (0.0, 0.7, 1.0)
+
 #generates arousal signal
+# dt = seconds per get_arousal_value call (1 / sensor_sampling_rate), physical time no longer depends on the sleep
 class SimulatedStream:
-    def __init__(self):
-        
+    def __init__(self, seed=None, dt=REFERENCE_DT):
+        self.rng = np.random.default_rng(seed)
+        self.dt = dt
+        self.substep = None   # substep length the scaled constants below were computed for
         self.states = {
             'Calm': {'initial_arousal': 0.25}, 
             'Focused': {'initial_arousal': 0.60},
@@ -67,8 +106,52 @@ class SimulatedStream:
 
 
     # MAIN METHOD------------------------
-    def get_arousal_value(self, state_name, manual_target_arousal, natural_flux, noise_level, kp, ki, kd, control_delay, feedback_on, environmental_threat, effort_amplification, controller_type):
-        
+    # advances self.dt seconds, in substeps of at most MAX_FAST_DT; returns the state after the last one and the
+    # energy spent over all of them
+    # measured_arousal: what the subject is told its arousal is (e.g. the real pipeline's estimate in the digital twin);
+    # the conscious control acts on it instead of the true value, the body (fatigue, burnout, energy) on the true value
+    def get_arousal_value(self, state_name, manual_target_arousal, natural_flux, noise_level, kp, ki, kd, control_delay, feedback_on, environmental_threat, effort_amplification, controller_type,
+                          measured_arousal=None):
+        if self.dt <= MAX_FAST_DT:
+            return self.advance(self.dt, state_name, manual_target_arousal, natural_flux, noise_level, kp, ki, kd, control_delay, feedback_on,
+                                environmental_threat, effort_amplification, controller_type, measured_arousal)
+        substeps = math.ceil(self.dt / MAX_FAST_DT - 1e-9)
+        h = self.dt / substeps
+        spent = 0.0
+        for _ in range(substeps):
+            result = self.advance(h, state_name, manual_target_arousal, natural_flux, noise_level, kp, ki, kd, control_delay, feedback_on,
+                                  environmental_threat, effort_amplification, controller_type, measured_arousal)
+            spent += result[-1]
+        self.last_energy_cost = spent
+        return result[:-1] + (spent,)
+
+    # fatigue bounds -> burnout state and the target override, after every change of self.fatigue (feedback on)
+    def settle_fatigue(self, manual_target_arousal):
+        self.fatigue = max(0.0, min(1.0, self.fatigue))
+        if self.fatigue >= 1.0: self.is_burnt_out = True
+        if self.is_burnt_out and self.fatigue <= 0.0: self.is_burnt_out = False
+        if self.fatigue > 0.7 and not self.is_burnt_out:
+            self.target_override = (0.25 - manual_target_arousal) * 0.1
+        else: self.target_override = 0.0
+
+    # expected fatigue change per second of the periodic update below, for arousal samples of the current state
+    def fatigue_rate(self, arousal, feedback_on):
+        if not feedback_on:
+            return -0.1 / FATIGUE_PERIOD
+        arousal = np.asarray(arousal)
+        if self.is_burnt_out:
+            return -0.01 * np.mean(arousal < 0.4) / FATIGUE_PERIOD
+        return (0.05 * np.mean(arousal > 0.6) - 0.1 * np.mean(arousal < 0.4)) / FATIGUE_PERIOD
+
+    # one substep of h seconds (h <= MAX_FAST_DT); the constants are per REFERENCE_DT and scaled by h / REFERENCE_DT:
+    # forces and energy linearly, noise by the square root (random walk), step counts inversely
+    def advance(self, h, state_name, manual_target_arousal, natural_flux, noise_level, kp, ki, kd, control_delay, feedback_on,
+                environmental_threat, effort_amplification, controller_type, measured_arousal=None):
+        if h != self.substep:
+            self.substep, self.scale = h, h / REFERENCE_DT
+            self.noise_scale, self.fatigue_steps = math.sqrt(self.scale), max(1, int(round(FATIGUE_PERIOD / h)))
+        scale = self.scale
+
         self.last_energy_cost = 0.0 #reset
         
         # feedback off = no conscious control
@@ -76,12 +159,12 @@ class SimulatedStream:
             # energy regen
             energy_regeneration_rate = 0.001
             if self.current_arousal < 0.4: energy_regeneration_rate *= 2
-            self.energy += energy_regeneration_rate
+            self.energy += energy_regeneration_rate * scale
             self.energy = min(1.0, self.energy)
             
             # fatigue recover 
             self.outer_loop_counter += 1
-            if self.outer_loop_counter >= 20:
+            if self.outer_loop_counter >= self.fatigue_steps:
                 self.outer_loop_counter = 0
                 self.fatigue -= 0.1
                 self.fatigue = max(0.0, self.fatigue)
@@ -102,13 +185,13 @@ class SimulatedStream:
             # natural drift
             resting_target = self.states[state_name]['initial_arousal']
             drift_error = resting_target - self.current_arousal
-            conscious_effort_force = drift_error * 0.02
+            conscious_effort_force = drift_error * 0.02 * scale
             
             #only external forces left
             threat_gain = 0.1
-            subconscious_reaction_force = environmental_threat * threat_gain
+            subconscious_reaction_force = environmental_threat * threat_gain * scale
             total_force = conscious_effort_force + subconscious_reaction_force
-            random_noise = (np.random.randn() * noise_level)
+            random_noise = (self.rng.standard_normal() * noise_level * self.noise_scale)
             
             self.current_arousal += total_force + random_noise
             self.current_arousal = max(0.0, min(1.0, self.current_arousal))
@@ -124,12 +207,12 @@ class SimulatedStream:
         # 1) energy regen
         energy_regeneration_rate = 0.001
         if self.current_arousal < 0.4: energy_regeneration_rate *= 2
-        self.energy += energy_regeneration_rate
+        self.energy += energy_regeneration_rate * scale
         self.energy = min(1.0, self.energy)
 
-        # 2) fatigue & burnout logic
+        # 2) fatigue & burnout logic, once per FATIGUE_PERIOD
         self.outer_loop_counter += 1
-        if self.outer_loop_counter >= 20:
+        if self.outer_loop_counter >= self.fatigue_steps:
             self.outer_loop_counter = 0
             if not self.is_burnt_out:
                 if self.current_arousal > 0.6: self.fatigue += 0.05
@@ -137,31 +220,27 @@ class SimulatedStream:
             else:
                 if self.current_arousal < 0.4:
                     self.fatigue -= 0.01
-            self.fatigue = max(0.0, min(1.0, self.fatigue))
-            if self.fatigue >= 1.0: self.is_burnt_out = True
-            if self.is_burnt_out and self.fatigue <= 0.0: self.is_burnt_out = False
-            if self.fatigue > 0.7 and not self.is_burnt_out:
-                self.target_override = (0.25 - manual_target_arousal) * 0.1 
-            else: self.target_override = 0.0
+            self.settle_fatigue(manual_target_arousal)
         
         self.arousal_history.append(self.current_arousal)
         
         # calculate error (w & w/out delay )
         effective_target = manual_target_arousal + self.target_override
         target = effective_target
-        error = target - self.current_arousal
+        sensed_arousal = self.current_arousal if measured_arousal is None else measured_arousal
+        error = target - sensed_arousal
 
         # adaptive control (PID Only)
         if not self.is_tuning and not self.is_burnt_out and controller_type == "PID Controller":
             viability_band = [manual_target_arousal - natural_flux, manual_target_arousal + natural_flux]
-            if self.current_arousal < viability_band[0] or self.current_arousal > viability_band[1]:
+            if sensed_arousal < viability_band[0] or sensed_arousal > viability_band[1]:
                 self.out_of_band_counter += 1
             else:
                 self.out_of_band_counter = 0
-                if self.adaptive_multiplier > 1.0: self.adaptive_multiplier -= 0.005
+                if self.adaptive_multiplier > 1.0: self.adaptive_multiplier -= 0.005 * scale
 
-            if self.out_of_band_counter > 40: 
-                self.adaptive_multiplier += 0.02
+            if self.out_of_band_counter > 40 / scale: 
+                self.adaptive_multiplier += 0.02 * scale
             self.adaptive_multiplier = min(5.0, max(1.0, self.adaptive_multiplier))
         else:
             self.out_of_band_counter = 0
@@ -172,20 +251,21 @@ class SimulatedStream:
 
         # burnout recovery
         if self.is_burnt_out:
-            conscious_effort_force = (self.burnout_recovery_target - self.current_arousal) * 0.05
+            conscious_effort_force = (self.burnout_recovery_target - self.current_arousal) * 0.05 * scale
             self.integral_error = 0.0
             self.previous_error = 0.0
 
         # autotune
         elif self.is_tuning:
             tuning_error = manual_target_arousal - self.current_arousal
-            self.tuning_kp += 0.002
-            conscious_effort_force = tuning_error * self.tuning_kp
+            self.tuning_kp += 0.002 * scale
+            conscious_effort_force = tuning_error * self.tuning_kp * scale
             display_kp = self.tuning_kp
             
             history = np.array(self.arousal_history)
             if len(history) > 10:
-                smooth = np.convolve(history, np.ones(5)/5, mode='valid')
+                smoothing = max(1, int(round(5 / scale)))
+                smooth = np.convolve(history, np.ones(smoothing)/smoothing, mode='valid')
                 if len(smooth) > 3:
                     curr = smooth[-1]; prev = smooth[-2]; prev2 = smooth[-3]
                     is_peak = (prev > prev2) and (prev > curr)
@@ -194,9 +274,8 @@ class SimulatedStream:
                         self.tuning_peak_values.append(prev)
                         if len(self.tuning_peak_times) > 3:
                             peak_diffs = np.diff(self.tuning_peak_times[-3:])
-                            if np.mean(peak_diffs) > 10: 
-                                dt = 0.05 
-                                tu_seconds = np.mean(peak_diffs) * dt
+                            if np.mean(peak_diffs) > 10 / scale: 
+                                tu_seconds = np.mean(peak_diffs) * h
                                 ku = self.tuning_kp
                                 self.kp = 0.45 * ku
                                 self.ki = self.kp / (2.2 * tu_seconds)
@@ -215,10 +294,12 @@ class SimulatedStream:
             base_kd = kd if kd > 0 else self.kd
 
             if controller_type == "P Controller":
-                if len(self.arousal_history) > control_delay:
-                    error = target - self.arousal_history[-(control_delay + 1)]
+                # a measured value brings its own delay; control_delay counts REFERENCE_DT steps
+                delay_steps = int(round(control_delay / scale))
+                if measured_arousal is None and len(self.arousal_history) > delay_steps:
+                    error = target - self.arousal_history[-(delay_steps + 1)]
                 else:
-                    error = target - self.current_arousal
+                    error = target - sensed_arousal
                 
                 pid_force = kp * error
         
@@ -232,9 +313,9 @@ class SimulatedStream:
                 active_ki = base_ki * self.adaptive_multiplier
                 active_kd = base_kd * self.adaptive_multiplier
 
-                self.integral_error += error
+                self.integral_error += error * scale
                 self.integral_error = max(-5.0, min(5.0, self.integral_error))
-                derivative_error = error - self.previous_error
+                derivative_error = (error - self.previous_error) / scale
                 self.previous_error = error
 
                 pid_force = (active_kp * error) + (active_ki * self.integral_error) + (active_kd * derivative_error)
@@ -250,7 +331,7 @@ class SimulatedStream:
             energy_limitation_factor = self.energy
             fatigue_degradation_factor = 1.0 - ((self.fatigue - 0.7) / 0.3) if self.fatigue > 0.7 else 1.0
             
-            conscious_effort_force = amplified_force * fatigue_degradation_factor * energy_limitation_factor
+            conscious_effort_force = amplified_force * fatigue_degradation_factor * energy_limitation_factor * scale
 
         # 5) energy cost and external forces
         energy_cost_multiplier = 0.1
@@ -261,13 +342,133 @@ class SimulatedStream:
         self.energy = max(0.0, self.energy)
 
         threat_gain = 0.1
-        subconscious_reaction_force = environmental_threat * threat_gain
+        subconscious_reaction_force = environmental_threat * threat_gain * scale
         total_force = conscious_effort_force + subconscious_reaction_force
-        random_noise = (np.random.randn() * noise_level)
+        random_noise = (self.rng.standard_normal() * noise_level * self.noise_scale)
         
         self.current_arousal += total_force + random_noise
         self.current_arousal = max(0.0, min(1.0, self.current_arousal))
 
         viability_band = [manual_target_arousal - natural_flux, manual_target_arousal + natural_flux]
 
-        return self.current_arousal, viability_band, self.fatigue, self.is_burnt_out, self.energy, (display_kp, display_ki, display_kd), self.last_energy_cost
\ No newline at end of file
+        return self.current_arousal, viability_band, self.fatigue, self.is_burnt_out, self.energy, (display_kp, display_ki, display_kd), self.last_energy_cost
+
+# steps a SimulatedStream with fixed controls, no UI and no sleeping -> rows shaped like the sim history
+def run_simulation(controls, steps, stream=None, seed=None, auto_tune=False):
+    controls = {**SIM_DEFAULTS, **controls}
+    if stream is None:
+        stream = SimulatedStream(seed=seed)
+    stream.dt = 1 / controls["sensor_sampling_rate"]
+    stream.reset(controls["state_name"])
+    if auto_tune:
+        stream.start_auto_tuning()
+
+    rows = []
+    for _ in range(steps):
+        arousal, viability_band, fatigue, is_burnt_out, energy, pid_gains, energy_spent = stream.get_arousal_value(
+            controls["state_name"], controls["target_arousal"],
+            controls["natural_flux"], controls["noise_level"],
+            controls["kp"], controls["ki"], controls["kd"],
+            controls["latency"], controls["feedback_on"],
+            controls["environmental_threat"], controls["effort_amplification"],
+            controls["controller_type"]
+        )
+        rows.append({
+            "arousal": arousal,
+            "lower_band": viability_band[0],
+            "upper_band": viability_band[1],
+            "fatigue": fatigue,
+            "energy": energy,
+            "energy_spent": energy_spent,
+            "in_band": viability_band[0] <= arousal <= viability_band[1],
+            "is_burnt_out": is_burnt_out,
+        })
+    return rows
+
+
+#long studies (hours) with far fewer steps: coarse projective integration of the slow dynamics.
+# each slow step runs `burst` seconds of the full simulation at dt = 1 / sensor_sampling_rate, reads the slow rates off
+# it (fatigue: the expected rate of the periodic update over the burst's arousal samples, energy: its actual change)
+# and carries fatigue / energy forward linearly for the rest of the slow step, the fast state (arousal, controller)
+# continues from where the burst ended. the jump stops at the fatigue breakpoints (0.7 override / degradation,
+# 1 burnout, 0 recovery) where the law changes, and is cut so energy (or fatigue in the degraded range, where the
+# effort depends on it) moves at most `max_change`; while energy is in a transient (moved more than that within the
+# burst) there is no jump, i.e. the run stays fine-stepped until the slow variables settle.
+# one row per slow step, time-weighted: arousal / in_band / fatigue / energy / is_burnt_out as window means,
+# energy_spent as the window's sum, seconds and steps (fine steps actually run)
+def run_multirate(controls, seconds, slow_dt=300.0, burst=2.0, max_change=0.05, stream=None, seed=None):
+    controls = {**SIM_DEFAULTS, **controls}
+    if stream is None:
+        stream = SimulatedStream(seed=seed)
+    stream.dt = 1 / controls["sensor_sampling_rate"]
+    stream.reset(controls["state_name"])
+    burst_steps = max(1, int(round(burst / stream.dt)))
+    burst = burst_steps * stream.dt
+    target = controls["target_arousal"]
+    band = (target - controls["natural_flux"], target + controls["natural_flux"])
+
+    rows, elapsed = [], 0.0
+    while elapsed < seconds - 1e-9:
+        energy_start = stream.energy
+        arousal, fatigue, energy, burnt, spent = (np.empty(burst_steps) for _ in range(5))
+        for i in range(burst_steps):
+            arousal[i], _, fatigue[i], burnt[i], energy[i], _, spent[i] = stream.get_arousal_value(
+                controls["state_name"], target,
+                controls["natural_flux"], controls["noise_level"],
+                controls["kp"], controls["ki"], controls["kd"],
+                controls["latency"], controls["feedback_on"],
+                controls["environmental_threat"], controls["effort_amplification"],
+                controls["controller_type"]
+            )
+        elapsed += burst
+
+        # slow rates and how far they may be carried. while conscious effort acts it scales with energy (and with
+        # fatigue above 0.7), so those jumps are cut to max_change; burnt out or without feedback both laws are
+        # constant in their own level and only the breakpoints stop the jump
+        jump = max(min(slow_dt - burst, seconds - elapsed), 0.0)
+        fatigue_rate = float(stream.fatigue_rate(arousal, controls["feedback_on"]))
+        energy_rate = (stream.energy - energy_start) / burst
+        effort = controls["feedback_on"] and not stream.is_burnt_out
+        half = burst_steps // 2
+        regime = burnt + 2 * (fatigue > 0.7)   # burnt out / override + degradation
+        if regime.min() != regime.max() or half and (
+                abs(arousal[:half].mean() - arousal[half:].mean()) > max_change
+                or abs(spent[:half].sum() - spent[half:].sum()) > 0.5 * spent.sum() + 1e-9) \
+                or effort and abs(stream.energy - energy_start) > max_change:
+            jump = 0.0   # the regime changed within the burst or the fast state is still settling
+        if effort and energy_rate and not (stream.energy >= 1.0 and energy_rate > 0 or stream.energy <= 0.0 and energy_rate < 0):
+            jump = min(jump, max_change / abs(energy_rate))
+        if effort and fatigue_rate and 0.7 < stream.fatigue < 1.0:
+            jump = min(jump, max_change / abs(fatigue_rate))
+
+        def until(value, rate, levels):
+            ahead = [(level - value) / rate for level in levels if (level - value) * rate > 0]
+            return min(ahead) if ahead else jump
+
+        jump = min(jump, until(stream.energy, energy_rate, (0.0, 1.0)), until(stream.fatigue, fatigue_rate, FATIGUE_BREAKPOINTS))
+        energy_after = min(1.0, max(0.0, stream.energy + energy_rate * jump))
+        fatigue_after = min(1.0, max(0.0, stream.fatigue + fatigue_rate * jump))
+        # land exactly on the breakpoint the jump stopped at (the periodic update compares with >= 1 / <= 0 / > 0.7)
+        fatigue_after = min(FATIGUE_BREAKPOINTS, key=lambda level: abs(level - fatigue_after)) \
+            if min(abs(level - fatigue_after) for level in FATIGUE_BREAKPOINTS) < 1e-9 else fatigue_after
+        window = burst + jump
+        rows.append({
+            "time": elapsed + jump,
+            "seconds": window,
+            "steps": burst_steps,
+            "arousal": float(arousal.mean()),
+            "in_band": float(np.mean((arousal >= band[0]) & (arousal <= band[1]))),
+            "fatigue": (fatigue.sum() * stream.dt + (stream.fatigue + fatigue_after) / 2 * jump) / window,
+            "energy": (energy.sum() * stream.dt + (stream.energy + energy_after) / 2 * jump) / window,
+            "energy_spent": spent.sum() * (1 + jump / burst),
+            "is_burnt_out": (burnt.sum() * stream.dt + stream.is_burnt_out * jump) / window,
+        })
+        if jump:
+            stream.fatigue, stream.energy = fatigue_after, energy_after
+            stream.total_energy_spent += spent.sum() * jump / burst
+            if controls["feedback_on"]:
+                stream.settle_fatigue(target)
+            else:
+                stream.fatigue = max(0.0, min(1.0, stream.fatigue))
+        elapsed += jump
+    return rows
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+from processing.pipeline import SessionPipeline
+
+
+def muse_factory(device):
+    from streams.muse_stream import MuseStream
+    return MuseStream(board_id=device.get("board_id"), mac_address=device.get("mac_address", ""),
+                      serial_number=device.get("serial_number", ""))
+
+
+def synthetic_factory(device):
+    from streams.synthetic_stream import SyntheticEEGStream
+    return SyntheticEEGStream(arousal=device.get("arousal", 0.3), realtime=True, seed=device.get("seed"))
+
+
+#one headset: its own stream, pipeline (Processor + Controller) and acquisition thread
+class DeviceSession:
+    def __init__(self, device, stream_factory, poll_interval, history_size, pipeline_kwargs):
+        self.device = device
+        self.name = device["name"]
+        self.stream_factory = stream_factory
+        self.poll_interval = poll_interval
+        self.pipeline = SessionPipeline(**pipeline_kwargs)
+        self.history = deque(maxlen=history_size)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stream = None
+
+        self.status = "idle"
+        self.error = None
+        self.started_at = None
+        self.last_data_time = None
+        self.chunks = 0
+        self.empty_polls = 0
+        self.latest = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name=f"acq-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def run(self):
+        self.status = "connecting"
+        try:
+            self.stream = self.stream_factory(self.device)
+        except Exception as e:
+            self.status, self.error = "error", str(e)
+            return
+        self.pipeline.packet_monitor = getattr(self.stream, 'packet_monitor', None)
+
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            while not self.stop_event.is_set():
+                tick = time.perf_counter()
+                eeg_data = self.stream.get_data()
+                if eeg_data.shape[1] == 0:
+                    self.empty_polls += 1
+                else:
+                    decisions = self.pipeline.push(eeg_data)
+                    with self.lock:
+                        self.chunks += 1
+                        self.last_data_time = time.time()
+                        self.history.extend(decisions)
+                        if decisions:
+                            self.latest = decisions[-1]
+                # sleep away the rest of the poll period -> N devices share the cpu instead of spinning
+                self.stop_event.wait(max(0.0, self.poll_interval - (time.perf_counter() - tick)))
+            self.status = "stopped"
+        except Exception as e:
+            self.status, self.error = "error", str(e)
+        finally:
+            if hasattr(self.stream, 'release'):
+                self.stream.release()
+
+    def health(self):
+        with self.lock:
+            summary = self.pipeline.summary()
+            now = time.time()
+            uptime = now - self.started_at if self.started_at else 0.0
+            latest = dict(self.latest) if self.latest else {}
+            return {
+                "device": self.name,
+                "status": self.status,
+                "phase": self.pipeline.phase,
+                "arousal": latest.get("arousal"),
+                "in_range": latest.get("in_range"),
+                "artifact": latest.get("artifact"),
+                "sample_rate": summary['samples_received'] / uptime if uptime > 0 else 0.0,
+                "data_age": now - self.last_data_time if self.last_data_time else None,
+                "hops": summary['hops'],
+                "artifact_rate": summary['artifact_rate'],
+                "process_ms_mean": summary['process_time_mean'] * 1000,
+                "process_ms_max": summary['process_time_max'] * 1000,
+                "empty_polls": self.empty_polls,
+                "drop_rate": summary.get('stream', {}).get('drop_rate'),
+                "jitter_ms": summary.get('stream', {}).get('jitter_ms'),
+                "dropped_windows": summary['dropped_windows'],
+                "error": self.error,
+            }
+
+    def history_snapshot(self):
+        with self.lock:
+            return list(self.history)
+
+
+#runs several headsets from one host, each on its own acquisition thread
+# devices: [{"name": "A", "mac_address": "00:55:DA:..."}, {"name": "B", "serial_number": "Muse-1234"}]
+class StreamManager:
+    def __init__(self, devices, stream_factory=muse_factory, poll_interval=0.05, history_size=600, **pipeline_kwargs):
+        names = [device["name"] for device in devices]
+        if len(set(names)) != len(names):
+            raise ValueError(f"device names must be unique: {names}")
+        self.sessions = {
+            device["name"]: DeviceSession(device, stream_factory, poll_interval, history_size, pipeline_kwargs)
+            for device in devices
+        }
+
+    def start(self):
+        for session in self.sessions.values():
+            session.start()
+
+    def stop(self):
+        for session in self.sessions.values():
+            session.stop_event.set()
+        for session in self.sessions.values():
+            session.stop()
+
+    @property
+    def is_running(self):
+        return any(session.thread is not None and session.thread.is_alive() for session in self.sessions.values())
+
+    def health(self):
+        return [session.health() for session in self.sessions.values()]
+
+    def histories(self):
+        return {name: session.history_snapshot() for name, session in self.sessions.items()}
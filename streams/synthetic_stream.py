@@ -0,0 +1,93 @@
+import time
+import numpy as np
+from streams.base_stream import BaseStream
+from streams.packet_monitor import PacketMonitor
+
+MUSE_CHANNEL_NAMES = ['TP9', 'AF7', 'AF8', 'TP10']
+MUSE_PACKET_SAMPLES = 12  # eeg samples per BLE notification
+
+
+#generates muse-like eeg (channel-major, in uV) whose band content follows an arousal level
+# posterior alpha drops and frontal beta rises with arousal -> Processor sees a matching index
+class SyntheticEEGStream(BaseStream):
+    # packet_loss / timing_jitter (seconds, mean extra delay per packet) emulate a lossy BLE link:
+    # get_data then goes through the same PacketMonitor as MuseStream
+    def __init__(self, sampling_rate=256, channel_names=None, arousal=0.3, chunk_size=32,
+                 realtime=False, artifact_rate=0.0, seed=None, packet_loss=0.0, timing_jitter=0.0, resample=False):
+        self.sampling_rate = sampling_rate
+        self.channel_names = list(channel_names or MUSE_CHANNEL_NAMES)
+        self.arousal = arousal
+        self.chunk_size = chunk_size        # samples per get_data call when not realtime
+        self.realtime = realtime            # True -> emit as many samples as wall-clock time elapsed
+        self.artifact_rate = artifact_rate  # probability per chunk of a motion burst
+        self.rng = np.random.default_rng(seed)
+
+        self.posterior = np.array([name in ('TP9', 'TP10') for name in self.channel_names])
+        self.frontal = np.array([name in ('AF7', 'AF8') for name in self.channel_names])
+        self.phase_offsets = self.rng.uniform(0, 2 * np.pi, size=(len(self.channel_names), 2))
+
+        self.sample_index = 0
+        self.last_time = time.perf_counter()
+
+        self.packet_loss = packet_loss
+        self.timing_jitter = timing_jitter
+        self.packet_monitor = PacketMonitor(sampling_rate, resample=resample) if packet_loss or timing_jitter else None
+        self.link_rng = np.random.default_rng(None if seed is None else seed + 1)  # keeps the eeg itself seed-stable
+        self.last_packet = -1
+        self.last_packet_lost = False
+        self.last_packet_delay = 0.0
+
+    def set_arousal(self, arousal):
+        self.arousal = float(np.clip(arousal, 0.0, 1.0))
+
+    def generate(self, num_samples):
+        t = (self.sample_index + np.arange(num_samples)) / self.sampling_rate
+        self.sample_index += num_samples
+
+        alpha_amp = 2.0 + 18.0 * (1.0 - self.arousal)
+        beta_amp = 2.0 + 10.0 * self.arousal
+        alpha = np.sin(2 * np.pi * 10.0 * t + self.phase_offsets[:, :1])
+        beta = np.sin(2 * np.pi * 20.0 * t + self.phase_offsets[:, 1:])
+
+        data = self.rng.normal(0.0, 5.0, size=(len(self.channel_names), num_samples))
+        data += np.where(self.posterior[:, None], alpha_amp, 0.3 * alpha_amp) * alpha
+        data += np.where(self.frontal[:, None], beta_amp, 0.3 * beta_amp) * beta
+
+        if self.artifact_rate and self.rng.random() < self.artifact_rate:
+            # motion/muscle bursts rarely hit every electrode equally
+            hit = self.rng.random(len(self.channel_names)) < 0.5
+            hit[self.rng.integers(len(hit))] = True
+            data[hit] += self.rng.normal(0.0, 500.0, size=(int(hit.sum()), num_samples))
+        return data
+
+    # drops whole packets and stamps the rest like a board would (package number, arrival time)
+    def transmit(self, data):
+        start = self.sample_index - data.shape[1]
+        packets = (start + np.arange(data.shape[1])) // MUSE_PACKET_SAMPLES
+        lost = np.zeros(len(packets), dtype=bool)
+        delay = np.zeros(len(packets))
+        for packet in np.unique(packets):
+            if packet != self.last_packet:  # decide once per packet, even when it spans two chunks
+                self.last_packet = packet
+                self.last_packet_lost = self.link_rng.random() < self.packet_loss
+                self.last_packet_delay = self.link_rng.exponential(self.timing_jitter) if self.timing_jitter else 0.0
+            lost[packets == packet] = self.last_packet_lost
+            delay[packets == packet] = self.last_packet_delay
+        keep = ~lost
+        timestamps = (start + np.arange(data.shape[1])) / self.sampling_rate + delay
+        return self.packet_monitor.process((packets % 65536)[keep].astype(float), timestamps[keep], data[:, keep])
+
+    def get_data(self, noise_level=0):
+        if not self.realtime:
+            data = self.generate(self.chunk_size)
+        else:
+            now = time.perf_counter()
+            num_samples = int((now - self.last_time) * self.sampling_rate)
+            if num_samples == 0:
+                return np.empty((len(self.channel_names), 0))
+            self.last_time += num_samples / self.sampling_rate
+            data = self.generate(num_samples)
+        return self.transmit(data) if self.packet_monitor is not None else data
+
+    def release(self):
+        pass
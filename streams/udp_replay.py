@@ -0,0 +1,103 @@
+#local stand-in for a companion app relaying muse eeg over OSC/UDP: replays a recording (or synthetic eeg)
+#as NetworkStream packets, with optional loss, reordering, duplication and jitter
+#   python -m streams.udp_replay --target 127.0.0.1:5000 --duration 60
+#   python -m streams.udp_replay --path session.npy --loss 0.02 --reorder 0.05 --speed 4
+import argparse
+import socket
+import time
+import numpy as np
+
+from streams.osc import encode_osc, parse_target
+from streams.network_stream import CHUNK_ADDRESS, SAMPLE_ADDRESS, SEQUENCE_MODULUS
+from streams.synthetic_stream import MUSE_PACKET_SAMPLES
+
+
+class UDPReplay:
+    # data: channel-major eeg; reorder: share of packets held back 1-3 packet periods (arrive after later ones)
+    # format "chunk" = sequenced packets of packet_samples, "sample" = one unsequenced message per sample
+    def __init__(self, data, sampling_rate=256, target=("127.0.0.1", 5000), packet_samples=MUSE_PACKET_SAMPLES,
+                 packet_loss=0.0, reorder=0.0, duplicate=0.0, jitter=0.0, speed=1.0, seed=None, format="chunk",
+                 first_sequence=0):
+        self.data = np.asarray(data)
+        self.sampling_rate = sampling_rate
+        self.target = parse_target(target) if isinstance(target, str) else target
+        self.packet_samples = packet_samples if format == "chunk" else 1
+        self.speed = speed
+        self.format = format
+        self.first_sequence = first_sequence
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.schedule = self.plan(np.random.default_rng(seed), packet_loss, reorder, duplicate, jitter)
+        self.sent = 0
+
+    def plan(self, rng, packet_loss, reorder, duplicate, jitter):
+        count = self.data.shape[1] // self.packet_samples
+        period = self.packet_samples / self.sampling_rate
+        send_times = (np.arange(count) + 1) * period
+        send_times += rng.exponential(jitter, count) if jitter else 0.0
+        held = rng.random(count) < reorder
+        send_times[held] += rng.uniform(1, 3, int(held.sum())) * period
+        packets = [i for i in np.flatnonzero(rng.random(count) >= packet_loss)]
+        packets += [i for i in packets if rng.random() < duplicate]
+        self.lost = count - len(set(packets))
+        self.packet_count = count
+        return sorted((send_times[i], int(i)) for i in packets)
+
+    def encode(self, index):
+        start = index * self.packet_samples
+        chunk = self.data[:, start:start + self.packet_samples]
+        if self.format == "sample":
+            return encode_osc(SAMPLE_ADDRESS, [float(v) for v in chunk[:, 0]])
+        sequence = (self.first_sequence + index) % SEQUENCE_MODULUS
+        return encode_osc(CHUNK_ADDRESS, [sequence, chunk.shape[0], chunk.astype("<f4").tobytes()])
+
+    # paced by the schedule (speed > 1 replays faster than real time); blocks until every packet is out
+    def run(self):
+        start = time.perf_counter()
+        for send_time, index in self.schedule:
+            delay = send_time / self.speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            self.socket.sendto(self.encode(index), self.target)
+            self.sent += 1
+        return self.sent
+
+    def close(self):
+        self.socket.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay eeg as OSC/UDP packets for NetworkStream.")
+    parser.add_argument("--target", default="127.0.0.1:5000", help="host:port NetworkStream listens on")
+    parser.add_argument("--path", help=".npy channel-major recording (default: synthetic eeg)")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of synthetic eeg")
+    parser.add_argument("--arousal", type=float, default=0.3, help="synthetic arousal level")
+    parser.add_argument("--format", choices=("chunk", "sample"), default="chunk")
+    parser.add_argument("--loss", type=float, default=0.0, help="share of packets dropped")
+    parser.add_argument("--reorder", type=float, default=0.0, help="share of packets delivered late, out of order")
+    parser.add_argument("--duplicate", type=float, default=0.0, help="share of packets sent twice")
+    parser.add_argument("--jitter", type=float, default=0.0, help="mean extra delay per packet (s)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (2 = twice real time)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.path:
+        data = np.load(args.path)
+    else:
+        from streams.synthetic_stream import SyntheticEEGStream
+        stream = SyntheticEEGStream(arousal=args.arousal, seed=args.seed)
+        data = stream.generate(int(args.duration * stream.sampling_rate))
+    replay = UDPReplay(data, target=args.target, packet_loss=args.loss, reorder=args.reorder, duplicate=args.duplicate,
+                       jitter=args.jitter, speed=args.speed, seed=args.seed, format=args.format)
+    print(f"replaying {replay.packet_count} packets to {replay.target[0]}:{replay.target[1]} "
+          f"({replay.lost} dropped on purpose)")
+    try:
+        replay.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        replay.close()
+    print(f"{replay.sent} packets sent")
+
+
+if __name__ == "__main__":
+    main()